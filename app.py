@@ -1,61 +1,155 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, g
 from flask_cors import CORS
 import sqlite3
+import click
 import bcrypt
 import jwt
 import uuid
-from datetime import datetime, timedelta
+import hashlib
+from datetime import datetime, timedelta, timezone
+from bisect import bisect_left
+from collections import OrderedDict, deque, namedtuple
 from functools import wraps
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 import os
 import random
+import threading
+import time
 import base64
-import requests
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import csv
+import gzip
+import html
+import io
+import json
+import queue
 import re
+import subprocess
+import sys
+import urllib.parse
+import zlib
 
 app = Flask(__name__)
-app.config['SECRET_KEY'] = 'your-super-secret-jwt-key-change-this-in-production'
+app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'your-super-secret-jwt-key-change-this-in-production')
 
 # Enable CORS
 CORS(app, origins='*')
 
 # Database configuration
-DB_PATH = './database/leaderboard.db'
+DB_PATH = os.environ.get('DB_PATH', './database/leaderboard.db')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '10'))
+DB_STATEMENT_CACHE_SIZE = 256
 
-def generate_avatar(display_name=""):
-    """Generate a professional avatar using DiceBear API"""
-    if not display_name or display_name.strip() == "":
-        display_name = "User"
+# Applied once to every new pooled connection
+DB_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', int(DB_POOL_TIMEOUT * 1000)),
+    ('cache_size', -16000),  # ~16 MB page cache
+    ('mmap_size', 268435456),  # 256 MB
+    ('temp_store', 'MEMORY'),
+)
 
-    try:
-        import requests
-        import urllib.parse
+# Public response cache (see ResponseCache)
+RESPONSE_CACHE_MAX_AGE = int(os.environ.get('RESPONSE_CACHE_MAX_AGE', '0'))
+RESPONSE_CACHE_TTL = float(os.environ.get('RESPONSE_CACHE_TTL', '5'))
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', '256'))
 
-        encoded_name = urllib.parse.quote(display_name.strip())
+# Authenticated-user cache (see UserCache). With AUTH_JWT_ONLY_READS=1,
+# read-only endpoints trust the signed token's id/username/role claims and
+# skip the user lookup entirely (role changes then apply on the next login)
+USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', '1024'))
+USER_CACHE_TTL = float(os.environ.get('USER_CACHE_TTL', '60'))
+AUTH_JWT_ONLY_READS = os.environ.get('AUTH_JWT_ONLY_READS', '0') == '1'
 
-        # Use DiceBear 'thumbs' style for illustrated avatars instead of initials
-        avatar_url = (
-            "https://api.dicebear.com/7.x/thumbs/svg?seed="
-            f"{encoded_name}&mood=happy&backgroundColor=ff6b6b,4ecdc4,45b7d1,96ceb4"
-        )
+# Password hashing pool (see PasswordHasher)
+PASSWORD_HASH_ROUNDS = int(os.environ.get('PASSWORD_HASH_ROUNDS', '12'))
+PASSWORD_WORKERS = int(os.environ.get('PASSWORD_WORKERS', '4'))
+PASSWORD_QUEUE_LIMIT = int(os.environ.get('PASSWORD_QUEUE_LIMIT', '32'))
+PASSWORD_RETRY_AFTER = 1  # seconds
+
+# Server-Sent Events (see EventBroker)
+EVENTS_MAX_CLIENTS = int(os.environ.get('EVENTS_MAX_CLIENTS', '100'))
+EVENTS_BUFFER_SIZE = int(os.environ.get('EVENTS_BUFFER_SIZE', '64'))
+EVENTS_REPLAY_SIZE = int(os.environ.get('EVENTS_REPLAY_SIZE', '256'))
+EVENTS_HEARTBEAT = float(os.environ.get('EVENTS_HEARTBEAT', '15'))
+
+# Prometheus metrics at /metrics (see Metrics); 0 skips the request hooks
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') != '0'
+METRICS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Opt-in SQL profiler (see SqlProfiler): per-request statement counts and
+# times in a Server-Timing header, repeated-statement warnings and a slow
+# query log with query plans
+SQL_PROFILE = os.environ.get('SQL_PROFILE', '0') == '1'
+SQL_SLOW_MS = float(os.environ.get('SQL_SLOW_MS', '100'))
+SQL_SLOW_LOG = os.environ.get('SQL_SLOW_LOG', './database/slow-queries.log')
+SQL_REPEAT_THRESHOLD = int(os.environ.get('SQL_REPEAT_THRESHOLD', '5'))
+SQL_FANOUT_WINDOW = 1.0  # seconds in which repeated calls to one route count as fan-out
+
+# 'eager' loads the similarity stack and index at startup, 'lazy' on first use
+APP_WARMUP = os.environ.get('APP_WARMUP', 'lazy')
+
+# Avatars
+# Registration and startup never wait on DiceBear: users get the cached
+# DiceBear avatar for their name if there is one, otherwise the local fallback,
+# and AvatarWorker upgrades the fallback in the background. Fetched SVGs are
+# stored by content hash under AVATAR_CACHE_DIR with a seed -> hash index, so
+# each name is only ever fetched once per deployment.
+AVATAR_API_URL = os.environ.get('AVATAR_API_URL', 'https://api.dicebear.com/7.x/thumbs/svg')
+AVATAR_CACHE_DIR = os.environ.get('AVATAR_CACHE_DIR', './database/avatars')
+AVATAR_FETCH_ENABLED = os.environ.get('AVATAR_FETCH', '1') != '0'
+AVATAR_TIMEOUT = float(os.environ.get('AVATAR_TIMEOUT', '5'))
+AVATAR_QUEUE_SIZE = int(os.environ.get('AVATAR_QUEUE_SIZE', '256'))
+AVATAR_RETRIES = 3
+AVATAR_RETRY_BACKOFF = 0.5  # seconds, doubled after each failed attempt
+AVATAR_BREAKER_THRESHOLD = 5  # consecutive failures before the breaker opens
+AVATAR_BREAKER_RESET = float(os.environ.get('AVATAR_BREAKER_RESET', '60'))
 
-        response = requests.get(avatar_url, timeout=15)
+def avatar_seed(display_name):
+    return display_name.strip() if display_name and display_name.strip() else "User"
 
-        if response.status_code == 200:
-            svg_content = response.text
+def avatar_digest(svg):
+    """Content hash an SVG is stored under"""
+    return hashlib.sha256(svg.encode()).hexdigest()
 
-            if "<svg" in svg_content and "</svg>" in svg_content:
-                import base64
+def store_avatar(conn, svg):
+    """Save an SVG in the avatars table (idempotent) and return its content hash"""
+    data = svg.encode()
+    digest = avatar_digest(svg)
+    conn.execute(
+        'INSERT OR IGNORE INTO avatars (hash, svg, svg_gzip) VALUES (?, ?, ?)',
+        (digest, data, gzip.compress(data, mtime=0))
+    )
+    return digest
 
-                encoded_svg = base64.b64encode(svg_content.encode()).decode()
-                return f"data:image/svg+xml;base64,{encoded_svg}"
+def avatar_url(avatar_hash):
+    """Public URL of a stored avatar (None if the user has none)"""
+    return f'/api/avatars/{avatar_hash}.svg' if avatar_hash else None
 
-        # Fall back if the API returns a bad status or invalid SVG
-        return generate_fallback_avatar(display_name)
+def fetch_avatar_svg(seed):
+    """Fetch the DiceBear SVG for a seed; raises on network errors or bad responses"""
+    import requests
+    
+    # Use DiceBear 'thumbs' style for illustrated avatars instead of initials
+    response = requests.get(AVATAR_API_URL, params={
+        'seed': seed,
+        'mood': 'happy',
+        'backgroundColor': 'ff6b6b,4ecdc4,45b7d1,96ceb4'
+    }, timeout=AVATAR_TIMEOUT)
+    response.raise_for_status()
+    svg_content = response.text
+    if "<svg" not in svg_content or "</svg>" not in svg_content:
+        raise ValueError('Avatar API returned invalid SVG')
+    return svg_content
 
-    except Exception:
-        return generate_fallback_avatar(display_name)
+def generate_avatar(display_name=""):
+    """Cached DiceBear SVG for display_name, or the fallback (never blocks on the network)"""
+    svg = avatar_store.get_seed(avatar_seed(display_name))
+    if svg is not None:
+        return svg
+    return generate_fallback_avatar(display_name)
 
 def generate_fallback_avatar(display_name=""):
     """Fallback avatar generation if API fails"""
@@ -82,23 +176,851 @@ def generate_fallback_avatar(display_name=""):
         font-weight="bold" text-anchor="middle" fill="white">{initials}</text>
 </svg>'''
 
-    return f"data:image/svg+xml;base64,{base64.b64encode(avatar_svg.encode()).decode()}"
+    return avatar_svg
+
+class AvatarStore:
+    """Content-addressed SVG files plus a seed -> content hash index on disk"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, digest[:2], f'{digest}.svg')
+
+    def _seed_path(self, seed):
+        return os.path.join(self.root, 'seeds', hashlib.sha256(seed.encode()).hexdigest())
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def put(self, svg):
+        """Store an SVG and return its sha256 content hash"""
+        data = svg.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        if not os.path.exists(self._blob_path(digest)):
+            self._write(self._blob_path(digest), data)
+        return digest
+
+    def get(self, digest):
+        try:
+            with open(self._blob_path(digest), 'rb') as f:
+                return f.read().decode()
+        except FileNotFoundError:
+            return None
+
+    def put_seed(self, seed, svg):
+        digest = self.put(svg)
+        self._write(self._seed_path(seed), digest.encode())
+        return digest
+
+    def get_seed(self, seed):
+        """SVG cached for a seed, or None"""
+        try:
+            with open(self._seed_path(seed)) as f:
+                return self.get(f.read().strip())
+        except (FileNotFoundError, OSError):
+            return None
+
+class CircuitBreaker:
+    """Stops calling a failing dependency for reset_timeout seconds
+
+    Opens after `threshold` consecutive failures; once the timeout has passed
+    a single trial call is let through (half-open) and its outcome closes or
+    re-opens the breaker.
+    """
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                return 'half-open'
+            return 'open'
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+class AvatarWorker:
+    """Background thread upgrading fallback avatars to DiceBear ones
+
+    Jobs go through a bounded queue; when it is full the job is dropped and
+    the user keeps the fallback. Each fetch is retried with exponential
+    backoff and guarded by a circuit breaker, so an unreachable API costs
+    one short-circuited check per job instead of a timeout.
+    """
+
+    def __init__(self, store, fetch=fetch_avatar_svg, queue_size=AVATAR_QUEUE_SIZE):
+        self.store = store
+        self.fetch = fetch
+        self.breaker = CircuitBreaker(AVATAR_BREAKER_THRESHOLD, AVATAR_BREAKER_RESET)
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._counters = {
+            'queued': 0, 'dropped': 0, 'fetched': 0, 'cached': 0,
+            'failed': 0, 'retries': 0, 'short_circuited': 0, 'updated': 0
+        }
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def submit(self, username, display_name, current_avatar):
+        """Queue an upgrade of username's avatar (hash) unless the seed is cached"""
+        if not AVATAR_FETCH_ENABLED or self.store.get_seed(avatar_seed(display_name)) is not None:
+            return False
+        self._start()
+        try:
+            self._queue.put_nowait((username, avatar_seed(display_name), current_avatar))
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('queued')
+        return True
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='avatar-worker', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self.process(*job)
+            except Exception as e:
+                print(f"Avatar worker error: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _fetch_with_retries(self, seed):
+        for attempt in range(AVATAR_RETRIES):
+            if not self.breaker.allow():
+                self._count('short_circuited')
+                return None
+            try:
+                svg = self.fetch(seed)
+            except Exception:
+                self.breaker.record_failure()
+                if attempt + 1 < AVATAR_RETRIES:
+                    self._count('retries')
+                    time.sleep(AVATAR_RETRY_BACKOFF * 2 ** attempt)
+                continue
+            self.breaker.record_success()
+            self._count('fetched')
+            return svg
+        self._count('failed')
+        return None
+
+    def process(self, username, seed, current_avatar):
+        """Fetch (or reuse) the avatar for seed and swap it in for username"""
+        svg = self.store.get_seed(seed)
+        if svg is not None:
+            self._count('cached')
+        else:
+            svg = self._fetch_with_retries(seed)
+            if svg is None:
+                return False
+            self.store.put_seed(seed, svg)
+        
+        # Only replace the avatar we handed out, never one set since, and
+        # drop the fallback once nobody uses it any more. The SVG is only
+        # stored when a user takes it, so a no-op leaves no orphan behind.
+        with db_pool.connection() as conn:
+            cursor = conn.execute(
+                'UPDATE users SET avatar_hash = ? WHERE username = ? AND avatar_hash = ?',
+                (avatar_digest(svg), username, current_avatar)
+            )
+            updated = bool(cursor.rowcount)
+            if updated:
+                store_avatar(conn, svg)
+                conn.execute(
+                    'DELETE FROM avatars WHERE hash = ? AND NOT EXISTS (SELECT 1 FROM users WHERE avatar_hash = ?)',
+                    (current_avatar, current_avatar)
+                )
+                user_id = conn.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()['id']
+            conn.commit()
+        if updated:
+            user_cache.invalidate(user_id)
+            self._count('updated')
+        return updated
+
+    def join(self, timeout=None):
+        """Block until every queued job has been processed (or timeout seconds pass)"""
+        if timeout is None:
+            self._queue.join()
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queue': self._queue.qsize(),
+                'breaker': self.breaker.state,
+                **self._counters
+            }
+
+avatar_store = AvatarStore(AVATAR_CACHE_DIR)
+avatar_worker = AvatarWorker(avatar_store)
+
+# Metrics
+# Request hooks, pooled connections, the password pool and the similarity
+# index record into per-thread shards that only their own thread ever writes,
+# so recording takes no lock. GET /metrics sums the shards (folding those of
+# exited threads into a retired total) and renders Prometheus text format.
+# Figures are per process: with several gunicorn workers each scrape sees the
+# worker that answered it.
+METRIC_FAMILIES = {
+    'http_requests_total': ('counter', 'Requests handled, by route, method and status'),
+    'http_requests_in_flight': ('gauge', 'Requests currently being handled, by route'),
+    'http_request_duration_seconds': ('histogram', 'Time until the response is returned, by route'),
+    'http_request_db_seconds': ('histogram', 'Time spent in SQLite per request, by route'),
+    'db_statements_total': ('counter', 'SQLite statements executed, by route ("" outside requests)'),
+    'db_seconds_total': ('counter', 'Time spent in SQLite, by route ("" outside requests)'),
+    'password_hash_seconds': ('histogram', 'bcrypt time, by operation'),
+    'similarity_fit_seconds': ('histogram', 'TF-IDF vocabulary fit and matrix build time'),
+}
+
+class Metrics:
+    """Lock-free per-thread counters and histograms, merged on scrape"""
+
+    def __init__(self, buckets=METRICS_BUCKETS):
+        self.buckets = buckets
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []  # (thread, counters, histograms)
+        self._retired = ({}, {})
+
+    def _shard(self):
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = self._local.shard = ({}, {})
+            with self._lock:
+                self._retire_exited()
+                self._shards.append((threading.current_thread(), *shard))
+            return shard
+
+    def _retire_exited(self):
+        live = []
+        for thread, counters, histograms in self._shards:
+            if thread.is_alive():
+                live.append((thread, counters, histograms))
+            else:
+                self._merge(self._retired, counters, histograms)
+        self._shards = live
+
+    @staticmethod
+    def _merge(into, counters, histograms):
+        # list() copies in one step under the GIL, so a shard can be read
+        # while its owner keeps recording
+        for key, value in list(counters.items()):
+            into[0][key] = into[0].get(key, 0) + value
+        for key, values in list(histograms.items()):
+            total = into[1].setdefault(key, [0] * len(values))
+            for i, value in enumerate(list(values)):
+                total[i] += value
+
+    def inc(self, name, labels=(), value=1):
+        counters = self._shard()[0]
+        key = (name, labels)
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, seconds):
+        histograms = self._shard()[1]
+        key = (name, labels)
+        values = histograms.get(key)
+        if values is None:
+            # One count per bucket, then +Inf, then the sum
+            values = histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        values[bisect_left(self.buckets, seconds)] += 1
+        values[-1] += seconds
+
+    def request_started(self, route, method):
+        local = self._local
+        local.route, local.method = route, method
+        local.started = time.perf_counter()
+        local.db_seconds = 0.0
+        local.status = None
+        self.inc('http_requests_in_flight', (('route', route),))
+
+    def request_finished(self, status):
+        local = self._local
+        local.status = status
+        self.observe('http_request_duration_seconds', (('route', local.route),), time.perf_counter() - local.started)
+
+    def request_closed(self):
+        """Count the request once it is torn down (500 if no response was made)"""
+        local = self._local
+        route = getattr(local, 'route', None)
+        if route is None:
+            return
+        if local.status is None:
+            self.request_finished(500)
+        self.inc('http_requests_total', (('route', route), ('method', local.method), ('status', str(local.status))))
+        self.inc('http_requests_in_flight', (('route', route),), -1)
+        self.observe('http_request_db_seconds', (('route', route),), local.db_seconds)
+        local.route = None
+
+    def record_db(self, seconds):
+        local = self._local
+        route = getattr(local, 'route', None)
+        if route is not None:
+            local.db_seconds += seconds
+        labels = (('route', route or ''),)
+        self.inc('db_statements_total', labels)
+        self.inc('db_seconds_total', labels, seconds)
+
+    def collect(self):
+        """(counters, histograms) summed over every thread so far"""
+        with self._lock:
+            self._retire_exited()
+            merged = ({key: value for key, value in self._retired[0].items()},
+                      {key: list(values) for key, values in self._retired[1].items()})
+            shards = list(self._shards)
+        for _, counters, histograms in shards:
+            self._merge(merged, counters, histograms)
+        return merged
+
+    def render(self, scraped=()):
+        """Prometheus text exposition of everything recorded plus scraped
+
+        scraped are (name, type, help, labels, value) read at scrape time
+        from the components' own stats().
+        """
+        families = dict(METRIC_FAMILIES)
+        samples = {}
+        counters, histograms = self.collect()
+        for (name, labels), value in counters.items():
+            samples.setdefault(name, []).append((name, labels, value))
+        for (name, labels), values in histograms.items():
+            rows = samples.setdefault(name, [])
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                rows.append((f'{name}_bucket', labels + (('le', str(bound)),), cumulative))
+            rows.append((f'{name}_sum', labels, values[-1]))
+            rows.append((f'{name}_count', labels, cumulative))
+        for name, kind, help_text, labels, value in scraped:
+            families[name] = (kind, help_text)
+            samples.setdefault(name, []).append((name, labels, value))
+
+        lines = []
+        for name in sorted(samples):
+            kind, help_text = families[name]
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(format_metric(*row) for row in samples[name])
+        return '\n'.join(lines) + '\n'
+
+def format_metric(name, labels, value):
+    if labels:
+        escaped = ','.join(
+            '{}="{}"'.format(key, str(label).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for key, label in labels
+        )
+        name = f'{name}{{{escaped}}}'
+    return f'{name} {round(value, 6) if isinstance(value, float) else value}'
+
+metrics = Metrics()
+
+class TimedConnection(sqlite3.Connection):
+    """sqlite3 connection that reports the time spent in SQLite to metrics
+
+    execute() hands out TimedCursor objects so fetches are timed as well;
+    iterating a cursor directly is not.
+    """
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or TimedCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, parameters):
+        return self.cursor().executemany(sql, parameters)
+
+    def executescript(self, script):
+        return self.cursor().executescript(script)
+
+    def commit(self):
+        started = time.perf_counter()
+        try:
+            return super().commit()
+        finally:
+            metrics.record_db(time.perf_counter() - started)
+
+class TimedCursor(sqlite3.Cursor):
+    _profile = None  # SqlProfiler record of the last statement, if profiling
+
+    def _timed(self, method, *args):
+        started = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.record_db(elapsed)
+            if self._profile is not None:
+                self._profile[2] += elapsed
+
+    def execute(self, sql, parameters=()):
+        self._profile = sql_profiler.statement(sql, parameters)
+        return self._timed(sqlite3.Cursor.execute, sql, parameters)
+
+    def executemany(self, sql, parameters):
+        self._profile = sql_profiler.statement(sql, None)
+        return self._timed(sqlite3.Cursor.executemany, sql, parameters)
+
+    def executescript(self, script):
+        self._profile = sql_profiler.statement(script, None)
+        return self._timed(sqlite3.Cursor.executescript, script)
+
+    def fetchone(self):
+        return self._timed(sqlite3.Cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed(sqlite3.Cursor.fetchmany, self.arraysize if size is None else size)
+
+    def fetchall(self):
+        return self._timed(sqlite3.Cursor.fetchall)
+
+# SQL profiler
+# With SQL_PROFILE=1 every statement a request runs through a pooled
+# connection is recorded with its parameters and time (execute plus the
+# fetches that follow). When the request finishes the profile goes out as a
+# Server-Timing header (total SQL time and the slowest statements, visible in
+# the browser's network panel), the same SQL run SQL_REPEAT_THRESHOLD or more
+# times (an N+1 loop) or run twice with identical parameters is reported,
+# and statements slower than SQL_SLOW_MS are appended to SQL_SLOW_LOG as JSON
+# lines with their EXPLAIN QUERY PLAN. Clients calling one route many times
+# within SQL_FANOUT_WINDOW (the frontend's per-idea fetches) are reported as
+# fan-out. Off by default: it keeps every statement of a request in memory.
+class SqlProfiler:
+    """Per-request statement recorder for the opt-in SQL profiler"""
+
+    def __init__(self, slow_ms=SQL_SLOW_MS, slow_log=SQL_SLOW_LOG, repeat_threshold=SQL_REPEAT_THRESHOLD):
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.repeat_threshold = repeat_threshold
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._recent_calls = {}  # (client, route) -> deque of call times
+
+    def start(self):
+        self._local.records = []
+        self._local.started = time.perf_counter()
+
+    def statement(self, sql, params):
+        """New [sql, params, seconds] record, or None outside a profiled request"""
+        records = getattr(self._local, 'records', None)
+        if records is None:
+            return None
+        record = [sql, params, 0.0]
+        records.append(record)
+        return record
+
+    def finish(self):
+        """Stop recording and return (records, seconds since start)"""
+        records, self._local.records = getattr(self._local, 'records', None), None
+        if records is None:
+            return None, 0.0
+        return records, time.perf_counter() - self._local.started
+
+    def analyze(self, records):
+        """(slowest records, [(sql, count)] N+1 suspects, [(sql, count)] identical repeats)"""
+        by_sql = {}
+        identical = {}
+        for sql, params, _ in records:
+            by_sql[sql] = by_sql.get(sql, 0) + 1
+            if params is not None:
+                key = (sql, repr(params))
+                identical[key] = identical.get(key, 0) + 1
+        repeated = [(sql, count) for sql, count in by_sql.items() if count >= self.repeat_threshold]
+        duplicates = [(sql, count) for (sql, _), count in identical.items() if count > 1]
+        slowest = sorted(records, key=lambda record: record[2], reverse=True)[:3]
+        return slowest, repeated, duplicates
+
+    def server_timing(self, records, elapsed, slowest):
+        entries = [
+            f'app;dur={elapsed * 1000:.2f}',
+            f'db;dur={sum(record[2] for record in records) * 1000:.2f};desc="{len(records)} statements"'
+        ]
+        for i, (sql, _, seconds) in enumerate(slowest, 1):
+            entries.append(f'sql{i};dur={seconds * 1000:.2f};desc="{timing_description(sql)}"')
+        return ', '.join(entries)
+
+    def fanout(self, client, route):
+        """Calls to route from client within SQL_FANOUT_WINDOW, this one included"""
+        now = time.monotonic()
+        with self._lock:
+            calls = self._recent_calls.get((client, route))
+            if calls is None:
+                if len(self._recent_calls) > 10000:
+                    self._recent_calls = {
+                        key: times for key, times in self._recent_calls.items()
+                        if times and now - times[-1] < SQL_FANOUT_WINDOW
+                    }
+                calls = self._recent_calls[(client, route)] = deque()
+            calls.append(now)
+            while now - calls[0] > SQL_FANOUT_WINDOW:
+                calls.popleft()
+            return len(calls)
+
+    def log_slow(self, conn, route, records):
+        """Append statements over slow_ms to the slow query log with their plans"""
+        slow = [record for record in records if record[2] * 1000 >= self.slow_ms]
+        if not slow or not self.slow_log:
+            return
+        lines = []
+        for sql, params, seconds in slow:
+            try:
+                plan = query_plan(conn, sql, params) if params is not None else None
+            except sqlite3.Error:
+                plan = None  # not explainable (e.g. BEGIN/COMMIT)
+            lines.append(json.dumps({
+                'time': datetime.now().isoformat(timespec='milliseconds'),
+                'route': route,
+                'ms': round(seconds * 1000, 2),
+                'sql': ' '.join(sql.split()),
+                'params': params if isinstance(params, dict) else list(params) if params is not None else None,
+                'plan': plan
+            }, default=str))
+        with self._lock:
+            os.makedirs(os.path.dirname(self.slow_log) or '.', exist_ok=True)
+            with open(self.slow_log, 'a') as f:
+                f.write('\n'.join(lines) + '\n')
+
+def timing_description(sql, limit=80):
+    """SQL shortened into a Server-Timing desc quoted-string"""
+    text = ' '.join(sql.split()).encode('ascii', 'replace').decode('ascii')
+    if len(text) > limit:
+        text = text[:limit - 3] + '...'
+    return text.replace('\\', '\\\\').replace('"', '\\"')
+
+sql_profiler = SqlProfiler()
+
+DB_CONNECTION_CLASS = TimedConnection if METRICS_ENABLED or SQL_PROFILE else sqlite3.Connection
+
+class ConnectionPool:
+    """Thread-safe pool of reusable, pre-configured SQLite connections"""
+
+    def __init__(self, db_path, max_size=8, timeout=10.0):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        self._counters = {'created': 0, 'acquired': 0, 'reused': 0, 'waits': 0, 'timeouts': 0, 'discarded': 0}
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.db_path) or '.', exist_ok=True)
+        # Connections migrate between worker threads, but each is only ever
+        # checked out by one thread at a time. The statement cache keeps the
+        # compiled handler queries around for the life of the connection.
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.timeout,
+            check_same_thread=False,
+            cached_statements=DB_STATEMENT_CACHE_SIZE,
+            factory=DB_CONNECTION_CLASS
+        )
+        conn.row_factory = sqlite3.Row
+        for name, value in DB_PRAGMAS:
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def acquire(self):
+        """Check out a connection, opening a new one while under max_size"""
+        deadline = None
+        with self._cond:
+            self._counters['acquired'] += 1
+            while True:
+                if self._idle:
+                    self._counters['reused'] += 1
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                if deadline is None:
+                    self._counters['waits'] += 1
+                    deadline = time.monotonic() + self.timeout
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._counters['timeouts'] += 1
+                    raise sqlite3.OperationalError('Timed out waiting for a database connection')
+                self._cond.wait(remaining)
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._counters['created'] += 1
+        return conn
+
+    def release(self, conn):
+        """Return a connection to the pool, rolling back any open transaction"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._counters['discarded'] += 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection outside of a Flask app context"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close_all(self):
+        """Close every idle connection (e.g. on shutdown)"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._cond:
+            return {
+                'max_size': self.max_size,
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                **self._counters
+            }
+
+db_pool = ConnectionPool(DB_PATH, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT)
 
 def get_db_connection():
-    """Get database connection"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get the pooled database connection bound to the current app context"""
+    if 'db_conn' not in g:
+        g.db_conn = db_pool.acquire()
+    return g.db_conn
 
-def init_database():
-    """Initialize database with tables"""
-    # Create database directory if it doesn't exist
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    
-    conn = get_db_connection()
+@app.teardown_appcontext
+def release_db_connection(exception=None):
+    """Return the app context's connection to the pool"""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        db_pool.release(conn)
+
+# Schema migrations
+# Each entry is (version, description, SQL statements or a callable taking
+# the connection). Versions are applied in order exactly once and recorded
+# in schema_version; never edit a migration that has shipped, add a new one.
+def _add_ideas_title_column(conn):
+    """Databases created before ideas.title existed get the column added"""
+    columns = [row['name'] for row in conn.execute('PRAGMA table_info(ideas)')]
+    if 'title' not in columns:
+        conn.execute("ALTER TABLE ideas ADD COLUMN title TEXT DEFAULT 'Untitled Idea'")
+
+def _create_user_scores(conn):
+    """Materialized per-engineer leaderboard totals, backfilled from ideas"""
+    category_columns = ''.join(
+        f"{column}_points INTEGER NOT NULL DEFAULT 0, {column}_ideas INTEGER NOT NULL DEFAULT 0, "
+        for column in SCORE_CATEGORY_COLUMNS.values()
+    )
+    conn.execute(f'''
+        CREATE TABLE IF NOT EXISTS user_scores (
+            engineer_id TEXT PRIMARY KEY,
+            total_points INTEGER NOT NULL DEFAULT 0,
+            total_ideas INTEGER NOT NULL DEFAULT 0,
+            {category_columns}
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (engineer_id) REFERENCES users (id)
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_user_scores_points ON user_scores (total_points DESC)')
+    rebuild_user_scores(conn)
+
+def _create_point_rules(conn):
+    """Versioned points rule sets, seeded with the original hard-coded tables"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS point_rule_sets (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            active INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            activated_at TIMESTAMP
+        )
+    ''')
+    conn.execute(
+        'CREATE UNIQUE INDEX IF NOT EXISTS idx_point_rule_sets_active ON point_rule_sets (active) WHERE active = 1'
+    )
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS point_rules (
+            version INTEGER NOT NULL,
+            kind TEXT NOT NULL CHECK (kind IN ('base', 'implemented', 'benefit')),
+            name TEXT NOT NULL,
+            points INTEGER NOT NULL,
+            PRIMARY KEY (version, kind, name),
+            FOREIGN KEY (version) REFERENCES point_rule_sets (version)
+        ) WITHOUT ROWID
+    ''')
+    conn.execute('''
+        INSERT INTO point_rule_sets (version, description, active, activated_at)
+        VALUES (1, 'Original rules', 1, CURRENT_TIMESTAMP)
+    ''')
+    conn.executemany('INSERT INTO point_rules (version, kind, name, points) VALUES (1, ?, ?, ?)', [
+        ('base', 'Automation', 10), ('base', 'Security', 10), ('base', 'Innovation', 5),
+        ('implemented', 'Automation', 15), ('implemented', 'Security', 15), ('implemented', 'Innovation', 10),
+        ('benefit', 'Marginal', 5), ('benefit', 'Moderate', 10), ('benefit', 'High', 15),
+        ('benefit', 'Very High', 20), ('benefit', 'Gamechanger', 30)
+    ])
     
-    # Create users table
+    # Which rule set an approved idea's points were computed with
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(ideas)')}
+    if 'rules_version' not in columns:
+        conn.execute('ALTER TABLE ideas ADD COLUMN rules_version INTEGER')
+    conn.execute("UPDATE ideas SET rules_version = 1 WHERE status = 'approved'")
+
+def _create_ideas_search(conn):
+    """FTS5 index over idea text, kept in sync with ideas by triggers"""
+    # External content: the index stores only terms and reads text back from
+    # ideas by rowid. Rowids of ideas are stable as long as the table is not
+    # VACUUMed; run `flask search-rebuild` after a VACUUM.
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS ideas_fts USING fts5(
+            title, description, security_gap, possible_solution,
+            automation_opportunity, automation_solution, innovative_idea,
+            content='ideas', content_rowid='rowid',
+            tokenize='porter unicode61', prefix='2 3'
+        )
+    ''')
+    columns = 'title, description, security_gap, possible_solution, automation_opportunity, automation_solution, innovative_idea'
+    new_values = ', '.join(f'new.{column}' for column in columns.split(', '))
+    old_values = ', '.join(f'old.{column}' for column in columns.split(', '))
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS ideas_fts_insert AFTER INSERT ON ideas BEGIN
+            INSERT INTO ideas_fts (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+    ''')
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS ideas_fts_delete AFTER DELETE ON ideas BEGIN
+            INSERT INTO ideas_fts (ideas_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+        END
+    ''')
+    # Reviews only touch status/points, so they never fire this one
+    conn.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS ideas_fts_update AFTER UPDATE OF {columns} ON ideas BEGIN
+            INSERT INTO ideas_fts (ideas_fts, rowid, {columns}) VALUES ('delete', old.rowid, {old_values});
+            INSERT INTO ideas_fts (rowid, {columns}) VALUES (new.rowid, {new_values});
+        END
+    ''')
+    # BM25 with title matches weighted above body text; ORDER BY rank uses it
+    conn.execute("INSERT INTO ideas_fts (ideas_fts, rank) VALUES ('rank', 'bm25(5.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0)')")
+    conn.execute("INSERT INTO ideas_fts (ideas_fts) VALUES ('rebuild')")
+
+def _create_leaderboard_rollups(conn):
+    """Per-period leaderboard rollups and the approval time they are bucketed by"""
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(ideas)')}
+    if 'approved_at' not in columns:
+        conn.execute('ALTER TABLE ideas ADD COLUMN approved_at TIMESTAMP')
+    # Until now an approved idea's last update was its approval
+    conn.execute("UPDATE ideas SET approved_at = updated_at WHERE status = 'approved' AND approved_at IS NULL")
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS leaderboard_rollups (
+            grain TEXT NOT NULL CHECK (grain IN ('week', 'month')),
+            bucket TEXT NOT NULL,
+            category TEXT NOT NULL,
+            service_area TEXT NOT NULL,
+            engineer_id TEXT NOT NULL,
+            points INTEGER NOT NULL DEFAULT 0,
+            ideas INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (grain, bucket, category, service_area, engineer_id)
+        ) WITHOUT ROWID
+    ''')
+    rebuild_leaderboard_rollups(conn)
+
+def _move_avatars_to_table(conn):
+    """Store avatars once per content hash instead of inline in every users row"""
     conn.execute('''
+        CREATE TABLE IF NOT EXISTS avatars (
+            hash TEXT PRIMARY KEY,
+            svg BLOB NOT NULL,
+            svg_gzip BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+    columns = [row['name'] for row in conn.execute('PRAGMA table_info(users)')]
+    if 'avatar_hash' not in columns:
+        conn.execute('ALTER TABLE users ADD COLUMN avatar_hash TEXT')
+    
+    rows = conn.execute('SELECT id, avatar_data FROM users WHERE avatar_data IS NOT NULL').fetchall()
+    for row in rows:
+        # Stored values are data:image/svg+xml[;base64],<payload> URIs
+        header, _, payload = row['avatar_data'].partition(',')
+        try:
+            svg = base64.b64decode(payload).decode() if header.endswith(';base64') else urllib.parse.unquote(payload)
+        except ValueError:
+            continue  # unreadable legacy avatar; the frontend shows none
+        conn.execute(
+            'UPDATE users SET avatar_hash = ?, avatar_data = NULL WHERE id = ?',
+            (store_avatar(conn, svg), row['id'])
+        )
+
+MIGRATIONS = [
+    (1, 'create users and ideas tables', [
+        '''
         CREATE TABLE IF NOT EXISTS users (
             id TEXT PRIMARY KEY,
             username TEXT UNIQUE NOT NULL,
@@ -109,10 +1031,8 @@ def init_database():
             avatar_data TEXT,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
-    ''')
-    
-    # Create ideas table
-    conn.execute('''
+        ''',
+        '''
         CREATE TABLE IF NOT EXISTS ideas (
             id TEXT PRIMARY KEY,
             engineer_id TEXT NOT NULL,
@@ -136,72 +1056,2609 @@ def init_database():
             FOREIGN KEY (engineer_id) REFERENCES users (id),
             FOREIGN KEY (assigned_sdm_id) REFERENCES users (id)
         )
+        '''
+    ]),
+    (2, 'add ideas.title to legacy databases', _add_ideas_title_column),
+    (3, 'secondary indexes for hot queries', [
+        # get_worklist: assigned_sdm_id = ? AND status = 'pending' ORDER BY submission_date
+        'CREATE INDEX IF NOT EXISTS idx_ideas_sdm_status_date ON ideas (assigned_sdm_id, status, submission_date)',
+        # get_my_ideas: engineer_id = ? ORDER BY submission_date DESC
+        'CREATE INDEX IF NOT EXISTS idx_ideas_engineer_date ON ideas (engineer_id, submission_date)',
+        # get_leaderboard: covering index for the per-engineer SUM/COUNT
+        'CREATE INDEX IF NOT EXISTS idx_ideas_status_engineer_points ON ideas (status, engineer_id, points)',
+        # get_leaderboard recent activities: status = 'approved' ORDER BY updated_at DESC
+        'CREATE INDEX IF NOT EXISTS idx_ideas_status_updated ON ideas (status, updated_at)',
+        # get_approved_ideas / check_similarity: status filter ORDER BY submission_date
+        'CREATE INDEX IF NOT EXISTS idx_ideas_status_date ON ideas (status, submission_date)',
+        # get_sdms: role = 'SDM' ORDER BY display_name
+        'CREATE INDEX IF NOT EXISTS idx_users_role_name ON users (role, display_name)'
+    ]),
+    (4, 'user_scores leaderboard aggregate', _create_user_scores),
+    (5, 'avatars table keyed by content hash', _move_avatars_to_table),
+    (6, 'keyset pagination indexes on (submission_date, id)', [
+        # Idea lists page on (submission_date, id); id breaks ties between
+        # ideas submitted on the same day, so it has to be in the index too
+        'CREATE INDEX IF NOT EXISTS idx_ideas_sdm_status_date_id ON ideas (assigned_sdm_id, status, submission_date, id)',
+        'CREATE INDEX IF NOT EXISTS idx_ideas_engineer_date_id ON ideas (engineer_id, submission_date, id)',
+        'CREATE INDEX IF NOT EXISTS idx_ideas_status_date_id ON ideas (status, submission_date, id)',
+        'DROP INDEX IF EXISTS idx_ideas_sdm_status_date',
+        'DROP INDEX IF EXISTS idx_ideas_engineer_date',
+        'DROP INDEX IF EXISTS idx_ideas_status_date'
+    ]),
+    (7, 'versioned points rule sets', _create_point_rules),
+    (8, 'full-text search index over ideas', _create_ideas_search),
+    (9, 'leaderboard rollups by week and month', _create_leaderboard_rollups),
+]
+
+def get_schema_version(conn):
+    """Return the highest applied migration version (0 for a fresh database)"""
+    return conn.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version').fetchone()[0]
+
+def run_migrations(conn):
+    """Apply pending migrations in order; safe to run on every startup"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
     ''')
     
-    # Insert default SDMs
-    default_password = 'password123'
-    hashed_password = bcrypt.hashpw(default_password.encode('utf-8'), bcrypt.gensalt())
-    
-    default_sdms = [
-        {
-            'id': str(uuid.uuid4()),
-            'username': 'nachi',
-            'display_name': 'Nachi',
-            'email': 'nachi@company.com',
-            'role': 'SDM'
-        },
-        {
-            'id': str(uuid.uuid4()),
-            'username': 'admin',
-            'display_name': 'Admin',
-            'email': 'admin@company.com',
-            'role': 'SDM'
-        }
-    ]
+    for version, description, migration in MIGRATIONS:
+        if version <= get_schema_version(conn):
+            continue
+        
+        # BEGIN IMMEDIATE serializes concurrent starters; re-check once we
+        # hold the write lock in case another process already applied it
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            if version <= get_schema_version(conn):
+                conn.rollback()
+                continue
+            if callable(migration):
+                migration(conn)
+            else:
+                for statement in migration:
+                    conn.execute(statement)
+            conn.execute(
+                'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                (version, description)
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"Applied migration {version}: {description}")
+    
+    return get_schema_version(conn)
+
+# Leaderboard scores
+# user_scores holds one row per engineer with the totals the leaderboard
+# shows, and leaderboard_rollups the same per week and month of approval
+# (see Leaderboard rollups). Both only count approved ideas with points > 0
+# and must be updated through apply_score_change() in the same transaction
+# as the ideas write.
+SCORE_CATEGORY_COLUMNS = {
+    'Innovation': 'innovation',
+    'Automation': 'automation',
+    'Security': 'security'
+}
+
+SCORE_COLUMNS = ['total_points', 'total_ideas'] + [
+    f"{column}_{kind}" for column in SCORE_CATEGORY_COLUMNS.values() for kind in ('points', 'ideas')
+]
+
+SCORES_AGGREGATE_SQL = f'''
+    SELECT 
+        engineer_id,
+        SUM(points) as total_points,
+        COUNT(*) as total_ideas,
+        {', '.join(
+            f"SUM(CASE WHEN category = '{category}' THEN points ELSE 0 END) as {column}_points, "
+            f"SUM(category = '{category}') as {column}_ideas"
+            for category, column in SCORE_CATEGORY_COLUMNS.items()
+        )}
+    FROM ideas
+    WHERE status = 'approved' AND points > 0
+    GROUP BY engineer_id
+'''
+
+def apply_score_change(conn, engineer_id, category, service_area, approved_at, old_points, new_points):
+    """Move an idea's leaderboard contribution from old_points to new_points
+    
+    Pass the points the idea counted for before and after the write (0 when
+    it was/is not approved), e.g. 0 -> points on approval, points -> 0 on
+    un-approval, or old -> new when the points are edited, together with the
+    idea's service area and approved_at (which picks its rollup buckets).
+    Does not commit.
+    """
+    apply_score_changes(conn, [(engineer_id, category, service_area, approved_at, old_points, new_points)])
+
+def apply_score_changes(conn, changes):
+    """apply_score_change() for many (engineer_id, category, service_area,
+    approved_at, old, new) at once
+    
+    Deltas are summed per engineer and category (and per rollup bucket)
+    first, so a bulk review costs one upsert per engineer/category pair
+    rather than one per idea.
+    """
+    deltas = {}
+    rollup_deltas = {}
+    for engineer_id, category, service_area, approved_at, old_points, new_points in changes:
+        old_points = max(old_points or 0, 0)
+        new_points = max(new_points or 0, 0)
+        points_delta = new_points - old_points
+        ideas_delta = int(new_points > 0) - int(old_points > 0)
+        points, ideas = deltas.get((engineer_id, category), (0, 0))
+        deltas[(engineer_id, category)] = (points + points_delta, ideas + ideas_delta)
+        for grain, bucket in rollup_buckets(approved_at).items():
+            key = (grain, bucket, category, service_area, engineer_id)
+            points, ideas = rollup_deltas.get(key, (0, 0))
+            rollup_deltas[key] = (points + points_delta, ideas + ideas_delta)
+    
+    by_column = {}
+    for (engineer_id, category), (points_delta, ideas_delta) in deltas.items():
+        if points_delta or ideas_delta:
+            by_column.setdefault(SCORE_CATEGORY_COLUMNS[category], []).append(
+                (engineer_id, points_delta, ideas_delta, points_delta, ideas_delta)
+            )
+    
+    for column, rows in by_column.items():
+        conn.executemany(f'''
+        INSERT INTO user_scores (engineer_id, total_points, total_ideas, {column}_points, {column}_ideas)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (engineer_id) DO UPDATE SET
+            total_points = total_points + excluded.total_points,
+            total_ideas = total_ideas + excluded.total_ideas,
+            {column}_points = {column}_points + excluded.{column}_points,
+            {column}_ideas = {column}_ideas + excluded.{column}_ideas,
+            updated_at = CURRENT_TIMESTAMP
+        ''', rows)
+    
+    conn.executemany('''
+        INSERT INTO leaderboard_rollups (grain, bucket, category, service_area, engineer_id, points, ideas)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (grain, bucket, category, service_area, engineer_id) DO UPDATE SET
+            points = points + excluded.points,
+            ideas = ideas + excluded.ideas
+    ''', [key + delta for key, delta in rollup_deltas.items() if any(delta)])
+
+def rebuild_user_scores(conn):
+    """Recompute user_scores from the ideas table. Does not commit."""
+    conn.execute('DELETE FROM user_scores')
+    conn.execute(f'''
+        INSERT INTO user_scores (engineer_id, {', '.join(SCORE_COLUMNS)})
+        {SCORES_AGGREGATE_SQL}
+    ''')
+
+def rebuild_score_aggregates(conn):
+    """Recompute user_scores and leaderboard_rollups. Does not commit."""
+    rebuild_user_scores(conn)
+    rebuild_leaderboard_rollups(conn)
+
+def verify_user_scores(conn):
+    """Return [(engineer_id, expected, actual)] where user_scores has drifted"""
+    columns = ', '.join(SCORE_COLUMNS)
+    expected = {
+        row['engineer_id']: tuple(row[column] for column in SCORE_COLUMNS)
+        for row in conn.execute(SCORES_AGGREGATE_SQL)
+    }
+    actual = {
+        row['engineer_id']: tuple(row[column] for column in SCORE_COLUMNS)
+        for row in conn.execute(f'SELECT engineer_id, {columns} FROM user_scores')
+    }
+    empty = (0,) * len(SCORE_COLUMNS)
+    
+    mismatches = []
+    for engineer_id in sorted(expected.keys() | actual.keys()):
+        want = expected.get(engineer_id, empty)
+        have = actual.get(engineer_id, empty)
+        if want != have:
+            mismatches.append((
+                engineer_id,
+                dict(zip(SCORE_COLUMNS, want)),
+                dict(zip(SCORE_COLUMNS, have))
+            ))
+    return mismatches
+
+@app.cli.command('verify-scores')
+@click.option('--rebuild', is_flag=True, help='Rebuild user_scores and the rollups from ideas if they have drifted')
+def verify_scores_command(rebuild):
+    """Check user_scores and leaderboard_rollups against the raw ideas table"""
+    with db_pool.connection() as conn:
+        run_migrations(conn)
+        mismatches = verify_user_scores(conn)
+        for engineer_id, want, have in mismatches:
+            click.echo(f"{engineer_id}: expected {want}, found {have}", err=True)
+        rollup_mismatches = verify_leaderboard_rollups(conn)
+        for key, want, have in rollup_mismatches:
+            click.echo(f"rollup {'/'.join(key)}: expected {want}, found {have}", err=True)
+        
+        if (mismatches or rollup_mismatches) and rebuild:
+            rebuild_score_aggregates(conn)
+            conn.commit()
+            click.echo(f"Rebuilt user_scores and leaderboard_rollups ({len(mismatches)} engineers "
+                       f"and {len(rollup_mismatches)} rollup rows were out of sync)")
+            return
+    
+    if mismatches or rollup_mismatches:
+        raise SystemExit(1)
+    click.echo("user_scores and leaderboard_rollups match ideas")
+
+@app.cli.command('rebuild-scores')
+def rebuild_scores_command():
+    """Recompute user_scores and leaderboard_rollups from the raw ideas table"""
+    with db_pool.connection() as conn:
+        run_migrations(conn)
+        rebuild_score_aggregates(conn)
+        conn.commit()
+        count = conn.execute('SELECT COUNT(*) FROM user_scores').fetchone()[0]
+        rollups = conn.execute('SELECT COUNT(*) FROM leaderboard_rollups').fetchone()[0]
+    click.echo(f"Rebuilt user_scores for {count} engineers and {rollups} leaderboard rollup rows")
+
+# Leaderboard rollups
+# Windowed and segmented boards read leaderboard_rollups: points and idea
+# counts per grain ('week', bucket = the Monday as YYYY-MM-DD, or 'month',
+# bucket = YYYY-MM) x category x service area x engineer, by the idea's
+# approved_at (UTC). Each approval adds to one week row and one month row
+# through apply_score_changes(), so a week board reads one bucket, a month,
+# quarter or year board sums 1, 3 or 12 month buckets and no board ever
+# scans ideas. Rows are never deleted on their way back to zero; the board
+# query skips them.
+LEADERBOARD_WINDOWS = ('week', 'month', 'quarter', 'year', 'all')
+LEADERBOARD_SIZE = 50
+
+# Same buckets as rollup_buckets(), computed inside SQLite
+ROLLUP_APPROVED_AT_SQL = 'COALESCE(approved_at, updated_at)'
+ROLLUP_BUCKET_SQL = {
+    'week': f"date({ROLLUP_APPROVED_AT_SQL}, '-6 days', 'weekday 1')",
+    'month': f"strftime('%Y-%m', {ROLLUP_APPROVED_AT_SQL})"
+}
+
+ROLLUPS_AGGREGATE_SQL = ' UNION ALL '.join(f'''
+    SELECT '{grain}' AS grain, {bucket} AS bucket, category, service_area, engineer_id,
+           SUM(points) AS points, COUNT(*) AS ideas
+    FROM ideas
+    WHERE status = 'approved' AND points > 0
+    GROUP BY bucket, category, service_area, engineer_id
+''' for grain, bucket in ROLLUP_BUCKET_SQL.items())
+
+def approval_timestamp():
+    """UTC now, formatted like SQLite's CURRENT_TIMESTAMP"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+
+def rollup_buckets(approved_at):
+    """{grain: bucket} an idea approved at approved_at counts towards"""
+    day = datetime.strptime(approved_at[:10], '%Y-%m-%d').date()
+    return {'week': (day - timedelta(days=day.weekday())).isoformat(), 'month': day.strftime('%Y-%m')}
+
+def rebuild_leaderboard_rollups(conn):
+    """Recompute leaderboard_rollups from the ideas table. Does not commit."""
+    conn.execute('DELETE FROM leaderboard_rollups')
+    conn.execute(f'''
+        INSERT INTO leaderboard_rollups (grain, bucket, category, service_area, engineer_id, points, ideas)
+        {ROLLUPS_AGGREGATE_SQL}
+    ''')
+
+def verify_leaderboard_rollups(conn):
+    """Return [(key, expected, actual)] for rollup rows that have drifted"""
+    expected = {
+        tuple(row)[:5]: (row['points'], row['ideas'])
+        for row in conn.execute(ROLLUPS_AGGREGATE_SQL)
+    }
+    actual = {
+        tuple(row)[:5]: (row['points'], row['ideas'])
+        for row in conn.execute('''
+            SELECT grain, bucket, category, service_area, engineer_id, points, ideas
+            FROM leaderboard_rollups
+            WHERE points != 0 OR ideas != 0
+        ''')
+    }
+    return [
+        (key, expected.get(key, (0, 0)), actual.get(key, (0, 0)))
+        for key in sorted(expected.keys() | actual.keys())
+        if expected.get(key) != actual.get(key)
+    ]
+
+def leaderboard_window(window, at):
+    """(grain, buckets, first day, last day) of the window containing date at
+
+    buckets is None for 'all' (every month bucket).
+    """
+    if window == 'week':
+        start = at - timedelta(days=at.weekday())
+        return 'week', [start.isoformat()], start, start + timedelta(days=6)
+    if window == 'all':
+        return 'month', None, None, None
+    months = {'month': 1, 'quarter': 3, 'year': 12}[window]
+    first_month = {'month': at.month, 'quarter': (at.month - 1) // 3 * 3 + 1, 'year': 1}[window]
+    buckets = [f'{at.year}-{month:02d}' for month in range(first_month, first_month + months)]
+    start = at.replace(month=first_month, day=1)
+    end_month = first_month + months
+    end = (at.replace(year=at.year + 1, month=1, day=1) if end_month > 12
+           else at.replace(month=end_month, day=1)) - timedelta(days=1)
+    return 'month', buckets, start, end
+
+def windowed_leaderboard_query(grain, buckets=None, category=None, service_area=None, limit=LEADERBOARD_SIZE):
+    """(sql, params) for the top engineers over some rollup buckets"""
+    conditions, params = ['r.grain = ?'], [grain]
+    if buckets is not None:
+        conditions.append(f"r.bucket IN ({', '.join('?' * len(buckets))})")
+        params += buckets
+    if category:
+        conditions.append('r.category = ?')
+        params.append(category)
+    if service_area:
+        conditions.append('r.service_area = ?')
+        params.append(service_area)
+    sql = f'''
+        SELECT 
+            u.display_name, u.username,
+            SUM(r.points) AS total_points, SUM(r.ideas) AS total_ideas,
+            {', '.join(
+                f"SUM(CASE WHEN r.category = '{category}' THEN r.points ELSE 0 END) AS {column}_points"
+                for category, column in SCORE_CATEGORY_COLUMNS.items()
+            )}
+        FROM leaderboard_rollups r
+        JOIN users u ON u.id = r.engineer_id
+        WHERE {' AND '.join(conditions)}
+        GROUP BY r.engineer_id
+        HAVING SUM(r.points) > 0
+        ORDER BY total_points DESC, u.display_name
+        LIMIT ?
+    '''
+    return sql, params + [limit]
+
+def parse_leaderboard_args(args):
+    """(window, at, category, service_area) from request args; raises ValueError"""
+    window = args.get('window') or 'all'
+    if window not in LEADERBOARD_WINDOWS:
+        raise ValueError(f"window must be one of {', '.join(LEADERBOARD_WINDOWS)}")
+    category = args.get('category') or None
+    if category is not None and category not in IDEA_CATEGORIES:
+        raise ValueError(f"category must be one of {', '.join(IDEA_CATEGORIES)}")
+    service_area = args.get('service_area') or None
+    if service_area is not None and len(service_area) > 100:
+        raise ValueError('service_area is too long')
+    try:
+        at = datetime.strptime(args['at'], '%Y-%m-%d').date() if args.get('at') else datetime.now(timezone.utc).date()
+    except ValueError:
+        raise ValueError('at must be a YYYY-MM-DD date')
+    return window, at, category, service_area
+
+SERVICE_AREAS_SQL = "SELECT DISTINCT service_area FROM leaderboard_rollups WHERE grain = 'month'"
+
+_service_areas = {'generation': None, 'loaded_at': 0.0, 'areas': frozenset()}
+_service_areas_lock = threading.Lock()
+
+def known_service_areas(conn):
+    """Service areas with any rollup rows, re-read after a write or RESPONSE_CACHE_TTL"""
+    now = time.monotonic()
+    with _service_areas_lock:
+        if (_service_areas['generation'] == response_cache.generation
+                and now - _service_areas['loaded_at'] < RESPONSE_CACHE_TTL):
+            return _service_areas['areas']
+        generation = response_cache.generation
+    areas = frozenset(row['service_area'] for row in conn.execute(SERVICE_AREAS_SQL))
+    with _service_areas_lock:
+        _service_areas.update(generation=generation, loaded_at=now, areas=areas)
+    return areas
+
+# Points engine
+# Points come from versioned rule sets stored in point_rules; exactly one set
+# is active and new approvals are scored with it. A rule set never changes
+# once stored (add a new version instead), so loaded sets are cached by
+# version for the life of the process and only the active version number is
+# read per approval. Changing weights for history is a set-based re-score of
+# every approved idea followed by a user_scores rebuild (points-rescore).
+POINT_RULE_KINDS = ('base', 'implemented', 'benefit')
+
+PointRules = namedtuple('PointRules', 'version base implemented benefit')
+
+ACTIVE_POINT_RULES_SQL = 'SELECT version FROM point_rule_sets WHERE active = 1'
+
+# Same formula as calculate_points(), evaluated per row inside SQLite
+POINTS_EXPRESSION_SQL = '''
+    COALESCE((SELECT points FROM point_rules
+              WHERE version = :version AND kind = 'base' AND name = ideas.category), 0)
+    + CASE WHEN ideas.implemented THEN
+        COALESCE((SELECT points FROM point_rules
+                  WHERE version = :version AND kind = 'implemented' AND name = ideas.category), 0)
+        + COALESCE((SELECT points FROM point_rules
+                    WHERE version = :version AND kind = 'benefit' AND name = ideas.benefit_level), 0)
+      ELSE 0 END
+'''
+
+RESCORE_SQL = f'''
+    UPDATE ideas
+    SET points = {POINTS_EXPRESSION_SQL}, rules_version = :version
+    WHERE status = 'approved'
+      AND (points IS NOT {POINTS_EXPRESSION_SQL} OR rules_version IS NOT :version)
+'''
+
+_point_rules = {}
+
+def load_point_rules(conn, version=None):
+    """PointRules for a version (default: the active rule set)"""
+    if version is None:
+        version = conn.execute(ACTIVE_POINT_RULES_SQL).fetchone()[0]
+    rules = _point_rules.get(version)
+    if rules is None:
+        tables = {kind: {} for kind in POINT_RULE_KINDS}
+        rows = conn.execute(
+            'SELECT kind, name, points FROM point_rules WHERE version = ?', (version,)
+        ).fetchall()
+        if not rows:
+            raise ValueError(f'Unknown points rule set {version}')
+        for row in rows:
+            tables[row['kind']][row['name']] = row['points']
+        rules = _point_rules[version] = PointRules(version, **tables)
+    return rules
+
+def calculate_points(rules, category, implemented, benefit_level):
+    """Points an idea earns on approval under a rule set"""
+    points = rules.base.get(category, 0)
+    if implemented:
+        points += rules.implemented.get(category, 0) + rules.benefit.get(benefit_level, 0)
+    return points
+
+def add_point_rules(conn, tables, description):
+    """Store a new rule set from {'base': {...}, 'implemented': {...}, 'benefit': {...}}
+    
+    Returns the new version. Does not activate it or commit.
+    """
+    rows = []
+    for kind in POINT_RULE_KINDS:
+        table = tables.get(kind)
+        if not isinstance(table, dict):
+            raise ValueError(f'{kind} must be an object of name -> points')
+        if kind != 'benefit':
+            missing = [category for category in SCORE_CATEGORY_COLUMNS if category not in table]
+            if missing:
+                raise ValueError(f"{kind} is missing {', '.join(missing)}")
+        for name, points in table.items():
+            if not isinstance(points, int) or isinstance(points, bool) or points < 0:
+                raise ValueError(f'{kind}.{name} must be a non-negative integer')
+            rows.append((kind, name, points))
+    
+    version = conn.execute('SELECT COALESCE(MAX(version), 0) + 1 FROM point_rule_sets').fetchone()[0]
+    conn.execute(
+        'INSERT INTO point_rule_sets (version, description) VALUES (?, ?)', (version, description)
+    )
+    conn.executemany(
+        f'INSERT INTO point_rules (version, kind, name, points) VALUES ({version}, ?, ?, ?)', rows
+    )
+    return version
+
+def activate_point_rules(conn, version):
+    """Make a stored rule set the one new approvals use. Does not commit."""
+    load_point_rules(conn, version)
+    conn.execute('UPDATE point_rule_sets SET active = 0 WHERE active = 1 AND version != ?', (version,))
+    conn.execute('''
+        UPDATE point_rule_sets SET active = 1, activated_at = CURRENT_TIMESTAMP
+        WHERE version = ? AND active = 0
+    ''', (version,))
+
+def rescore_ideas(conn, version):
+    """Re-score every approved idea under a rule set and rebuild the aggregates
+    
+    Returns the number of ideas rewritten. Does not commit.
+    """
+    load_point_rules(conn, version)
+    changed = conn.execute(RESCORE_SQL, {'version': version}).rowcount
+    rebuild_score_aggregates(conn)
+    return changed
+
+def leaderboard_standings(conn):
+    """{engineer_id: (total_points, rank)} for everyone in user_scores"""
+    rows = conn.execute(
+        'SELECT engineer_id, total_points FROM user_scores WHERE total_points > 0 ORDER BY total_points DESC'
+    ).fetchall()
+    return {row['engineer_id']: (row['total_points'], rank) for rank, row in enumerate(rows, 1)}
+
+def leaderboard_deltas(before, after):
+    """[(engineer_id, old points, new points, old rank, new rank)] that moved, largest change first"""
+    deltas = []
+    for engineer_id in before.keys() | after.keys():
+        old_points, old_rank = before.get(engineer_id, (0, None))
+        new_points, new_rank = after.get(engineer_id, (0, None))
+        if old_points != new_points or old_rank != new_rank:
+            deltas.append((engineer_id, old_points, new_points, old_rank, new_rank))
+    deltas.sort(key=lambda delta: (-abs(delta[2] - delta[1]), delta[4] or float('inf')))
+    return deltas
+
+@app.cli.command('points-rules')
+def points_rules_command():
+    """List the stored points rule sets"""
+    with db_pool.connection() as conn:
+        run_migrations(conn)
+        for row in conn.execute('SELECT version, description, active, created_at FROM point_rule_sets ORDER BY version'):
+            rules = load_point_rules(conn, row['version'])
+            marker = '*' if row['active'] else ' '
+            click.echo(f"{marker} v{row['version']} {row['description']} ({row['created_at']})")
+            for kind in POINT_RULE_KINDS:
+                table = getattr(rules, kind)
+                click.echo(f"    {kind}: " + ', '.join(f'{name}={points}' for name, points in table.items()))
+
+@app.cli.command('points-rules-add')
+@click.argument('rules_file', type=click.File('r'))
+@click.option('--description', default=None, help='What changed (defaults to the file\'s "description")')
+@click.option('--activate', is_flag=True, help='Score new approvals with this rule set right away')
+def points_rules_add_command(rules_file, description, activate):
+    """Store a rule set from JSON: {"base": {...}, "implemented": {...}, "benefit": {...}}"""
+    tables = json.load(rules_file)
+    description = description or tables.get('description') or rules_file.name
+    with db_pool.connection() as conn:
+        run_migrations(conn)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = add_point_rules(conn, tables, description)
+            if activate:
+                activate_point_rules(conn, version)
+            conn.commit()
+        except ValueError as e:
+            conn.rollback()
+            raise click.ClickException(str(e))
+    click.echo(f"Stored points rules v{version}" + (' (active)' if activate else ''))
+
+@app.cli.command('points-rescore')
+@click.option('--version', 'version', type=int, default=None, help='Rule set to apply and activate (default: the active one)')
+@click.option('--dry-run', is_flag=True, help='Report leaderboard changes and roll back')
+@click.option('--limit', default=20, show_default=True, help='Leaderboard changes to print')
+def points_rescore_command(version, dry_run, limit):
+    """Recompute points for all approved ideas under a rule set"""
+    with db_pool.connection() as conn:
+        run_migrations(conn)
+        # The dry run takes the same path as the real one and rolls back, so
+        # what it reports is exactly what would be committed
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            version = version or load_point_rules(conn).version
+            before = leaderboard_standings(conn)
+            activate_point_rules(conn, version)
+            changed = rescore_ideas(conn, version)
+            after = leaderboard_standings(conn)
+            names = dict(conn.execute('SELECT id, username FROM users'))
+        except ValueError as e:
+            conn.rollback()
+            raise click.ClickException(str(e))
+        except Exception:
+            conn.rollback()
+            raise
+        
+        deltas = leaderboard_deltas(before, after)
+        for engineer_id, old_points, new_points, old_rank, new_rank in deltas[:limit]:
+            click.echo(
+                f"{names.get(engineer_id, engineer_id):<24} {old_points:>8} -> {new_points:<8} "
+                f"({new_points - old_points:+d})  rank {old_rank or '-'} -> {new_rank or '-'}"
+            )
+        if len(deltas) > limit:
+            click.echo(f"... {len(deltas) - limit} more")
+        
+        if dry_run:
+            conn.rollback()
+            click.echo(f"Dry run: v{version} would re-score {changed} ideas and move {len(deltas)} engineers")
+        else:
+            conn.commit()
+            click.echo(f"Re-scored {changed} ideas with v{version}; {len(deltas)} engineers moved")
+
+# Idea lists
+# my-ideas, worklist and approved/all share one query builder: pages are
+# ordered by (submission_date, id) and continued with a keyset cursor (the
+# last row's sort key), so every page is an index range walk no matter how
+# deep it is. Filters narrow the same walk and `fields` picks the columns.
+IDEA_COLUMNS = (
+    'id', 'engineer_id', 'title', 'description', 'category', 'service_area',
+    'status', 'assigned_sdm_id', 'implemented', 'benefit_level', 'points',
+    'security_gap', 'possible_solution', 'automation_opportunity',
+    'automation_solution', 'innovative_idea', 'rejection_reason',
+    'submission_date', 'updated_at'
+)
+
+IDEA_STATUSES = ('pending', 'approved', 'rejected')
+
+# Query parameter -> condition; values are validated by parse_idea_filters()
+IDEA_LIST_FILTERS = {
+    'category': 'i.category = ?',
+    'service_area': 'i.service_area = ?',
+    'benefit_level': 'i.benefit_level = ?',
+    'implemented': 'i.implemented = ?',
+    'from': 'i.submission_date >= ?',
+    'to': 'i.submission_date <= ?'
+}
+
+IDEA_PAGE_MAX = 500
+
+IDEA_LISTS = {
+    'my_ideas': {
+        'join': 'LEFT JOIN users u ON i.assigned_sdm_id = u.id',
+        'where': 'i.engineer_id = ?',
+        'columns': {'assigned_sdm_name': 'u.display_name'},
+        'default_fields': IDEA_COLUMNS + ('assigned_sdm_name',),
+        'descending': True,
+        'default_limit': 50
+    },
+    'worklist': {
+        'join': 'JOIN users u ON i.engineer_id = u.id',
+        'where': "i.assigned_sdm_id = ? AND i.status = 'pending'",
+        'columns': {'engineer_name': 'u.display_name', 'engineer_username': 'u.username'},
+        'default_fields': IDEA_COLUMNS + ('engineer_name', 'engineer_username'),
+        'descending': False,
+        'default_limit': 50
+    },
+    'approved': {
+        'join': 'JOIN users u ON i.engineer_id = u.id',
+        'where': "i.status = 'approved'",
+        'columns': {'title': "COALESCE(i.title, 'Untitled Idea')", 'engineer_name': 'u.display_name'},
+        'default_fields': (
+            'id', 'title', 'description', 'category', 'service_area', 'benefit_level',
+            'points', 'submission_date', 'status', 'implemented', 'engineer_name'
+        ),
+        'descending': True,
+        'default_limit': 50
+    }
+}
+
+def encode_cursor(row):
+    key = json.dumps([row['submission_date'], row['id']]).encode()
+    return base64.urlsafe_b64encode(key).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    try:
+        submission_date, idea_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return str(submission_date), str(idea_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def parse_idea_filters(args):
+    """[(condition, value)] for the list filters present in request args"""
+    filters = []
+    for name, condition in IDEA_LIST_FILTERS.items():
+        value = args.get(name)
+        if value is None or value == '':
+            continue
+        if name == 'implemented':
+            if value.lower() not in ('0', '1', 'true', 'false'):
+                raise ValueError('implemented must be true or false')
+            value = 1 if value.lower() in ('1', 'true') else 0
+        elif name in ('from', 'to'):
+            try:
+                datetime.strptime(value, '%Y-%m-%d')
+            except ValueError:
+                raise ValueError(f'{name} must be a YYYY-MM-DD date')
+        filters.append((condition, value))
+    return filters
+
+def idea_list_query(name, owner_params=(), fields=None, filters=(), cursor=None, limit=None):
+    """(sql, params) for one page of an idea list"""
+    spec = IDEA_LISTS[name]
+    fields = fields or spec['default_fields']
+    # id and submission_date are always returned: they make up the cursor
+    selected = dict.fromkeys(('id', 'submission_date', *fields))
+    columns = ', '.join(f"{spec['columns'].get(field, f'i.{field}')} AS {field}" for field in selected)
+    
+    conditions, params = [spec['where']], list(owner_params)
+    for condition, value in filters:
+        conditions.append(condition)
+        params.append(value)
+    
+    direction = 'DESC' if spec['descending'] else 'ASC'
+    if cursor:
+        conditions.append(f"(i.submission_date, i.id) {'<' if spec['descending'] else '>'} (?, ?)")
+        params += cursor
+    
+    sql = f'''
+        SELECT {columns}
+        FROM ideas i
+        {spec['join']}
+        WHERE {' AND '.join(conditions)}
+        ORDER BY i.submission_date {direction}, i.id {direction}
+    '''
+    if limit:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return sql, params
+
+def idea_list_summary_query(name, owner_params=(), filters=()):
+    """(sql, params) counting the ideas (in total and per status) and points a list holds"""
+    spec = IDEA_LISTS[name]
+    conditions = [spec['where'], *(condition for condition, _ in filters)]
+    return f'''
+        SELECT COUNT(*) AS count, COALESCE(SUM(i.points), 0) AS total_points,
+            {', '.join(f"COALESCE(SUM(i.status = '{status}'), 0) AS {status}" for status in IDEA_STATUSES)}
+        FROM ideas i
+        WHERE {' AND '.join(conditions)}
+    ''', [*owner_params, *(value for _, value in filters)]
+
+def fetch_idea_details(conn, idea_ids):
+    """{idea id: full detail row} for many ideas, IN-queries of 500 at a time"""
+    wanted = list(dict.fromkeys(idea_ids))
+    details = {}
+    for start in range(0, len(wanted), 500):
+        chunk = wanted[start:start + 500]
+        sql = IDEA_DETAILS_SQL.format(placeholders=', '.join('?' * len(chunk)))
+        for row in conn.execute(sql, chunk):
+            details[row['id']] = dict(row)
+    return details
+
+def idea_list_page(conn, name, args, owner_params=()):
+    """Response payload for an idea list request; raises ValueError on bad args
+    
+    Query parameters: limit, cursor (next_cursor of the previous page),
+    fields (comma-separated), the IDEA_LIST_FILTERS keys, summary=1 and
+    include=details (every detail column, fetched with one IN query).
+    """
+    spec = IDEA_LISTS[name]
+    allowed = set(IDEA_COLUMNS) | set(spec['columns'])
+    
+    fields = None
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in allowed]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    
+    limit = spec['default_limit']
+    if args.get('limit'):
+        try:
+            limit = int(args['limit'])
+        except ValueError:
+            raise ValueError('limit must be an integer')
+        if limit < 1:
+            raise ValueError('limit must be positive')
+    if limit:
+        limit = min(limit, IDEA_PAGE_MAX)
+    
+    filters = parse_idea_filters(args)
+    cursor = decode_cursor(args['cursor']) if args.get('cursor') else None
+    
+    # One extra row tells us whether there is a next page
+    sql, params = idea_list_query(name, owner_params, fields, filters, cursor, limit + 1 if limit else None)
+    rows = conn.execute(sql, params).fetchall()
+    
+    ideas = [dict(row) for row in rows[:limit]]
+    if 'details' in args.get('include', '').split(','):
+        details = fetch_idea_details(conn, [idea['id'] for idea in ideas])
+        # The list's own columns win (e.g. approved's title fallback)
+        ideas = [{**details.get(idea['id'], {}), **idea} for idea in ideas]
+    
+    payload = {'ideas': ideas, 'next_cursor': None}
+    if limit and len(rows) > limit:
+        payload['next_cursor'] = encode_cursor(rows[limit - 1])
+    if args.get('summary') in ('1', 'true'):
+        sql, params = idea_list_summary_query(name, owner_params, filters)
+        payload['summary'] = dict(conn.execute(sql, params).fetchone())
+    return payload
+
+# Idea search
+# GET /api/ideas/search matches against the ideas_fts index (title, description
+# and the category-specific fields) and ranks with BM25, title hits first.
+# User input never reaches FTS5 syntax directly: words become quoted terms,
+# "quoted text" a phrase and a trailing * a prefix query, all ANDed. Results
+# come in rank order, paged with limit/offset.
+SEARCH_PAGE_MAX = 100
+SEARCH_MAX_TERMS = 16
+SEARCH_STATUSES = ('pending', 'approved', 'rejected')
+SEARCH_TERM_RE = re.compile(r'"([^"]*)"?|(\w+)(\*?)')
+
+# snippet()/highlight() mark matches with control characters, which are
+# swapped for <mark> after the text around them has been HTML-escaped
+SEARCH_MARK_START, SEARCH_MARK_END = '\x02', '\x03'
+
+def parse_search_query(text):
+    """FTS5 MATCH expression for user search text; raises ValueError"""
+    terms = []
+    for phrase, word, prefix in SEARCH_TERM_RE.findall(text or ''):
+        if phrase:
+            words = re.findall(r'\w+', phrase)
+            if words:
+                terms.append('"' + ' '.join(words) + '"')
+        elif word:
+            terms.append(f'"{word}"{prefix}')
+    if not terms:
+        raise ValueError('q must contain at least one word')
+    if len(terms) > SEARCH_MAX_TERMS:
+        raise ValueError(f'At most {SEARCH_MAX_TERMS} search terms')
+    return ' '.join(terms)
+
+def search_highlight(text):
+    """HTML-escaped snippet with matches wrapped in <mark>"""
+    if text is None:
+        return None
+    return (html.escape(text)
+            .replace(SEARCH_MARK_START, '<mark>')
+            .replace(SEARCH_MARK_END, '</mark>'))
+
+def idea_search_query(match, filters=(), viewer_id=None, limit=20, offset=0):
+    """(sql, params) for one page of ranked search results
+    
+    viewer_id restricts results to approved ideas plus the viewer's own.
+    """
+    conditions, params = ['ideas_fts MATCH ?'], [match]
+    if viewer_id is not None:
+        conditions.append("(i.status = 'approved' OR i.engineer_id = ?)")
+        params.append(viewer_id)
+    for condition, value in filters:
+        conditions.append(condition)
+        params.append(value)
+    sql = f'''
+        SELECT i.id, COALESCE(i.title, 'Untitled Idea') AS title, i.category, i.service_area,
+               i.status, i.benefit_level, i.implemented, i.points, i.submission_date,
+               u.display_name AS engineer_name,
+               highlight(ideas_fts, 0, '{SEARCH_MARK_START}', '{SEARCH_MARK_END}') AS title_highlight,
+               snippet(ideas_fts, -1, '{SEARCH_MARK_START}', '{SEARCH_MARK_END}', '...', 16) AS snippet,
+               rank
+        FROM ideas_fts
+        JOIN ideas i ON i.rowid = ideas_fts.rowid
+        JOIN users u ON u.id = i.engineer_id
+        WHERE {' AND '.join(conditions)}
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+    '''
+    return sql, params + [limit, offset]
+
+def idea_search_count_query(match, filters=(), viewer_id=None):
+    """(sql, params) counting every match of a search"""
+    conditions, params = ['ideas_fts MATCH ?'], [match]
+    if viewer_id is not None:
+        conditions.append("(i.status = 'approved' OR i.engineer_id = ?)")
+        params.append(viewer_id)
+    for condition, value in filters:
+        conditions.append(condition)
+        params.append(value)
+    return f'''
+        SELECT COUNT(*) AS count
+        FROM ideas_fts
+        JOIN ideas i ON i.rowid = ideas_fts.rowid
+        WHERE {' AND '.join(conditions)}
+    ''', params
+
+def idea_search_page(conn, args, viewer_id=None):
+    """Response payload for a search request; raises ValueError on bad args
+    
+    Query parameters: q, limit, offset, status, summary=1 (total count) and
+    the IDEA_LIST_FILTERS keys (category, service_area, ...).
+    """
+    match = parse_search_query(args.get('q'))
+    try:
+        limit = min(int(args.get('limit') or 20), SEARCH_PAGE_MAX)
+        offset = int(args.get('offset') or 0)
+    except ValueError:
+        raise ValueError('limit and offset must be integers')
+    if limit < 1 or offset < 0:
+        raise ValueError('limit must be positive and offset not negative')
+    
+    filters = parse_idea_filters(args)
+    if args.get('status'):
+        if args['status'] not in SEARCH_STATUSES:
+            raise ValueError(f"status must be one of {', '.join(SEARCH_STATUSES)}")
+        filters.append(('i.status = ?', args['status']))
+    
+    # One extra row tells us whether there is a next page
+    sql, params = idea_search_query(match, filters, viewer_id, limit + 1, offset)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except sqlite3.OperationalError as e:
+        # Only left for input parse_search_query() lets through, e.g. a
+        # prefix shorter than FTS5 accepts
+        raise ValueError(f'Invalid search: {e}')
+    
+    ideas = []
+    for row in rows[:limit]:
+        idea = dict(row)
+        idea['title_highlight'] = search_highlight(idea['title_highlight'])
+        idea['snippet'] = search_highlight(idea['snippet'])
+        idea['rank'] = round(idea['rank'], 4)
+        ideas.append(idea)
+    
+    payload = {'ideas': ideas, 'next_offset': offset + limit if len(rows) > limit else None}
+    if args.get('summary') in ('1', 'true'):
+        sql, params = idea_search_count_query(match, filters, viewer_id)
+        payload['total'] = conn.execute(sql, params).fetchone()['count']
+    return payload
+
+def rebuild_search_index(conn):
+    """Re-read every idea into ideas_fts (after a VACUUM or a suspected drift)"""
+    conn.execute("INSERT INTO ideas_fts (ideas_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO ideas_fts (ideas_fts) VALUES ('optimize')")
+
+@app.cli.command('search-rebuild')
+def search_rebuild_command():
+    """Rebuild and optimize the full-text search index"""
+    with db_pool.connection() as conn:
+        rebuild_search_index(conn)
+        conn.commit()
+        conn.execute("INSERT INTO ideas_fts (ideas_fts, rank) VALUES ('integrity-check', 1)")
+        count = conn.execute('SELECT COUNT(*) FROM ideas').fetchone()[0]
+    click.echo(f"Search index rebuilt over {count} ideas")
+
+# Idea writes
+# Single submissions/reviews and their bulk counterparts share the points
+# engine, the description format and the INSERT below, so an imported or
+# bulk-approved idea is indistinguishable from one entered through the UI.
+IDEA_CATEGORIES = ('Innovation', 'Automation', 'Security')
+IDEA_BENEFIT_LEVELS = ('Marginal', 'Moderate', 'High', 'Very High', 'Gamechanger')
+
+# Upper bound on lines per import and items per bulk review
+IDEA_BULK_MAX = int(os.environ.get('IDEA_BULK_MAX', '10000'))
+
+# Optional free-text fields of an idea record
+IDEA_TEXT_FIELDS = (
+    'security_gap', 'possible_solution', 'automation_opportunity',
+    'automation_solution', 'innovative_idea', 'description'
+)
+
+IDEA_INSERT_SQL = '''
+    INSERT INTO ideas (
+        id, engineer_id, title, description, category, service_area, assigned_sdm_id,
+        implemented, benefit_level, security_gap, possible_solution,
+        automation_opportunity, automation_solution, innovative_idea, submission_date
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_DATE))
+'''
+
+def build_idea_description(data):
+    """Description text from the category-specific fields"""
+    description = ''
+    category = data['category']
+    if category == 'Security':
+        security_gap = data.get('security_gap', '').strip()
+        possible_solution = data.get('possible_solution', '').strip()
+        if security_gap:
+            description += f"Security Gap: {security_gap}"
+        if possible_solution:
+            if description:
+                description += ' | '
+            description += f"Possible Solution: {possible_solution}"
+    elif category == 'Automation':
+        automation_opportunity = data.get('automation_opportunity', '').strip()
+        automation_solution = data.get('automation_solution', '').strip()
+        if automation_opportunity:
+            description += f"Automation Opportunity: {automation_opportunity}"
+        if automation_solution:
+            if description:
+                description += ' | '
+            description += f"Automation Solution: {automation_solution}"
+    elif category == 'Innovation':
+        innovative_idea = data.get('innovative_idea', '').strip()
+        description = innovative_idea
+    return description
+
+def idea_insert_params(idea_id, engineer_id, assigned_sdm_id, data, description, submission_date=None):
+    """Parameters for IDEA_INSERT_SQL"""
+    return (
+        idea_id, engineer_id, data['title'], description, data['category'], data['service_area'],
+        assigned_sdm_id, data.get('implemented', False), data['benefit_level'],
+        data.get('security_gap', ''), data.get('possible_solution', ''),
+        data.get('automation_opportunity', ''), data.get('automation_solution', ''),
+        data.get('innovative_idea', ''), submission_date
+    )
+
+def resolve_users(conn, ids=(), usernames=()):
+    """Map user ids and usernames to (id, role) in a few IN queries"""
+    found = {}
+    for column, keys in (('id', list(set(ids))), ('username', list(set(usernames)))):
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            for row in conn.execute(
+                f"SELECT id, username, role FROM users WHERE {column} IN ({', '.join('?' * len(chunk))})",
+                chunk
+            ):
+                found[(column, row[column])] = (row['id'], row['role'])
+    return found
+
+def parse_import_line(data, default_sdm_id, users):
+    """Validate one import record; returns (engineer_id, sdm_id, description, date)"""
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object')
+    if isinstance(data.get('benefit_level'), int) and not isinstance(data['benefit_level'], bool):
+        data['benefit_level'] = str(data['benefit_level'])
+    for field in ('title', 'category', 'service_area', 'benefit_level'):
+        if not data.get(field) or not isinstance(data[field], str):
+            raise ValueError(f'{field} is required')
+    if data['category'] not in IDEA_CATEGORIES:
+        raise ValueError(f"category must be one of {', '.join(IDEA_CATEGORIES)}")
+    # The submit form sends the slider position (1-5), other sources the label
+    levels = (*IDEA_BENEFIT_LEVELS, *(str(level) for level in range(1, len(IDEA_BENEFIT_LEVELS) + 1)))
+    if data['benefit_level'] not in levels:
+        raise ValueError(f"benefit_level must be 1-{len(IDEA_BENEFIT_LEVELS)} or one of {', '.join(IDEA_BENEFIT_LEVELS)}")
+    if not isinstance(data.get('implemented', False), (bool, int)):
+        raise ValueError('implemented must be a boolean')
+    # Other tools export empty fields as null
+    for field in IDEA_TEXT_FIELDS:
+        if data.get(field) is None:
+            data[field] = ''
+        elif not isinstance(data[field], str):
+            raise ValueError(f'{field} must be a string')
+
+    def lookup(prefix, role):
+        if data.get(f'{prefix}_id'):
+            user = users.get(('id', data[f'{prefix}_id']))
+        elif data.get(f'{prefix}_username'):
+            user = users.get(('username', data[f'{prefix}_username']))
+        else:
+            return None
+        if not user or user[1] != role:
+            raise ValueError(f'Unknown {role}: {data.get(f"{prefix}_id") or data.get(f"{prefix}_username")}')
+        return user[0]
+    
+    engineer_id = lookup('engineer', 'Service Engineer')
+    if not engineer_id:
+        raise ValueError('engineer_id or engineer_username is required')
+    sdm_id = lookup('assigned_sdm', 'SDM') or default_sdm_id
+    
+    submission_date = data.get('submission_date')
+    if submission_date is not None:
+        try:
+            submission_date = datetime.strptime(submission_date, '%Y-%m-%d').date().isoformat()
+        except (TypeError, ValueError):
+            raise ValueError('submission_date must be YYYY-MM-DD')
+    
+    # Ideas exported from elsewhere often only have a free-text description
+    description = build_idea_description(data) or data['description'].strip()
+    return engineer_id, sdm_id, description, submission_date
+
+# Hot queries
+# Shared by the handlers and check_query_plans() so the plan check always
+# exercises exactly the SQL that runs in production.
+# Only what request.current_user needs; no password hash or avatar blob
+USER_BY_ID_SQL = 'SELECT id, username, display_name, email, role, avatar_hash FROM users WHERE id = ?'
+
+USER_BY_USERNAME_SQL = 'SELECT id, username, display_name, email, role, avatar_hash, password_hash FROM users WHERE username = ?'
+
+AVATAR_SQL = 'SELECT svg, svg_gzip FROM avatars WHERE hash = ?'
+
+IDEA_DETAILS_SQL = '''
+    SELECT 
+        i.*, 
+        u.display_name as engineer_name, u.username as engineer_username,
+        s.display_name as assigned_sdm_name
+    FROM ideas i
+    LEFT JOIN users u ON i.engineer_id = u.id
+    LEFT JOIN users s ON i.assigned_sdm_id = s.id
+    WHERE i.id IN ({placeholders})
+'''
+
+IDEA_DETAIL_SQL = IDEA_DETAILS_SQL.format(placeholders='?')
+
+# Top-N walk of idx_user_scores_points; cost is independent of idea count
+LEADERBOARD_SQL = f'''
+    SELECT 
+        u.display_name, u.username,
+        s.total_points, s.total_ideas,
+        {', '.join(f's.{column}_points' for column in SCORE_CATEGORY_COLUMNS.values())}
+    FROM user_scores s
+    JOIN users u ON u.id = s.engineer_id
+    WHERE s.total_points > 0
+    ORDER BY s.total_points DESC
+    LIMIT 50
+'''
+
+RECENT_ACTIVITIES_SQL = '''
+    SELECT 
+        i.category, i.submission_date, i.points,
+        u.display_name as engineer_name
+    FROM ideas i
+    JOIN users u ON i.engineer_id = u.id
+    WHERE i.status = 'approved' AND i.points > 0
+    ORDER BY i.updated_at DESC
+    LIMIT 10
+'''
+
+# Event stream rank changes: one engineer's total, then a count over
+# idx_user_scores_points of everyone above a total
+LEADERBOARD_ENTRY_SQL = '''
+    SELECT u.username, u.display_name, s.total_points
+    FROM user_scores s
+    JOIN users u ON u.id = s.engineer_id
+    WHERE s.engineer_id = ?
+'''
+
+LEADERBOARD_RANK_SQL = 'SELECT COUNT(*) FROM user_scores WHERE total_points > ?'
+
+SDMS_SQL = '''
+    SELECT id, username, display_name, email
+    FROM users
+    WHERE role = 'SDM'
+    ORDER BY display_name
+'''
+
+# name -> (sql, sample parameters) checked by check_query_plans()
+HOT_QUERIES = {
+    'token_required': (USER_BY_ID_SQL, ('user-id',)),
+    'login': (USER_BY_USERNAME_SQL, ('username',)),
+    'avatar': (AVATAR_SQL, ('0' * 64,)),
+    'get_my_ideas': idea_list_query('my_ideas', ('engineer-id',), cursor=('2024-01-01', 'idea-id'), limit=50),
+    'get_worklist': idea_list_query('worklist', ('sdm-id',), cursor=('2024-01-01', 'idea-id'), limit=50),
+    'get_idea': (IDEA_DETAIL_SQL, ('idea-id',)),
+    'get_idea_details': (IDEA_DETAILS_SQL.format(placeholders='?, ?, ?'), ('a', 'b', 'c')),
+    'get_approved_ideas': idea_list_query('approved', cursor=('2024-01-01', 'idea-id'), limit=50),
+    'get_approved_ideas.summary': idea_list_summary_query('approved'),
+    'get_leaderboard': (LEADERBOARD_SQL, ()),
+    'get_leaderboard.recent_activities': (RECENT_ACTIVITIES_SQL, ()),
+    'get_sdms': (SDMS_SQL, ()),
+    'approve_idea.point_rules': (ACTIVE_POINT_RULES_SQL, ()),
+    'events.leaderboard_entry': (LEADERBOARD_ENTRY_SQL, ('engineer-id',)),
+    'events.leaderboard_rank': (LEADERBOARD_RANK_SQL, (100,)),
+    'get_leaderboard.window': windowed_leaderboard_query('month', ['2024-01', '2024-02', '2024-03'], 'Security', 'AMS'),
+    'get_leaderboard.window_all': windowed_leaderboard_query('month', service_area='AMS'),
+    'search_ideas': idea_search_query('"automation"', [('i.category = ?', 'Automation')], viewer_id='engineer-id'),
+}
+
+def query_plan(conn, sql, params=()):
+    """EXPLAIN QUERY PLAN detail lines for sql"""
+    return [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {sql}', params)]
+
+# Aggregates whose input is bounded by design (a few rollup buckets), so
+# ranking them with a sort is expected; they must still not scan a table
+HOT_QUERIES_SORTED = {'get_leaderboard.window', 'get_leaderboard.window_all'}
+
+def check_query_plans(conn):
+    """Return {query name: [plan details]} for hot queries that scan or sort
+    
+    SCANs over materialized subqueries/CTEs are fine; a SCAN of users or
+    ideas means an index is missing or no longer matches the query, and a
+    temp B-tree for ORDER BY means every matching row is read and sorted
+    before LIMIT applies.
+    """
+    problems = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = query_plan(conn, sql, params)
+        derived = {
+            detail.split()[1] for detail in plan
+            if detail.startswith(('MATERIALIZE ', 'CO-ROUTINE '))
+        }
+        scans = [
+            detail for detail in plan
+            if (detail.startswith('SCAN ') and detail.split()[1] not in derived | {'CONSTANT'}
+                and 'VIRTUAL TABLE INDEX' not in detail)
+            or (detail.startswith('USE TEMP B-TREE FOR ORDER BY') and name not in HOT_QUERIES_SORTED)
+        ]
+        if scans:
+            problems[name] = scans
+    return problems
+
+@app.cli.command('check-query-plans')
+@click.option('--db', 'db_path', default=':memory:',
+              help='Database to check (defaults to a freshly migrated in-memory schema)')
+def check_query_plans_command(db_path):
+    """Fail if any hot query falls back to a full table scan or sort"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    if db_path == ':memory:':
+        run_migrations(conn)
+    problems = check_query_plans(conn)
+    conn.close()
+    
+    for name, scans in problems.items():
+        for detail in scans:
+            click.echo(f"{name}: {detail}", err=True)
+    if problems:
+        raise SystemExit(1)
+    click.echo(f"All {len(HOT_QUERIES)} hot queries use indexes")
+
+def init_database():
+    """Initialize database: apply schema migrations and seed default SDMs"""
+    # Create database directory if it doesn't exist
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    
+    with db_pool.connection() as conn:
+        run_migrations(conn)
+        
+        # Insert default SDMs
+        default_password = 'password123'
+        
+        default_sdms = [
+            {
+                'id': str(uuid.uuid4()),
+                'username': 'nachi',
+                'display_name': 'Nachi',
+                'email': 'nachi@company.com',
+                'role': 'SDM'
+            },
+            {
+                'id': str(uuid.uuid4()),
+                'username': 'admin',
+                'display_name': 'Admin',
+                'email': 'admin@company.com',
+                'role': 'SDM'
+            }
+        ]
+        
+        existing = {row['username'] for row in conn.execute(
+            f"SELECT username FROM users WHERE username IN ({', '.join('?' * len(default_sdms))})",
+            [sdm['username'] for sdm in default_sdms]
+        )}
+        avatar_upgrades = []
+        
+        # Hashing costs ~0.25s, so only pay for it when a seed user is missing
+        if len(existing) < len(default_sdms):
+            hashed_password = password_hasher.hash(default_password)
+        
+        for sdm in default_sdms:
+            if sdm['username'] in existing:
+                continue
+            
+            # Special avatar for Nachi
+            if sdm['display_name'] == 'Nachi':
+                # Create a custom avatar for Nachi
+                nachi_svg = '''<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100" viewBox="0 0 100 100">
+  <circle cx="50" cy="50" r="50" fill="#00D1FF"/>
+  <circle cx="35" cy="40" r="8" fill="#FFFFFF"/>
+  <circle cx="65" cy="40" r="8" fill="#FFFFFF"/>
+  <circle cx="35" cy="40" r="4" fill="#000000"/>
+  <circle cx="65" cy="40" r="4" fill="#000000"/>
+  <path d="M 30 65 Q 50 75 70 65" stroke="#FFFFFF" stroke-width="3" fill="none" stroke-linecap="round"/>
+  <text x="50" y="85" font-family="Arial, sans-serif" font-size="20" font-weight="bold" text-anchor="middle" fill="white">N</text>
+</svg>'''
+                avatar = store_avatar(conn, nachi_svg)
+            else:
+                avatar = store_avatar(conn, generate_avatar(sdm['display_name']))
+                avatar_upgrades.append((sdm['username'], sdm['display_name'], avatar))
+            
+            try:
+                conn.execute('''
+                    INSERT OR IGNORE INTO users (id, username, display_name, email, password_hash, role, avatar_hash)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (sdm['id'], sdm['username'], sdm['display_name'], sdm['email'], 
+                      hashed_password, sdm['role'], avatar))
+            except sqlite3.IntegrityError:
+                pass  # User already exists
+        
+        conn.commit()
+    for username, display_name, avatar in avatar_upgrades:
+        avatar_worker.submit(username, display_name, avatar)
+    print("Database initialized successfully")
+
+# Response cache
+# Public payloads that only change when ideas are reviewed are serialized once
+# per generation and served as bytes with a content-derived strong ETag.
+# Writers call response_cache.invalidate() after committing. The cache is per
+# process, so RESPONSE_CACHE_TTL bounds how long another worker's write can
+# go unnoticed. Keys come from public query parameters, so the cache is an
+# LRU capped at RESPONSE_CACHE_SIZE entries and every store first drops the
+# entries that have expired.
+class ResponseCache:
+    """Generation-versioned, size-capped LRU of pre-serialized JSON bodies"""
+
+    def __init__(self, ttl=5.0, max_size=256):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+
+    def invalidate(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._counters['invalidations'] += 1
+
+    def get(self, key, build):
+        """Return (body, etag) for key, calling build() for the payload on a miss"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            generation = self.generation
+            if entry and entry['generation'] == generation and now - entry['built_at'] < self.ttl:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return entry['body'], entry['etag']
+            self._counters['misses'] += 1
+        
+        body = app.json.dumps(build()).encode('utf-8')
+        etag = hashlib.sha1(body).hexdigest()
+        
+        with self._lock:
+            # Drop the result if a write invalidated the cache while building
+            if self.generation == generation:
+                expired = [k for k, e in self._entries.items() if now - e['built_at'] >= self.ttl]
+                for k in expired:
+                    del self._entries[k]
+                self._counters['expired'] += len(expired)
+                self._entries[key] = {'generation': generation, 'built_at': now, 'body': body, 'etag': etag}
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self._counters['evictions'] += 1
+        return body, etag
+
+    def stats(self):
+        with self._lock:
+            return {
+                'generation': self.generation,
+                'entries': len(self._entries),
+                'max_size': self.max_size,
+                **self._counters
+            }
+
+response_cache = ResponseCache(ttl=RESPONSE_CACHE_TTL, max_size=RESPONSE_CACHE_SIZE)
+
+def cached_json_response(key, build):
+    """Serve build()'s payload from response_cache, honouring If-None-Match"""
+    body, etag = response_cache.get(key, build)
+    
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = RESPONSE_CACHE_MAX_AGE
+    return response
+
+# Authenticated user cache
+# token_required resolves the JWT's user id to a principal through this cache
+# instead of querying users on every request. Anything that changes a user
+# row calls user_cache.invalidate(user_id) after committing; USER_CACHE_TTL
+# bounds how long other workers keep serving the old principal.
+class UserCache:
+    """Bounded TTL + LRU cache of user principals keyed by user id"""
+
+    def __init__(self, max_size=1024, ttl=60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # user id -> (expires_at, principal)
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, user_id, load):
+        """Principal for user_id, calling load(user_id) on a miss (None = no such user)"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self._counters['hits'] += 1
+                return entry[1]
+            if entry:
+                del self._entries[user_id]
+                self._counters['expired'] += 1
+            self._counters['misses'] += 1
+            generation = self._generation
+        
+        principal = load(user_id)
+        
+        with self._lock:
+            # Unknown users are not cached, and neither is a principal that
+            # an invalidation may have made stale while it was being loaded
+            if principal is not None and self._generation == generation:
+                self._entries[user_id] = (now + self.ttl, principal)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self._counters['evictions'] += 1
+        return principal
+
+    def invalidate(self, user_id=None):
+        """Forget one user, or everyone when user_id is None"""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+            self._counters['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_size': self.max_size, 'ttl': self.ttl, **self._counters}
+
+user_cache = UserCache(max_size=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+
+def load_principal(user_id):
+    """request.current_user for user_id, straight from the database"""
+    user = get_db_connection().execute(USER_BY_ID_SQL, (user_id,)).fetchone()
+    if not user:
+        return None
+    return {
+        'id': user['id'],
+        'username': user['username'],
+        'display_name': user['display_name'],
+        'email': user['email'],
+        'role': user['role'],
+        'avatar_url': avatar_url(user['avatar_hash'])
+    }
+
+# Password hashing
+# bcrypt is deliberately slow, so it runs on a small dedicated pool instead of
+# the request threads' own CPU budget. At most PASSWORD_WORKERS hashes run at
+# once and PASSWORD_QUEUE_LIMIT more may wait; beyond that callers get
+# PasswordHasherBusy straight away and answer 503 with Retry-After, which
+# keeps a login storm from starving every other endpoint.
+class PasswordHasherBusy(Exception):
+    """Raised when the password pool and its queue are full"""
+
+class PasswordHasher:
+    """Bounded executor for bcrypt hashing and verification"""
+
+    def __init__(self, rounds=12, workers=4, queue_limit=32):
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self._counters = {'hashes': 0, 'verifies': 0, 'rehashes': 0, 'rejected': 0, 'in_flight': 0}
+        self._seconds = 0.0
+
+    # counter name -> metrics operation label
+    _OPERATIONS = {'hashes': 'hash', 'verifies': 'verify', 'rehashes': 'rehash'}
+
+    def _timed(self, name, fn, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            metrics.observe('password_hash_seconds', (('operation', self._OPERATIONS[name]),), elapsed)
+            with self._lock:
+                self._counters[name] += 1
+                self._seconds += elapsed
+
+    def _submit(self, name, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._counters['rejected'] += 1
+            raise PasswordHasherBusy()
+        with self._lock:
+            self._counters['in_flight'] += 1
+        
+        def release(_):
+            with self._lock:
+                self._counters['in_flight'] -= 1
+            self._slots.release()
+        
+        future = self._executor.submit(self._timed, name, fn, *args)
+        future.add_done_callback(release)
+        return future
+
+    def _hash(self, password):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+
+    def hash(self, password):
+        """bcrypt hash of password at the configured cost"""
+        return self._submit('hashes', self._hash, password).result()
+
+    def verify(self, password, password_hash):
+        return self._submit(
+            'verifies', bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8')
+        ).result()
+
+    def needs_rehash(self, password_hash):
+        """True if password_hash was made with a different cost factor"""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def rehash_later(self, user_id, password):
+        """Re-hash at the current cost in the background (skipped when busy)"""
+        def rehash():
+            password_hash = self._hash(password)
+            with db_pool.connection() as conn:
+                conn.execute('UPDATE users SET password_hash = ? WHERE id = ?', (password_hash, user_id))
+                conn.commit()
+        try:
+            self._submit('rehashes', rehash)
+        except PasswordHasherBusy:
+            pass  # try again on a later login
+
+    def stats(self):
+        with self._lock:
+            return {'rounds': self.rounds, 'seconds': round(self._seconds, 3), **self._counters}
+
+password_hasher = PasswordHasher(PASSWORD_HASH_ROUNDS, PASSWORD_WORKERS, PASSWORD_QUEUE_LIMIT)
+
+def password_busy_response():
+    response = jsonify({'error': 'Server busy, please retry shortly'})
+    response.headers['Retry-After'] = str(PASSWORD_RETRY_AFTER)
+    return response, 503
+
+# Event stream
+# Writers publish small deltas after committing and GET /api/events pushes
+# them to connected browsers, so open views update without polling. Every
+# client gets a bounded buffer; one that falls behind loses its backlog and
+# is told to resync (re-fetch) instead of growing without limit. A waiting
+# client is a thread blocked on its queue, so idle clients cost no CPU, and
+# publishers skip work nobody would receive. Events are per process: with
+# several workers a client only sees writes handled by its own worker plus
+# a resync whenever it reconnects to another one.
+class EventBrokerFull(Exception):
+    """Raised when EVENTS_MAX_CLIENTS streams are already open"""
+
+class EventSubscriber:
+    def __init__(self, user_id, buffer_size):
+        self.user_id = user_id
+        self.queue = queue.Queue(buffer_size)
+        self.overflowed = False
+
+class EventBroker:
+    """In-process pub/sub fanning events out to SSE clients"""
+    
+    RESYNC = 'event: resync\ndata: {}\n\n'
+
+    def __init__(self, max_clients, buffer_size, replay_size):
+        self.max_clients = max_clients
+        self.buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        # Recent (sequence, audience, frame) so reconnecting clients can
+        # resume from Last-Event-ID; ids carry a per-process prefix so an id
+        # from another worker or a previous run is never mistaken for ours
+        self._replay = deque(maxlen=replay_size)
+        self._instance = uuid.uuid4().hex[:8]
+        self._sequence = 0
+        self._closed = False
+        self._counters = {'published': 0, 'delivered': 0, 'dropped': 0, 'resyncs': 0, 'rejected': 0}
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def publish(self, event_type, data, audience=None):
+        """Send an event to everyone (audience=None) or to a set of user ids"""
+        with self._lock:
+            self._sequence += 1
+            frame = (
+                f"id: {self._instance}-{self._sequence}\n"
+                f"event: {event_type}\n"
+                f"data: {json.dumps(data, separators=(',', ':'), default=str)}\n\n"
+            )
+            self._replay.append((self._sequence, audience, frame))
+            self._counters['published'] += 1
+            for subscriber in self._subscribers:
+                if audience is None or subscriber.user_id in audience:
+                    self._offer(subscriber, frame)
+
+    def _offer(self, subscriber, frame):
+        try:
+            subscriber.queue.put_nowait(frame)
+            self._counters['delivered'] += 1
+        except queue.Full:
+            subscriber.overflowed = True
+            self._counters['dropped'] += 1
+
+    def subscribe(self, user_id=None, last_event_id=None):
+        """Register a client, replaying what it missed since last_event_id"""
+        subscriber = EventSubscriber(user_id, self.buffer_size)
+        with self._lock:
+            if self._closed or len(self._subscribers) >= self.max_clients:
+                self._counters['rejected'] += 1
+                raise EventBrokerFull()
+            if last_event_id:
+                instance, _, sequence = last_event_id.partition('-')
+                oldest = self._replay[0][0] if self._replay else self._sequence + 1
+                if instance != self._instance or not sequence.isdigit() or int(sequence) + 1 < oldest:
+                    subscriber.overflowed = True  # too far behind to replay
+                else:
+                    for number, audience, frame in self._replay:
+                        if number > int(sequence) and (audience is None or user_id in audience):
+                            self._offer(subscriber, frame)
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def close(self):
+        """End every open stream (on shutdown); clients reconnect elsewhere"""
+        with self._lock:
+            self._closed = True
+            for subscriber in self._subscribers:
+                while True:
+                    try:
+                        subscriber.queue.put_nowait(None)
+                        break
+                    except queue.Full:
+                        try:
+                            subscriber.queue.get_nowait()
+                        except queue.Empty:
+                            pass
+
+    def stream(self, subscriber, heartbeat=EVENTS_HEARTBEAT):
+        """SSE frames for one client; unsubscribes when the client goes away"""
+        try:
+            yield 'retry: 2000\n\n'
+            while True:
+                if subscriber.overflowed:
+                    # Drop the stale backlog and have the client re-fetch
+                    subscriber.overflowed = False
+                    while True:
+                        try:
+                            subscriber.queue.get_nowait()
+                        except queue.Empty:
+                            break
+                    with self._lock:
+                        self._counters['resyncs'] += 1
+                    yield self.RESYNC
+                    continue
+                try:
+                    frame = subscriber.queue.get(timeout=heartbeat)
+                except queue.Empty:
+                    # Comment line keeps proxies from closing the connection
+                    # and lets us notice clients that have gone away
+                    yield ': keep-alive\n\n'
+                    continue
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.unsubscribe(subscriber)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clients': len(self._subscribers),
+                'max_clients': self.max_clients,
+                **self._counters
+            }
+
+event_broker = EventBroker(EVENTS_MAX_CLIENTS, EVENTS_BUFFER_SIZE, EVENTS_REPLAY_SIZE)
+
+def publish_leaderboard_changes(conn, deltas):
+    """Publish new/previous ranks for engineers whose totals moved
+    
+    deltas maps engineer_id -> points gained (negative when lost); call after
+    committing. Skipped entirely while nobody is listening.
+    """
+    if not event_broker.has_subscribers():
+        return
+    changes = []
+    for engineer_id, gained in deltas.items():
+        row = conn.execute(LEADERBOARD_ENTRY_SQL, (engineer_id,)).fetchone()
+        if not row or not gained:
+            continue
+        total, previous = row['total_points'], row['total_points'] - gained
+        # Others' totals did not change, so ranks are counts of engineers
+        # above each total (excluding this engineer at its new total)
+        rank = conn.execute(LEADERBOARD_RANK_SQL, (total,)).fetchone()[0] + 1 if total > 0 else None
+        previous_rank = None
+        if previous > 0:
+            above = conn.execute(LEADERBOARD_RANK_SQL, (previous,)).fetchone()[0]
+            previous_rank = above + 1 - (total > previous)
+        changes.append({
+            'username': row['username'],
+            'display_name': row['display_name'],
+            'total_points': total,
+            'rank': rank,
+            'previous_rank': previous_rank
+        })
+    if changes:
+        event_broker.publish('leaderboard', {'changes': changes})
+
+# Similarity index
+# Fitting learns the TF-IDF vocabulary and IDF weights once. Afterwards new
+# ideas are transformed with the frozen vocabulary and appended, rejected ideas
+# are masked out, and a background thread reconciles with the database, saves
+# the index next to it and refits once enough of the corpus has changed.
+SIMILARITY_STATUSES = ('pending', 'approved')
+SIMILARITY_INDEX_PATH = os.path.join(os.path.dirname(DB_PATH), 'similarity_index')
+SIMILARITY_MAINTENANCE_INTERVAL = float(os.environ.get('SIMILARITY_MAINTENANCE_INTERVAL', '30'))
+SIMILARITY_REFIT_INTERVAL = float(os.environ.get('SIMILARITY_REFIT_INTERVAL', '3600'))
+SIMILARITY_REFIT_RATIO = 0.2
+SIMILARITY_THRESHOLD = 0.1
+SIMILARITY_TOP_K = 5
+SIMILARITY_DUPLICATE_THRESHOLD = 0.5
+SIMILARITY_BATCH_LIMIT = 500
+SIMILARITY_TAIL_MERGE = 2000
+
+# Drafts checked as the engineer types (see DraftMatcher)
+SIMILARITY_DRAFT_MIN_CHARS = 12
+SIMILARITY_DRAFT_MAX_CHARS = 5000
+SIMILARITY_DRAFT_CACHE_SIZE = int(os.environ.get('SIMILARITY_DRAFT_CACHE_SIZE', '1024'))
+SIMILARITY_DRAFT_CACHE_TTL = float(os.environ.get('SIMILARITY_DRAFT_CACHE_TTL', '30'))
+
+# Approximate search: with SIMILARITY_BACKEND=minhash, from
+# SIMILARITY_ANN_MIN_DOCS documents on the LSH proposes candidates and only
+# those are scored exactly. Off by default: on synthetic 100k corpora the
+# inverted-index scan was both faster and exact, so only switch it on once
+# similarity-benchmark shows a latency win at an acceptable recall.
+SIMILARITY_BACKEND = os.environ.get('SIMILARITY_BACKEND', 'exact')
+SIMILARITY_ANN_MIN_DOCS = int(os.environ.get('SIMILARITY_ANN_MIN_DOCS', '100000'))
+SIMILARITY_LSH_BANDS = int(os.environ.get('SIMILARITY_LSH_BANDS', '32'))
+SIMILARITY_LSH_ROWS = int(os.environ.get('SIMILARITY_LSH_ROWS', '1'))
+SIMILARITY_LSH_MAX_CANDIDATES = int(os.environ.get('SIMILARITY_LSH_MAX_CANDIDATES', '5000'))
+
+SIMILARITY_CORPUS_SQL = f'''
+    SELECT id, title, description, status
+    FROM ideas
+    WHERE status IN ({', '.join(f"'{status}'" for status in SIMILARITY_STATUSES)})
+'''
+
+def similarity_text(title, description):
+    """Normalized text that similarity checks compare (title + description)"""
+    text = f"{title or ''} {description or ''}".strip().lower()
+    return re.sub(r'[^\w\s]', '', text)
+
+# numpy/scipy/scikit-learn, bound by load_similarity_stack() on first use
+np = sparse = connected_components = CountVectorizer = TfidfVectorizer = normalize = None
+_similarity_stack_lock = threading.Lock()
+
+def load_similarity_stack():
+    """Import the numeric/ML modules the similarity index needs (idempotent)"""
+    global np, sparse, connected_components, CountVectorizer, TfidfVectorizer, normalize
+    if normalize is not None:
+        return
+    with _similarity_stack_lock:
+        if normalize is not None:
+            return
+        import numpy
+        from scipy import sparse as scipy_sparse
+        from scipy.sparse.csgraph import connected_components as scipy_connected_components
+        from sklearn.feature_extraction.text import CountVectorizer as count_vectorizer, TfidfVectorizer as tfidf_vectorizer
+        from sklearn.preprocessing import normalize as sklearn_normalize
+        np, sparse, connected_components = numpy, scipy_sparse, scipy_connected_components
+        CountVectorizer, TfidfVectorizer = count_vectorizer, tfidf_vectorizer
+        normalize = sklearn_normalize  # bound last: marks the stack as loaded
+
+class MinHashLSH:
+    """Approximate candidate search over each idea's unigram/bigram term set
+
+    Every document gets bands * rows MinHash values; two documents become
+    candidates when all `rows` values of any band agree, and candidates are
+    then re-ranked exactly on their TF-IDF vectors. More bands raise recall,
+    more rows per band shrink buckets (lower latency), and max_candidates
+    caps the re-rank work by keeping the ideas that collide in most bands.
+    """
+
+    PRIME = (1 << 31) - 1
+
+    def __init__(self, bands=32, rows=1, max_candidates=5000, seed=1):
+        load_similarity_stack()
+        self.bands = bands
+        self.rows = rows
+        self.max_candidates = max_candidates
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, self.PRIME, bands * rows, dtype=np.uint64)
+        self._b = rng.integers(0, self.PRIME, bands * rows, dtype=np.uint64)
+        self._mix = rng.integers(1, 1 << 62, rows, dtype=np.uint64) | np.uint64(1)
+        self._sorted_keys = np.zeros((bands, 0), dtype=np.uint64)
+        self._sorted_rows = np.zeros((bands, 0), dtype=np.int64)
+
+    def _band_keys(self, matrix):
+        """(n, bands) bucket keys for the column sets of CSR rows"""
+        signatures = np.full((matrix.shape[0], self.bands * self.rows), self.PRIME, dtype=np.uint64)
+        for start in range(0, matrix.shape[0], 512):
+            chunk = matrix[start:start + 512]
+            if not chunk.nnz:
+                continue
+            columns = chunk.indices.astype(np.uint64)
+            hashes = (self._a[:, None] * columns[None, :] + self._b[:, None]) % self.PRIME
+            has_terms = np.diff(chunk.indptr) > 0
+            signatures[start:start + chunk.shape[0]][has_terms] = np.minimum.reduceat(
+                hashes, chunk.indptr[:-1][has_terms], axis=1
+            ).T
+        shaped = signatures.reshape(-1, self.bands, self.rows)
+        return (shaped * self._mix).sum(axis=2)  # wraps mod 2**64
+
+    def build(self, matrix):
+        """Index every row of a CSR matrix; row numbers are the positions returned"""
+        rows = np.flatnonzero(np.diff(matrix.indptr) > 0)
+        keys = self._band_keys(matrix[rows]).T
+        order = np.argsort(keys, axis=1, kind='stable')
+        self._sorted_keys = np.take_along_axis(keys, order, axis=1)
+        self._sorted_rows = rows[order]
+
+    def candidates(self, vector):
+        """Row positions sharing at least one band bucket with a CSR row"""
+        if not vector.nnz:
+            return np.zeros(0, dtype=np.int64)
+        keys = self._band_keys(vector)[0]
+        found = []
+        for band, key in enumerate(keys):
+            lo = np.searchsorted(self._sorted_keys[band], key, side='left')
+            hi = np.searchsorted(self._sorted_keys[band], key, side='right')
+            found.append(self._sorted_rows[band, lo:hi])
+        
+        candidates, collisions = np.unique(np.concatenate(found), return_counts=True)
+        if len(candidates) > self.max_candidates:
+            candidates = np.sort(candidates[np.argpartition(-collisions, self.max_candidates - 1)[:self.max_candidates]])
+        return candidates
+
+    def stats(self):
+        return {
+            'backend': 'minhash',
+            'bands': self.bands,
+            'rows': self.rows,
+            'max_candidates': self.max_candidates,
+            'indexed': self._sorted_rows.shape[1]
+        }
+
+# SIMILARITY_BACKEND name -> factory for the candidate index ('exact' = full scan)
+SIMILARITY_BACKENDS = {
+    'exact': lambda: None,
+    'minhash': lambda: MinHashLSH(SIMILARITY_LSH_BANDS, SIMILARITY_LSH_ROWS, SIMILARITY_LSH_MAX_CANDIDATES)
+}
+
+# Consistent read-only view of the index taken under its lock
+IndexView = namedtuple('IndexView', 'matrix postings tail tail_postings ann ids positions alive')
+
+class SimilarityIndex:
+    """In-memory TF-IDF matrix of pending/approved ideas, persisted to disk
+
+    Rows live in a base CSR matrix (with an inverted term -> document copy
+    and the ANN index built over it) plus a small tail of ideas added since,
+    which is always scored exactly and folded into the base in the
+    background once it reaches SIMILARITY_TAIL_MERGE rows.
+    """
+
+    def __init__(self, path, backend=SIMILARITY_BACKEND):
+        self.path = path
+        self._ann_factory = SIMILARITY_BACKENDS[backend]
+        self._lock = threading.RLock()
+        self._save_lock = threading.Lock()
+        self._ready = False
+        self._generation = 0  # bumped whenever the base is replaced
+        self._vectorizer = None  # CountVectorizer over the fitted vocabulary
+        self._idf = None
+        self._matrix = None  # base CSR, one L2-normalized row per document
+        self._postings = None  # base transposed (terms x documents)
+        self._ann = None
+        self._tail_rows = []
+        self._tail = None  # stacked tail rows and postings, rebuilt lazily
+        self._tail_postings = None
+        self._ids = []
+        self._statuses = []
+        self._positions = {}
+        self._alive = None  # per-row mask, allocated by _install
+        self._changes = 0  # adds/removes since the last fit
+        self._dirty = False  # changes not yet saved
+        self._fitted_at = 0.0
+        self._maintenance_thread = None
+        self._counters = {'fits': 0, 'loads': 0, 'saves': 0, 'merges': 0, 'queries': 0}
+        self._last_fit_seconds = None
+
+    @property
+    def ready(self):
+        return self._ready
+
+    def ensure_ready(self):
+        """Load the saved index (or fit a new one) and start maintenance"""
+        if self._ready:
+            return
+        load_similarity_stack()
+        with self._lock:
+            if self._ready:
+                return
+            try:
+                self._load()
+                self.reconcile()
+            except Exception as e:
+                if not isinstance(e, FileNotFoundError):
+                    print(f"Similarity index not loaded, refitting: {e}")
+                self.refit()
+            self._ready = True
+            self._start_maintenance()
+
+    def _transform(self, texts):
+        if not len(self._idf):
+            return sparse.csr_matrix((len(texts), 0), dtype=np.float32)
+        counts = self._vectorizer.transform(texts).astype(np.float32)
+        return normalize(counts.multiply(self._idf).tocsr())
+
+    def _build_base(self, matrix):
+        """(postings, ann) for a base matrix; slow, so called outside the lock"""
+        ann = self._ann_factory()
+        if ann is not None:
+            ann.build(matrix)
+        return matrix.T.tocsr(), ann
+
+    def _install(self, vocabulary, idf, matrix, ids, statuses, base):
+        self._vectorizer = CountVectorizer(
+            stop_words='english', ngram_range=(1, 2), vocabulary=vocabulary
+        )
+        self._idf = np.asarray(idf, dtype=np.float32)
+        self._matrix = matrix
+        self._postings, self._ann = base
+        self._tail_rows = []
+        self._tail = self._tail_postings = None
+        self._ids = list(ids)
+        self._statuses = list(statuses)
+        self._positions = {idea_id: i for i, idea_id in enumerate(self._ids)}
+        self._alive = np.ones(len(self._ids), dtype=bool)
+        self._generation += 1
+
+    def set_ann_factory(self, factory):
+        """Switch the ANN backend (a factory returning None means exact scans)"""
+        self.ensure_ready()
+        with self._lock:
+            self._ann_factory = factory
+            self._merge_tail()
+
+    def refit(self):
+        """Relearn vocabulary and IDF from the database and rebuild the matrix"""
+        load_similarity_stack()
+        started = time.perf_counter()
+        with db_pool.connection() as conn:
+            rows = conn.execute(SIMILARITY_CORPUS_SQL).fetchall()
+        
+        ids = [row['id'] for row in rows]
+        statuses = [row['status'] for row in rows]
+        texts = [similarity_text(row['title'], row['description']) for row in rows]
+        
+        vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2), dtype=np.float32)
+        try:
+            matrix = vectorizer.fit_transform(texts)
+            vocabulary, idf = vectorizer.vocabulary_, vectorizer.idf_
+        except ValueError:
+            # Empty corpus or nothing but stop words
+            matrix, vocabulary, idf = sparse.csr_matrix((len(ids), 0), dtype=np.float32), {}, []
+        matrix = matrix.tocsr()
+        base = self._build_base(matrix)
+        
+        with self._lock:
+            self._install(vocabulary, idf, matrix, ids, statuses, base)
+            self._changes = 0
+            self._fitted_at = time.time()
+            self._counters['fits'] += 1
+            self._last_fit_seconds = round(time.perf_counter() - started, 4)
+        metrics.observe('similarity_fit_seconds', (), self._last_fit_seconds)
+        self.save()
+        
+        # Catch writes that landed while we were fitting
+        self.reconcile()
+
+    def add(self, idea_id, title, description, status='pending'):
+        """Append a new idea using the current vocabulary (no-op until ready)"""
+        if self._ready:
+            self._add(idea_id, title, description, status)
+
+    def add_many(self, ideas):
+        """add() for many (idea_id, title, description, status) tuples at once"""
+        if self._ready:
+            self._add_many(ideas)
+
+    def remove(self, idea_id):
+        """Drop an idea (e.g. rejected) from future results"""
+        if self._ready:
+            self._remove(idea_id)
+
+    def set_status(self, idea_id, status):
+        if self._ready:
+            self._set_status(idea_id, status)
+
+    def _add(self, idea_id, title, description, status):
+        self._add_many([(idea_id, title, description, status)])
+
+    def _add_many(self, ideas):
+        with self._lock:
+            ideas = [
+                idea for idea in ideas
+                if not (idea[0] in self._positions and self._alive[self._positions[idea[0]]])
+            ]
+            if not ideas:
+                return
+            # One transform and one tail block for the whole batch
+            self._tail_rows.append(self._transform([
+                similarity_text(title, description) for _, title, description, _ in ideas
+            ]))
+            self._tail = self._tail_postings = None
+            for idea_id, _, _, status in ideas:
+                self._positions[idea_id] = len(self._ids)
+                self._ids.append(idea_id)
+                self._statuses.append(status)
+            self._alive = np.concatenate([self._alive, np.ones(len(ideas), dtype=bool)])
+            self._changes += len(ideas)
+            self._dirty = True
+
+    def _tail_size(self):
+        return len(self._ids) - self._matrix.shape[0] if self._matrix is not None else 0
+
+    def _remove(self, idea_id):
+        with self._lock:
+            position = self._positions.pop(idea_id, None)
+            if position is None:
+                return
+            self._alive[position] = False
+            self._changes += 1
+            self._dirty = True
+
+    def _set_status(self, idea_id, status):
+        with self._lock:
+            position = self._positions.get(idea_id)
+            if position is not None and self._statuses[position] != status:
+                self._statuses[position] = status
+                self._dirty = True
+
+    def _snapshot(self):
+        """IndexView of the current state; safe to read without the lock"""
+        with self._lock:
+            if self._tail_rows and self._tail is None:
+                self._tail = sparse.vstack(self._tail_rows, format='csr')
+                self._tail_postings = self._tail.T.tocsr()
+            return IndexView(
+                self._matrix, self._postings, self._tail, self._tail_postings, self._ann,
+                self._ids, self._positions, self._alive[:len(self._ids)].copy()
+            )
+
+    def _merge_tail(self):
+        """Fold the tail into the base, rebuilding postings and the ANN index"""
+        view = self._snapshot()
+        generation = self._generation
+        matrix = view.matrix
+        if view.tail is not None:
+            matrix = sparse.vstack([view.matrix, view.tail], format='csr')
+        base = self._build_base(matrix)
+        
+        with self._lock:
+            if self._generation != generation:
+                return  # refit replaced the base meanwhile
+            merged = 0 if view.tail is None else view.tail.shape[0]
+            self._matrix = matrix
+            self._postings, self._ann = base
+            # Rows added while merging stay in the tail
+            while merged > 0:
+                merged -= self._tail_rows.pop(0).shape[0]
+            self._tail = self._tail_postings = None
+            self._generation += 1
+            self._counters['merges'] += 1
+
+    def transform(self, texts):
+        """Vectorize texts with the fitted vocabulary (L2-normalized CSR rows)"""
+        self.ensure_ready()
+        with self._lock:
+            return self._transform(texts)
+
+    def query(self, text, k=SIMILARITY_TOP_K, threshold=SIMILARITY_THRESHOLD, exclude_ids=()):
+        """Return up to k (idea id, score) pairs scoring above threshold"""
+        return self.query_vectors(self.transform([text]), k, threshold, [exclude_ids])[0]
+
+    def query_vectors(self, vectors, k=SIMILARITY_TOP_K, threshold=SIMILARITY_THRESHOLD,
+                      exclude_ids=None, mode='auto'):
+        """Top-k (idea id, score) lists for each row of vectors
+        
+        Rows are L2-normalized, so dot products are cosine similarity. Small
+        corpora are scored with one sparse product against the inverted
+        index; from SIMILARITY_ANN_MIN_DOCS on only the candidates proposed
+        by the ANN backend (plus the tail) are scored. mode='exact' or 'ann'
+        forces either path. exclude_ids optionally gives ids to skip per row.
+        """
+        view = self._snapshot()
+        with self._lock:
+            self._counters['queries'] += vectors.shape[0]
+        
+        results = [[] for _ in range(vectors.shape[0])]
+        if not vectors.nnz or not len(view.ids):
+            return results
+        
+        base_size = view.matrix.shape[0]
+        if mode == 'auto':
+            use_ann = view.ann is not None and base_size >= SIMILARITY_ANN_MIN_DOCS
+        else:
+            use_ann = view.ann is not None and mode == 'ann'
+        
+        if use_ann:
+            tail_scores = vectors @ view.tail_postings if view.tail is not None else None
+        else:
+            parts = [vectors @ view.postings]
+            if view.tail is not None:
+                parts.append(vectors @ view.tail_postings)
+            scores = sparse.hstack(parts, format='csr')
+        
+        for row in range(vectors.shape[0]):
+            if use_ann:
+                vector = vectors[row]
+                columns = view.ann.candidates(vector)
+                values = view.matrix[columns][:, vector.indices] @ vector.data
+                if tail_scores is not None:
+                    start, end = tail_scores.indptr[row], tail_scores.indptr[row + 1]
+                    columns = np.concatenate([columns, tail_scores.indices[start:end] + base_size])
+                    values = np.concatenate([values, tail_scores.data[start:end]])
+            else:
+                start, end = scores.indptr[row], scores.indptr[row + 1]
+                columns, values = scores.indices[start:end], scores.data[start:end]
+            
+            keep = view.alive[columns] & (values > threshold)
+            if exclude_ids:
+                for idea_id in exclude_ids[row]:
+                    position = view.positions.get(idea_id)
+                    if position is not None:
+                        keep &= columns != position
+            columns, values = columns[keep], values[keep]
+            
+            if len(values) > k:
+                top = np.argpartition(-values, k - 1)[:k]
+                columns, values = columns[top], values[top]
+            order = np.argsort(-values)
+            results[row] = [(view.ids[columns[i]], float(values[i])) for i in order]
+        return results
+
+    def benchmark(self, queries=200, k=SIMILARITY_TOP_K, seed=0):
+        """Recall@k and per-query latency of the ANN backend vs the exact scan
+        
+        Uses randomly sampled indexed ideas as queries (excluding themselves).
+        """
+        self.ensure_ready()
+        self._merge_tail()
+        view = self._snapshot()
+        live = np.flatnonzero(view.alive[:view.matrix.shape[0]] & (np.diff(view.matrix.indptr) > 0))
+        sample = np.random.default_rng(seed).choice(live, min(queries, len(live)), replace=False)
+        
+        timings = {'exact': [], 'ann': []}
+        hits = relevant = duplicate_hits = duplicates = 0
+        for position in sample:
+            vector, exclude = view.matrix[position], [(view.ids[position],)]
+            found = {}
+            for mode in ('exact', 'ann'):
+                started = time.perf_counter()
+                found[mode] = self.query_vectors(vector, k, exclude_ids=exclude, mode=mode)[0]
+                timings[mode].append((time.perf_counter() - started) * 1000)
+            expected = {idea_id for idea_id, _ in found['exact']}
+            near = {idea_id for idea_id, score in found['exact'] if score > SIMILARITY_DUPLICATE_THRESHOLD}
+            returned = {idea_id for idea_id, _ in found['ann']}
+            hits += len(expected & returned)
+            relevant += len(expected)
+            duplicate_hits += len(near & returned)
+            duplicates += len(near)
+        
+        report = {
+            'documents': len(live),
+            'queries': len(sample),
+            'k': k,
+            'recall': round(hits / relevant, 4) if relevant else None,
+            'duplicate_recall': round(duplicate_hits / duplicates, 4) if duplicates else None,
+            'ann': view.ann.stats() if view.ann is not None else {'backend': 'exact'}
+        }
+        for mode, values in timings.items():
+            if values:
+                report[f'{mode}_ms'] = {
+                    'p50': round(float(np.percentile(values, 50)), 3),
+                    'p95': round(float(np.percentile(values, 95)), 3),
+                    'max': round(max(values), 3)
+                }
+        return report
+
+    def reconcile(self):
+        """Bring the index in line with the database (other workers' writes)"""
+        with db_pool.connection() as conn:
+            current = dict(conn.execute(
+                f"SELECT id, status FROM ideas WHERE status IN ({', '.join('?' * len(SIMILARITY_STATUSES))})",
+                SIMILARITY_STATUSES
+            ).fetchall())
+            with self._lock:
+                indexed = {idea_id for idea_id, position in self._positions.items() if self._alive[position]}
+            missing = [idea_id for idea_id in current if idea_id not in indexed]
+            rows = []
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows += conn.execute(
+                    f"SELECT id, title, description, status FROM ideas WHERE id IN ({', '.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+        
+        self._add_many([(row['id'], row['title'], row['description'], row['status']) for row in rows])
+        for idea_id in indexed - current.keys():
+            self._remove(idea_id)
+        for idea_id, status in current.items():
+            self._set_status(idea_id, status)
+
+    def _needs_refit(self):
+        if not self._changes:
+            return False
+        if self._changes >= SIMILARITY_REFIT_RATIO * len(self._positions):
+            return True
+        return time.time() - self._fitted_at >= SIMILARITY_REFIT_INTERVAL
+
+    def maintain(self):
+        """One maintenance pass: reconcile, then refit, merge or save as needed"""
+        self.reconcile()
+        if self._needs_refit():
+            self.refit()
+            return
+        if self._tail_size() >= SIMILARITY_TAIL_MERGE:
+            self._merge_tail()
+        if self._dirty:
+            self.save()
+
+    def _start_maintenance(self):
+        if self._maintenance_thread or SIMILARITY_MAINTENANCE_INTERVAL <= 0:
+            return
+        
+        def run():
+            while True:
+                time.sleep(SIMILARITY_MAINTENANCE_INTERVAL)
+                try:
+                    self.maintain()
+                except Exception as e:
+                    print(f"Similarity index maintenance error: {e}")
+        
+        self._maintenance_thread = threading.Thread(target=run, name='similarity-index', daemon=True)
+        self._maintenance_thread.start()
+
+    def flush(self):
+        """Save unsaved changes now (e.g. before the process exits)"""
+        if self._ready and self._dirty:
+            self.save()
+
+    def save(self):
+        """Write live rows to <path>.npz + <path>.json atomically
+
+        Each gunicorn worker saves on its own, so temp files are unique per
+        save and both files carry the same generation id; _load() rejects a
+        .npz and .json that came from different saves.
+        """
+        with self._lock:
+            view = self._snapshot()
+            matrix, ids, alive, statuses = view.matrix, view.ids, view.alive, self._statuses
+            if view.tail is not None:
+                matrix = sparse.vstack([matrix, view.tail], format='csr')
+            # Removed rows are left out of the file; in memory they stay
+            # masked until the next refit so queries never wait on a compaction
+            if not alive.all():
+                matrix = matrix[alive]
+                ids = [idea_id for idea_id, keep in zip(ids, alive) if keep]
+                statuses = [status for status, keep in zip(statuses, alive) if keep]
+            generation = uuid.uuid4().hex
+            meta = {
+                'generation': generation,
+                'vocabulary': {term: int(i) for term, i in self._vectorizer.vocabulary.items()},
+                'idf': self._idf.tolist(),
+                'ids': list(ids),
+                'statuses': list(statuses),
+                'changes': self._changes,
+                'fitted_at': self._fitted_at
+            }
+            self._dirty = False
+        
+        with self._save_lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_npz = f'{self.path}.{generation}.tmp.npz'
+            tmp_json = f'{self.path}.{generation}.tmp.json'
+            try:
+                # save_npz's layout plus the generation, so load_npz still reads it
+                np.savez_compressed(
+                    tmp_npz, format=np.array(b'csr'), shape=np.array(matrix.shape),
+                    data=matrix.data, indices=matrix.indices, indptr=matrix.indptr,
+                    generation=np.array(generation)
+                )
+                with open(tmp_json, 'w') as f:
+                    json.dump(meta, f)
+                os.replace(tmp_npz, f'{self.path}.npz')
+                os.replace(tmp_json, f'{self.path}.json')
+            finally:
+                for tmp_path in (tmp_npz, tmp_json):
+                    if os.path.exists(tmp_path):
+                        os.remove(tmp_path)
+            self._counters['saves'] += 1
+
+    def _load(self, attempts=3):
+        # Another worker may be between its two renames; try again shortly
+        for attempt in range(attempts):
+            with open(f'{self.path}.json') as f:
+                meta = json.load(f)
+            with np.load(f'{self.path}.npz') as npz:
+                generation = str(npz['generation']) if 'generation' in npz.files else None
+                if generation == meta.get('generation'):
+                    matrix = sparse.csr_matrix(
+                        (npz['data'], npz['indices'], npz['indptr']), shape=tuple(npz['shape'])
+                    )
+                    break
+            if attempt + 1 < attempts:
+                time.sleep(0.1)
+        else:
+            raise ValueError('index .npz and .json come from different saves')
+        if matrix.shape != (len(meta['ids']), len(meta['idf'])):
+            raise ValueError(f"matrix shape {matrix.shape} does not match metadata")
+        base = self._build_base(matrix)
+        with self._lock:
+            self._install(meta['vocabulary'], meta['idf'], matrix, meta['ids'], meta['statuses'], base)
+            self._changes = meta['changes']
+            self._fitted_at = meta['fitted_at']
+            self._counters['loads'] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'ready': self._ready,
+                'documents': len(self._positions),
+                'vocabulary': len(self._idf) if self._idf is not None else 0,
+                'changes_since_fit': self._changes,
+                'fitted_at': datetime.fromtimestamp(self._fitted_at).isoformat() if self._fitted_at else None,
+                'last_fit_seconds': self._last_fit_seconds,
+                'tail': self._tail_size(),
+                'ann': self._ann.stats() if self._ann is not None else {'backend': 'exact'},
+                **self._counters
+            }
+
+similarity_index = SimilarityIndex(SIMILARITY_INDEX_PATH)
+
+def similar_idea_rows(conn, matches, viewer_id=None):
+    """Fetch display rows for [(idea id, score)] matches, best first
+
+    viewer_id restricts results to approved ideas plus the viewer's own, as
+    for search.
+    """
+    return similar_idea_rows_many(conn, [matches], viewer_id)[0]
+
+def similar_idea_rows_many(conn, match_lists, viewer_id=None):
+    """similar_idea_rows() for several match lists, fetching each idea once"""
+    wanted = list({idea_id for matches in match_lists for idea_id, _ in matches})
+    visibility, visibility_params = '', ()
+    if viewer_id is not None:
+        visibility, visibility_params = "AND (status = 'approved' OR engineer_id = ?)", (viewer_id,)
+    rows = {}
+    for start in range(0, len(wanted), 500):
+        chunk = wanted[start:start + 500]
+        for row in conn.execute(f'''
+            SELECT id, title, description, category, status
+            FROM ideas
+            WHERE id IN ({', '.join('?' * len(chunk))})
+              AND status IN ({', '.join('?' * len(SIMILARITY_STATUSES))})
+              {visibility}
+        ''', (*chunk, *SIMILARITY_STATUSES, *visibility_params)):
+            rows[row['id']] = row
+    
+    results = []
+    for matches in match_lists:
+        similar_ideas = []
+        for idea_id, score in matches:
+            if idea_id in rows:
+                idea = dict(rows[idea_id])
+                idea['similarity_score'] = round(score * 100, 2)
+                similar_ideas.append(idea)
+        results.append(similar_ideas)
+    return results
+
+def duplicate_clusters(vectors, idea_ids, threshold=SIMILARITY_DUPLICATE_THRESHOLD):
+    """Group idea_ids whose vectors are linked by a pairwise score above threshold"""
+    if not vectors.nnz:
+        return []
+    pairs = (vectors @ vectors.T).tocsr()
+    pairs.data[pairs.data <= threshold] = 0
+    pairs.eliminate_zeros()
+    _, labels = connected_components(pairs, directed=False)
     
-    for sdm in default_sdms:
-        # Special avatar for Nachi
-        if sdm['display_name'] == 'Nachi':
-            # Create a custom avatar for Nachi
-            nachi_svg = '''<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100" viewBox="0 0 100 100">
-  <circle cx="50" cy="50" r="50" fill="#00D1FF"/>
-  <circle cx="35" cy="40" r="8" fill="#FFFFFF"/>
-  <circle cx="65" cy="40" r="8" fill="#FFFFFF"/>
-  <circle cx="35" cy="40" r="4" fill="#000000"/>
-  <circle cx="65" cy="40" r="4" fill="#000000"/>
-  <path d="M 30 65 Q 50 75 70 65" stroke="#FFFFFF" stroke-width="3" fill="none" stroke-linecap="round"/>
-  <text x="50" y="85" font-family="Arial, sans-serif" font-size="20" font-weight="bold" text-anchor="middle" fill="white">N</text>
-</svg>'''
-            avatar = f"data:image/svg+xml;base64,{base64.b64encode(nachi_svg.encode()).decode()}"
-        else:
-            avatar = generate_avatar(sdm['display_name'])
+    clusters = {}
+    for idea_id, label in zip(idea_ids, labels):
+        clusters.setdefault(label, []).append(idea_id)
+    return [members for members in clusters.values() if len(members) > 1]
+
+@app.cli.command('similarity-benchmark')
+@click.option('--queries', default=200, show_default=True, help='Indexed ideas to use as queries')
+@click.option('--k', 'top_k', default=SIMILARITY_TOP_K, show_default=True)
+@click.option('--bands', default=SIMILARITY_LSH_BANDS, show_default=True, help='LSH bands (more = higher recall)')
+@click.option('--rows', default=SIMILARITY_LSH_ROWS, show_default=True, help='MinHashes per band (more = fewer candidates)')
+@click.option('--max-candidates', default=SIMILARITY_LSH_MAX_CANDIDATES, show_default=True)
+@click.option('--seed', default=0)
+def similarity_benchmark_command(queries, top_k, bands, rows, max_candidates, seed):
+    """Compare MinHash LSH recall and latency against the exact scan"""
+    similarity_index.set_ann_factory(lambda: MinHashLSH(bands, rows, max_candidates))
+    report = similarity_index.benchmark(queries, top_k, seed)
+    click.echo(json.dumps(report, indent=2))
+
+# Draft similarity
+# POST /api/ideas/similar-draft checks an unsaved idea while it is being
+# typed, so it has to answer in a few milliseconds: drafts are only ever
+# transformed with the fitted vocabulary and scored against the warm index
+# (a worker whose index is still loading answers "not ready" and loads it in
+# the background instead of fitting inside the request), and matches are
+# cached by normalized text for SIMILARITY_DRAFT_CACHE_TTL, which also bounds
+# how long a newly submitted idea can go unmatched. Each form sends a draft
+# id and an increasing seq; a request overtaken by a newer keystroke from the
+# same form stops before doing any more work.
+class DraftMatcher:
+    """LRU cache of draft matches plus the latest seq seen per draft"""
+
+    def __init__(self, size=1024, ttl=30.0, max_drafts=4096):
+        self.size = size
+        self.ttl = ttl
+        self.max_drafts = max_drafts
+        self._cache = OrderedDict()  # normalized text -> (expires, matches)
+        self._latest = OrderedDict()  # (user id, draft id) -> seq
+        self._lock = threading.Lock()
+        self._warming = False
+        self._counters = {'hits': 0, 'misses': 0, 'superseded': 0}
+
+    def matches(self, text):
+        """[(idea id, score)] for normalized draft text"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._cache.get(text)
+            if entry is not None and entry[0] > now:
+                self._cache.move_to_end(text)
+                self._counters['hits'] += 1
+                return entry[1]
+            self._counters['misses'] += 1
         
-        try:
-            conn.execute('''
-                INSERT OR IGNORE INTO users (id, username, display_name, email, password_hash, role, avatar_data)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (sdm['id'], sdm['username'], sdm['display_name'], sdm['email'], 
-                  hashed_password.decode('utf-8'), sdm['role'], avatar))
-        except sqlite3.IntegrityError:
-            pass  # User already exists
+        matches = similarity_index.query_vectors(similarity_index.transform([text]))[0]
+        with self._lock:
+            self._cache[text] = (now + self.ttl, matches)
+            self._cache.move_to_end(text)
+            while len(self._cache) > self.size:
+                self._cache.popitem(last=False)
+        return matches
+
+    def begin(self, draft_key, seq):
+        """Record seq for a draft; False if a newer one has already arrived"""
+        with self._lock:
+            latest = self._latest.get(draft_key)
+            if latest is not None and latest > seq:
+                self._counters['superseded'] += 1
+                return False
+            self._latest[draft_key] = seq
+            self._latest.move_to_end(draft_key)
+            while len(self._latest) > self.max_drafts:
+                self._latest.popitem(last=False)
+            return True
+
+    def current(self, draft_key, seq):
+        """False once a newer seq for the draft has arrived"""
+        with self._lock:
+            if self._latest.get(draft_key, seq) > seq:
+                self._counters['superseded'] += 1
+                return False
+            return True
+
+    def warm(self):
+        """Load the similarity index in the background (once)"""
+        with self._lock:
+            if self._warming:
+                return
+            self._warming = True
+        threading.Thread(target=warmup, name='similarity-warmup', daemon=True).start()
+
+    def stats(self):
+        with self._lock:
+            return {'cached': len(self._cache), 'drafts': len(self._latest), **self._counters}
+
+draft_matcher = DraftMatcher(SIMILARITY_DRAFT_CACHE_SIZE, SIMILARITY_DRAFT_CACHE_TTL)
+
+def draft_similarity_text(data):
+    """Normalized similarity text for an unsaved idea, as it would be stored"""
+    fields = {key: value for key, value in data.items() if isinstance(value, str)}
+    if fields.get('category') in IDEA_CATEGORIES:
+        description = build_idea_description(fields)
+    else:
+        description = fields.get('description', '')
+    text = similarity_text(fields.get('title', ''), description[:SIMILARITY_DRAFT_MAX_CHARS])
+    return ' '.join(text.split())
+
+# Startup
+# The similarity stack (numpy/scipy/scikit-learn) dominates import time and
+# memory, so it is loaded on the first similarity check unless APP_WARMUP is
+# 'eager' or a deployment calls warmup() itself (e.g. after forking workers).
+
+def warmup():
+    """Load the similarity stack and index now; returns the seconds it took"""
+    started = time.perf_counter()
+    load_similarity_stack()
+    similarity_index.ensure_ready()
+    return round(time.perf_counter() - started, 3)
+
+def parse_importtime(output):
+    """[(depth, self_us, cumulative_us, module)] from `python -X importtime` stderr"""
+    entries = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        entries.append((depth, int(own), int(cumulative), name.strip()))
+    return entries
+
+@app.cli.command('import-report')
+@click.option('--limit', default=15, show_default=True, help='Slowest imports to list')
+@click.option('--warmup', 'eager', is_flag=True, help='Also load the similarity stack, as APP_WARMUP=eager does')
+@click.option('--max-ms', type=float, help='Exit non-zero when the total exceeds this many milliseconds')
+def import_report_command(limit, eager, max_ms):
+    """Time `import app` in a fresh interpreter (python -X importtime)"""
+    def run(code):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=app.root_path, capture_output=True, text=True
+        )
+        if result.returncode:
+            raise click.ClickException(result.stderr.strip().splitlines()[-1])
+        return parse_importtime(result.stderr)
     
-    # Check if title column exists, if not add it
-    try:
-        conn.execute("SELECT title FROM ideas LIMIT 1")
-    except sqlite3.OperationalError:
-        # Title column doesn't exist, add it
-        try:
-            conn.execute("ALTER TABLE ideas ADD COLUMN title TEXT DEFAULT 'Untitled Idea'")
-            print("Added title column to ideas table")
-        except sqlite3.OperationalError as e:
-            print(f"Failed to add title column: {e}")
+    # Modules the bare interpreter imports anyway are not ours to report
+    baseline = {name for _, _, _, name in run('pass')}
+    entries = run('import app; app.load_similarity_stack()' if eager else 'import app')
     
-    conn.commit()
-    conn.close()
-    print("Database initialized successfully")
+    # Direct imports of app.py plus anything imported lazily afterwards
+    rows, children = [], []
+    for depth, _, cumulative, name in entries:
+        if depth == 1:
+            children.append((cumulative, name))
+        elif depth == 0:
+            if name == 'app':
+                rows += children
+            elif name not in baseline:
+                rows.append((cumulative, name))
+            children = []
+    total = sum(cumulative for depth, _, cumulative, name in entries if depth == 0 and name not in baseline)
+    
+    click.echo(f"{'ms':>9}  module")
+    for cumulative, name in sorted(rows, reverse=True)[:limit]:
+        click.echo(f"{cumulative / 1000:9.1f}  {name}")
+    click.echo(f"{total / 1000:9.1f}  total ({'eager' if eager else 'lazy'})")
+    if max_ms is not None and total / 1000 > max_ms:
+        raise SystemExit(1)
+
+# Serving
+# `python app.py` runs Flask's development server. Production runs gunicorn
+# with gunicorn.conf.py: the master applies migrations once (`flask init-db`)
+# and imports this module before forking, together with the similarity stack
+# when APP_WARMUP is 'eager', so workers share those pages. Importing opens
+# no connections and starts no threads; each worker warms its own pool and
+# similarity index in start_worker(). /health/ready answers 503 until that is
+# done and again once shutdown has begun, so only warm workers get traffic.
+serving_state = {'warmup': 'pending', 'warmup_seconds': None, 'error': None, 'shutting_down': False}
+
+SERVING_WARMUP_RETRY = 5  # seconds between warmup attempts
+
+def create_app():
+    """WSGI application for production servers (gunicorn 'app:create_app()')"""
+    if APP_WARMUP == 'eager':
+        load_similarity_stack()
+    return app
+
+def start_worker():
+    """Warm this process up in the background once the server has forked"""
+    def run():
+        started = time.perf_counter()
+        while not serving_state['shutting_down']:
+            try:
+                with db_pool.connection() as conn:
+                    version = get_schema_version(conn)
+                if version < MIGRATIONS[-1][0]:
+                    raise RuntimeError(f"schema is at version {version}; run `flask --app app init-db`")
+                if APP_WARMUP == 'eager':
+                    warmup()
+                serving_state.update(
+                    warmup='done', error=None,
+                    warmup_seconds=round(time.perf_counter() - started, 3)
+                )
+                return
+            except Exception as e:
+                serving_state.update(warmup='failed', error=str(e))
+                print(f"Warmup failed, retrying in {SERVING_WARMUP_RETRY}s: {e}")
+                time.sleep(SERVING_WARMUP_RETRY)
+    
+    threading.Thread(target=run, name='warmup', daemon=True).start()
+
+def readiness():
+    """(ready, checks) for /health/ready"""
+    checks = {
+        'database': serving_state['warmup'] == 'done',
+        'similarity_index': similarity_index.ready or APP_WARMUP != 'eager',
+        'shutting_down': serving_state['shutting_down']
+    }
+    ready = checks['database'] and checks['similarity_index'] and not checks['shutting_down']
+    return ready, {
+        **checks,
+        'warmup_seconds': serving_state['warmup_seconds'],
+        'error': serving_state['error']
+    }
+
+def begin_shutdown():
+    """Fail readiness and end event streams so in-flight requests can drain"""
+    serving_state['shutting_down'] = True
+    event_broker.close()
+
+def shutdown():
+    """Last cleanup before this process exits"""
+    begin_shutdown()
+    try:
+        similarity_index.flush()
+    except Exception as e:
+        print(f"Similarity index not saved on shutdown: {e}")
+    db_pool.close_all()
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Apply migrations and seed default users (run once, before starting workers)"""
+    init_database()
+    # Seed users' avatar upgrades run on this process's worker thread
+    avatar_worker.join(AVATAR_TIMEOUT * AVATAR_RETRIES)
 
 # Authentication decorator
-def token_required(f):
+def token_required(f=None, *, read_only=False):
+    """Require a valid JWT; read_only=True endpoints may run on its claims alone"""
+    if f is None:
+        return lambda f: token_required(f, read_only=read_only)
+    
     @wraps(f)
     def decorated(*args, **kwargs):
         token = request.headers.get('Authorization')
@@ -215,23 +3672,13 @@ def token_required(f):
             
             data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=['HS256'])
             
-            conn = get_db_connection()
-            user = conn.execute(
-                'SELECT * FROM users WHERE id = ?', (data['id'],)
-            ).fetchone()
-            conn.close()
-            
-            if not user:
-                return jsonify({'error': 'Invalid token'}), 401
-                
-            request.current_user = {
-                'id': user['id'],
-                'username': user['username'],
-                'display_name': user['display_name'],
-                'email': user['email'],
-                'role': user['role'],
-                'avatar_data': user['avatar_data']
-            }
+            if read_only and AUTH_JWT_ONLY_READS:
+                request.current_user = {'id': data['id'], 'username': data['username'], 'role': data['role']}
+            else:
+                user = user_cache.get(data['id'], load_principal)
+                if not user:
+                    return jsonify({'error': 'Invalid token'}), 401
+                request.current_user = dict(user)
             
         except jwt.ExpiredSignatureError:
             return jsonify({'error': 'Token has expired'}), 401
@@ -256,9 +3703,92 @@ def require_role(required_role):
 def health_check():
     return jsonify({
         'status': 'OK',
-        'timestamp': datetime.now().isoformat()
+        'timestamp': datetime.now().isoformat(),
+        'db_pool': db_pool.stats(),
+        'response_cache': response_cache.stats(),
+        'user_cache': user_cache.stats(),
+        'password_hasher': password_hasher.stats(),
+        'similarity_index': similarity_index.stats(),
+        'similarity_drafts': draft_matcher.stats(),
+        'avatars': avatar_worker.stats(),
+        'events': event_broker.stats()
     })
 
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    """200 once this worker's database and similarity index are warm"""
+    ready, checks = readiness()
+    return jsonify({'status': 'ready' if ready else 'unavailable', **checks}), 200 if ready else 503
+
+# Metrics endpoint
+if METRICS_ENABLED:
+    @app.before_request
+    def start_request_metrics():
+        metrics.request_started(request.endpoint or 'unmatched', request.method)
+
+    @app.after_request
+    def finish_request_metrics(response):
+        metrics.request_finished(response.status_code)
+        return response
+
+    @app.teardown_request
+    def close_request_metrics(exception=None):
+        metrics.request_closed()
+
+if SQL_PROFILE:
+    @app.before_request
+    def start_sql_profile():
+        sql_profiler.start()
+
+    @app.after_request
+    def finish_sql_profile(response):
+        records, elapsed = sql_profiler.finish()
+        if records is None:
+            return response
+        route = request.endpoint or 'unmatched'
+        slowest, repeated, duplicates = sql_profiler.analyze(records)
+        response.headers['Server-Timing'] = sql_profiler.server_timing(records, elapsed, slowest)
+        response.headers['Timing-Allow-Origin'] = '*'
+        for sql, count in repeated:
+            print(f"SQL profile: {route} ran {count}x (possible N+1): {' '.join(sql.split())[:200]}")
+        for sql, count in duplicates:
+            print(f"SQL profile: {route} ran an identical statement {count}x: {' '.join(sql.split())[:200]}")
+        calls = sql_profiler.fanout(request.remote_addr, route)
+        if calls == sql_profiler.repeat_threshold:
+            print(f"SQL profile: {request.remote_addr} called {route} {calls}x within {SQL_FANOUT_WINDOW}s (client fan-out)")
+        try:
+            if 'db_conn' in g:
+                sql_profiler.log_slow(g.db_conn, route, records)
+            else:
+                with db_pool.connection() as conn:
+                    sql_profiler.log_slow(conn, route, records)
+        except Exception as e:
+            print(f"Slow query log error: {str(e)}")
+        return response
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus exposition of this worker's metrics"""
+    pool = db_pool.stats()
+    hasher = password_hasher.stats()
+    index = similarity_index.stats()
+    scraped = [
+        ('db_pool_connections', 'gauge', 'Pooled SQLite connections, by state', (('state', 'in_use'),), pool['in_use']),
+        ('db_pool_connections', 'gauge', 'Pooled SQLite connections, by state', (('state', 'idle'),), pool['idle']),
+        ('db_pool_waits_total', 'counter', 'Connection checkouts that had to wait', (), pool['waits']),
+        ('db_pool_timeouts_total', 'counter', 'Connection checkouts that timed out', (), pool['timeouts']),
+        ('password_hasher_in_flight', 'gauge', 'bcrypt operations running or queued', (), hasher['in_flight']),
+        ('password_hasher_rejected_total', 'counter', 'bcrypt operations refused as busy', (), hasher['rejected']),
+        ('similarity_ready', 'gauge', '1 once the similarity index is loaded', (), int(index['ready'])),
+        ('similarity_corpus_documents', 'gauge', 'Ideas in the similarity index', (), index['documents']),
+        ('similarity_vocabulary_terms', 'gauge', 'Terms in the fitted TF-IDF vocabulary', (), index['vocabulary']),
+        ('similarity_tail_documents', 'gauge', 'Ideas added since the last merge into the base matrix', (), index['tail']),
+        ('similarity_last_fit_seconds', 'gauge', 'Duration of the most recent TF-IDF fit', (), index['last_fit_seconds'] or 0.0),
+        ('similarity_queries_total', 'counter', 'Similarity lookups (one per query vector)', (), index['queries']),
+        ('event_stream_clients', 'gauge', 'Open /api/events streams', (), event_broker.stats()['clients']),
+    ]
+    return Response(metrics.render(scraped), mimetype='text/plain; version=0.0.4')
+
 # Authentication endpoints
 @app.route('/api/auth/register', methods=['POST'])
 def register():
@@ -289,20 +3819,21 @@ def register():
             return jsonify({'error': 'Password must be at least 6 characters long'}), 400
         
         # Hash password
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        password_hash = password_hasher.hash(password)
         
         # Create user with avatar
         user_id = str(uuid.uuid4())
-        avatar = generate_avatar(display_name)
         conn = get_db_connection()
         
         try:
+            avatar = store_avatar(conn, generate_avatar(display_name))
             conn.execute('''
-                INSERT INTO users (id, username, display_name, email, password_hash, role, avatar_data)
+                INSERT INTO users (id, username, display_name, email, password_hash, role, avatar_hash)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (user_id, username, display_name, email, password_hash.decode('utf-8'), role, avatar))
+            ''', (user_id, username, display_name, email, password_hash, role, avatar))
             
             conn.commit()
+            avatar_worker.submit(username, display_name, avatar)
             
             # Generate JWT token
             token = jwt.encode({
@@ -321,7 +3852,7 @@ def register():
                     'display_name': display_name,
                     'email': email,
                     'role': role,
-                    'avatar_data': avatar
+                    'avatar_url': avatar_url(avatar)
                 }
             }), 201
             
@@ -332,9 +3863,9 @@ def register():
                 return jsonify({'error': 'Email already exists'}), 409
             else:
                 return jsonify({'error': 'User already exists'}), 409
-        finally:
-            conn.close()
             
+    except PasswordHasherBusy:
+        return password_busy_response()
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
@@ -350,14 +3881,14 @@ def login():
         password = data['password']
         
         conn = get_db_connection()
-        user = conn.execute(
-            'SELECT * FROM users WHERE username = ?', (username,)
-        ).fetchone()
-        conn.close()
+        user = conn.execute(USER_BY_USERNAME_SQL, (username,)).fetchone()
         
-        if not user or not bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+        if not user or not password_hasher.verify(password, user['password_hash']):
             return jsonify({'error': 'Invalid credentials'}), 401
         
+        if password_hasher.needs_rehash(user['password_hash']):
+            password_hasher.rehash_later(user['id'], password)
+        
         # Generate JWT token
         token = jwt.encode({
             'id': user['id'],
@@ -375,10 +3906,12 @@ def login():
                 'display_name': user['display_name'],
                 'email': user['email'],
                 'role': user['role'],
-                'avatar_data': user['avatar_data']
+                'avatar_url': avatar_url(user['avatar_hash'])
             }
         })
         
+    except PasswordHasherBusy:
+        return password_busy_response()
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
@@ -387,6 +3920,36 @@ def login():
 def get_profile():
     return jsonify({'user': request.current_user})
 
+# Avatar endpoints
+@app.route('/api/avatars/<avatar_hash>.svg', methods=['GET'])
+def get_avatar(avatar_hash):
+    """Serve a stored avatar; content-addressed, so it can be cached forever"""
+    try:
+        if not re.fullmatch(r'[0-9a-f]{64}', avatar_hash):
+            return jsonify({'error': 'Avatar not found'}), 404
+        
+        headers = {
+            'Cache-Control': 'public, max-age=31536000, immutable',
+            'ETag': f'"{avatar_hash}"',
+            'Vary': 'Accept-Encoding'
+        }
+        if request.if_none_match.contains(avatar_hash):
+            return Response(status=304, headers=headers)
+        
+        conn = get_db_connection()
+        avatar = conn.execute(AVATAR_SQL, (avatar_hash,)).fetchone()
+        if not avatar:
+            return jsonify({'error': 'Avatar not found'}), 404
+        
+        body = avatar['svg']
+        if 'gzip' in request.accept_encodings and len(avatar['svg_gzip']) < len(body):
+            body = avatar['svg_gzip']
+            headers['Content-Encoding'] = 'gzip'
+        return Response(body, mimetype='image/svg+xml', headers=headers)
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
 # Ideas endpoints
 @app.route('/api/ideas/submit', methods=['POST'])
 @token_required
@@ -402,51 +3965,26 @@ def submit_idea():
                 return jsonify({'error': f'{field} is required'}), 400
         
         # Build description from category-specific content
-        description = ''
-        category = data['category']
-        if category == 'Security':
-            security_gap = data.get('security_gap', '').strip()
-            possible_solution = data.get('possible_solution', '').strip()
-            if security_gap:
-                description += f"Security Gap: {security_gap}"
-            if possible_solution:
-                if description:
-                    description += ' | '
-                description += f"Possible Solution: {possible_solution}"
-        elif category == 'Automation':
-            automation_opportunity = data.get('automation_opportunity', '').strip()
-            automation_solution = data.get('automation_solution', '').strip()
-            if automation_opportunity:
-                description += f"Automation Opportunity: {automation_opportunity}"
-            if automation_solution:
-                if description:
-                    description += ' | '
-                description += f"Automation Solution: {automation_solution}"
-        elif category == 'Innovation':
-            innovative_idea = data.get('innovative_idea', '').strip()
-            description = innovative_idea
+        description = build_idea_description(data)
         
         idea_id = str(uuid.uuid4())
         
         conn = get_db_connection()
         
         # Insert idea with description
-        conn.execute('''
-            INSERT INTO ideas (
-                id, engineer_id, title, description, category, service_area, assigned_sdm_id,
-                implemented, benefit_level, security_gap, possible_solution,
-                automation_opportunity, automation_solution, innovative_idea
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            idea_id, request.current_user['id'], data['title'], description, data['category'], data['service_area'],
-            data['assigned_sdm_id'], data.get('implemented', False), data['benefit_level'],
-            data.get('security_gap', ''), data.get('possible_solution', ''),
-            data.get('automation_opportunity', ''), data.get('automation_solution', ''),
-            data.get('innovative_idea', '')
+        conn.execute(IDEA_INSERT_SQL, idea_insert_params(
+            idea_id, request.current_user['id'], data['assigned_sdm_id'], data, description
         ))
         
         conn.commit()
-        conn.close()
+        similarity_index.add(idea_id, data['title'], description)
+        event_broker.publish('idea_submitted', {
+            'id': idea_id,
+            'title': data['title'],
+            'category': data['category'],
+            'service_area': data['service_area'],
+            'engineer_username': request.current_user['username']
+        }, audience={data['assigned_sdm_id']})
         
         return jsonify({
             'message': 'Idea submitted successfully',
@@ -462,54 +4000,28 @@ def submit_idea():
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/ideas/my-ideas', methods=['GET'])
-@token_required
+@token_required(read_only=True)
 @require_role('Service Engineer')
 def get_my_ideas():
     try:
         conn = get_db_connection()
-        ideas = conn.execute('''
-            SELECT 
-                i.*, u.display_name as assigned_sdm_name
-            FROM ideas i
-            LEFT JOIN users u ON i.assigned_sdm_id = u.id
-            WHERE i.engineer_id = ?
-            ORDER BY i.submission_date DESC
-        ''', (request.current_user['id'],)).fetchall()
-        
-        conn.close()
-        
-        ideas_list = []
-        for idea in ideas:
-            ideas_list.append(dict(idea))
-        
-        return jsonify({'ideas': ideas_list})
+        return jsonify(idea_list_page(conn, 'my_ideas', request.args, (request.current_user['id'],)))
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/ideas/worklist', methods=['GET'])
-@token_required
+@token_required(read_only=True)
 @require_role('SDM')
 def get_worklist():
     try:
         conn = get_db_connection()
-        ideas = conn.execute('''
-            SELECT 
-                i.*, u.display_name as engineer_name, u.username as engineer_username
-            FROM ideas i
-            JOIN users u ON i.engineer_id = u.id
-            WHERE i.assigned_sdm_id = ? AND i.status = 'pending'
-            ORDER BY i.submission_date ASC
-        ''', (request.current_user['id'],)).fetchall()
-        
-        conn.close()
-        
-        ideas_list = []
-        for idea in ideas:
-            ideas_list.append(dict(idea))
-        
-        return jsonify({'ideas': ideas_list})
+        return jsonify(idea_list_page(conn, 'worklist', request.args, (request.current_user['id'],)))
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
@@ -529,27 +4041,33 @@ def approve_idea(idea_id):
         if not idea:
             return jsonify({'error': 'Idea not found'}), 404
         
-        # Calculate points
-        base_points = {'Automation': 10, 'Security': 10, 'Innovation': 5}
-        impl_points = {'Automation': 15, 'Security': 15, 'Innovation': 10}
-        benefit_multipliers = {
-            'Marginal': 5, 'Moderate': 10, 'High': 15, 
-            'Very High': 20, 'Gamechanger': 30
-        }
-        
-        points = base_points.get(idea['category'], 0)
-        if idea['implemented']:
-            points += impl_points.get(idea['category'], 0) + benefit_multipliers.get(idea['benefit_level'], 0)
+        # Calculate points with the active rule set
+        rules = load_point_rules(conn)
+        points = calculate_points(rules, idea['category'], idea['implemented'], idea['benefit_level'])
         
-        # Update idea
-        conn.execute('''
+        # Update idea and the leaderboard aggregates in one transaction; the
+        # status guard stops a concurrent approval from counting twice
+        approved_at = approval_timestamp()
+        updated = conn.execute('''
             UPDATE ideas 
-            SET status = 'approved', points = ?, updated_at = CURRENT_TIMESTAMP 
-            WHERE id = ?
-        ''', (points, idea_id))
+            SET status = 'approved', points = ?, rules_version = ?, approved_at = ?, updated_at = CURRENT_TIMESTAMP 
+            WHERE id = ? AND status = 'pending'
+        ''', (points, rules.version, approved_at, idea_id))
+        
+        if updated.rowcount != 1:
+            conn.rollback()
+            return jsonify({'error': 'Idea not found'}), 404
         
+        apply_score_change(conn, idea['engineer_id'], idea['category'], idea['service_area'], approved_at, 0, points)
         conn.commit()
-        conn.close()
+        response_cache.invalidate()
+        similarity_index.set_status(idea_id, 'approved')
+        event_broker.publish('idea_approved', {
+            'id': idea_id,
+            'category': idea['category'],
+            'points': points
+        })
+        publish_leaderboard_changes(conn, {idea['engineer_id']: points})
         
         return jsonify({
             'message': 'Idea approved successfully',
@@ -579,18 +4097,24 @@ def reject_idea(idea_id):
         ''', (idea_id, request.current_user['id'])).fetchone()
         
         if not idea:
-            conn.close()
             return jsonify({'error': 'Idea not found'}), 404
         
-        # Update idea
-        conn.execute('''
+        # Update idea; the status guard stops it overwriting a concurrent
+        # approval whose points are already counted
+        updated = conn.execute('''
             UPDATE ideas 
             SET status = 'rejected', rejection_reason = ?, updated_at = CURRENT_TIMESTAMP 
-            WHERE id = ?
+            WHERE id = ? AND status = 'pending'
         ''', (rejection_reason, idea_id))
         
+        if updated.rowcount != 1:
+            conn.rollback()
+            return jsonify({'error': 'Idea not found'}), 404
+        
         conn.commit()
-        conn.close()
+        response_cache.invalidate()
+        similarity_index.remove(idea_id)
+        event_broker.publish('idea_rejected', {'id': idea_id}, audience={idea['engineer_id']})
         
         return jsonify({
             'message': 'Idea rejected successfully'
@@ -599,23 +4123,186 @@ def reject_idea(idea_id):
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
-@app.route('/api/ideas/<idea_id>', methods=['GET'])
+@app.route('/api/ideas/bulk', methods=['POST'])
+@token_required
+@require_role('SDM')
+def bulk_import_ideas():
+    """Import ideas from a JSONL body (or multipart `file`) in one transaction"""
+    try:
+        upload = request.files.get('file')
+        body = upload.read() if upload else request.get_data()
+        try:
+            text = body.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise ValueError('Body must be UTF-8 encoded JSONL')
+        lines = [(number, line) for number, line in enumerate(text.splitlines(), 1) if line.strip()]
+        if not lines:
+            raise ValueError('No ideas to import')
+        if len(lines) > IDEA_BULK_MAX:
+            raise ValueError(f'At most {IDEA_BULK_MAX} ideas per import')
+        
+        records, results = [], []
+        for number, line in lines:
+            try:
+                records.append((number, json.loads(line)))
+            except ValueError:
+                results.append({'line': number, 'error': 'Invalid JSON'})
+        
+        conn = get_db_connection()
+        references = {'id': set(), 'username': set()}
+        for _, data in records:
+            if isinstance(data, dict):
+                for prefix in ('engineer', 'assigned_sdm'):
+                    for column in references:
+                        if isinstance(data.get(f'{prefix}_{column}'), str):
+                            references[column].add(data[f'{prefix}_{column}'])
+        users = resolve_users(conn, references['id'], references['username'])
+        
+        rows, added = [], []
+        for number, data in records:
+            try:
+                engineer_id, sdm_id, description, submission_date = parse_import_line(
+                    data, request.current_user['id'], users
+                )
+            except ValueError as e:
+                results.append({'line': number, 'error': str(e)})
+                continue
+            idea_id = str(uuid.uuid4())
+            rows.append(idea_insert_params(idea_id, engineer_id, sdm_id, data, description, submission_date))
+            added.append((idea_id, data['title'], description, 'pending'))
+            results.append({'line': number, 'id': idea_id})
+        
+        if rows:
+            conn.executemany(IDEA_INSERT_SQL, rows)
+            conn.commit()
+            similarity_index.add_many(added)
+            submitted = {}
+            for row in rows:
+                submitted[row[6]] = submitted.get(row[6], 0) + 1
+            for sdm_id, count in submitted.items():
+                event_broker.publish('ideas_submitted', {'count': count}, audience={sdm_id})
+        
+        results.sort(key=lambda result: result['line'])
+        return jsonify({
+            'imported': len(rows),
+            'failed': len(results) - len(rows),
+            'results': results
+        }), 201 if rows else 400
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/ideas/bulk-review', methods=['POST'])
 @token_required
+@require_role('SDM')
+def bulk_review_ideas():
+    """Approve or reject many pending ideas in one transaction"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        items = data.get('items')
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'items is required'}), 400
+        if len(items) > IDEA_BULK_MAX:
+            return jsonify({'error': f'At most {IDEA_BULK_MAX} items per request'}), 400
+        
+        results = [None] * len(items)
+        wanted = {}
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or not item.get('id') or not isinstance(item['id'], str):
+                results[index] = {'error': 'id is required'}
+            elif item.get('action') not in ('approve', 'reject'):
+                results[index] = {'id': item['id'], 'error': "action must be 'approve' or 'reject'"}
+            elif item['action'] == 'reject' and not str(item.get('rejection_reason') or '').strip():
+                results[index] = {'id': item['id'], 'error': 'Rejection reason is required'}
+            elif item['id'] in wanted:
+                results[index] = {'id': item['id'], 'error': 'Duplicate id'}
+            else:
+                wanted[item['id']] = index
+        
+        conn = get_db_connection()
+        approved, rejected = [], []
+        # The write lock is taken up front, so ideas read as pending below
+        # cannot be reviewed by anyone else before this commits
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            ideas = {}
+            ids = list(wanted)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                for row in conn.execute(f'''
+                    SELECT id, engineer_id, category, service_area, implemented, benefit_level FROM ideas
+                    WHERE assigned_sdm_id = ? AND status = 'pending' AND id IN ({', '.join('?' * len(chunk))})
+                ''', [request.current_user['id'], *chunk]):
+                    ideas[row['id']] = row
+            
+            rules = load_point_rules(conn)
+            approved_at = approval_timestamp()
+            approvals, rejections, score_changes = [], [], []
+            for idea_id, index in wanted.items():
+                idea = ideas.get(idea_id)
+                item = items[index]
+                if not idea:
+                    results[index] = {'id': idea_id, 'error': 'Idea not found'}
+                elif item['action'] == 'approve':
+                    points = calculate_points(rules, idea['category'], idea['implemented'], idea['benefit_level'])
+                    approvals.append((points, rules.version, approved_at, idea_id))
+                    score_changes.append((idea['engineer_id'], idea['category'], idea['service_area'], approved_at, 0, points))
+                    approved.append(idea_id)
+                    results[index] = {'id': idea_id, 'status': 'approved', 'points_awarded': points}
+                else:
+                    rejections.append((str(item['rejection_reason']).strip(), idea_id))
+                    rejected.append(idea_id)
+                    results[index] = {'id': idea_id, 'status': 'rejected'}
+            
+            conn.executemany('''
+                UPDATE ideas
+                SET status = 'approved', points = ?, rules_version = ?, approved_at = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', approvals)
+            conn.executemany('''
+                UPDATE ideas
+                SET status = 'rejected', rejection_reason = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', rejections)
+            apply_score_changes(conn, score_changes)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        
+        if approved or rejected:
+            response_cache.invalidate()
+        for idea_id in approved:
+            similarity_index.set_status(idea_id, 'approved')
+        for idea_id in rejected:
+            similarity_index.remove(idea_id)
+        if approved or rejected:
+            event_broker.publish('ideas_reviewed', {'approved': len(approved), 'rejected': len(rejected)})
+            gained = {}
+            for engineer_id, _, _, _, _, points in score_changes:
+                gained[engineer_id] = gained.get(engineer_id, 0) + points
+            publish_leaderboard_changes(conn, gained)
+        
+        return jsonify({
+            'approved': len(approved),
+            'rejected': len(rejected),
+            'failed': len(items) - len(approved) - len(rejected),
+            'results': results
+        })
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/ideas/<idea_id>', methods=['GET'])
+@token_required(read_only=True)
 def get_idea(idea_id):
     try:
         conn = get_db_connection()
-        idea = conn.execute('''
-            SELECT 
-                i.*, 
-                u.display_name as engineer_name, u.username as engineer_username,
-                s.display_name as assigned_sdm_name
-            FROM ideas i
-            LEFT JOIN users u ON i.engineer_id = u.id
-            LEFT JOIN users s ON i.assigned_sdm_id = s.id
-            WHERE i.id = ?
-        ''', (idea_id,)).fetchone()
-        
-        conn.close()
+        idea = conn.execute(IDEA_DETAIL_SQL, (idea_id,)).fetchone()
         
         if not idea:
             return jsonify({'error': 'Idea not found'}), 404
@@ -625,8 +4312,42 @@ def get_idea(idea_id):
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
+@app.route('/api/ideas/details', methods=['POST'])
+@token_required(read_only=True)
+def get_idea_details():
+    """Full details for up to IDEA_PAGE_MAX ideas in one request"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        idea_ids = data.get('ids')
+        
+        if not isinstance(idea_ids, list) or not all(isinstance(idea_id, str) for idea_id in idea_ids):
+            return jsonify({'error': 'ids must be a list of idea ids'}), 400
+        if len(idea_ids) > IDEA_PAGE_MAX:
+            return jsonify({'error': f'At most {IDEA_PAGE_MAX} ids per request'}), 400
+        
+        conn = get_db_connection()
+        details = fetch_idea_details(conn, idea_ids)
+        # Engineers see approved ideas and their own, as in search
+        if request.current_user['role'] != 'SDM':
+            viewer_id = request.current_user['id']
+            details = {
+                idea_id: idea for idea_id, idea in details.items()
+                if idea['status'] == 'approved' or idea['engineer_id'] == viewer_id
+            }
+        requested = list(dict.fromkeys(idea_ids))
+        
+        return jsonify({
+            'ideas': [details[idea_id] for idea_id in requested if idea_id in details],
+            'missing': [idea_id for idea_id in requested if idea_id not in details]
+        })
+        
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
 @app.route('/api/ideas/<idea_id>/similarity', methods=['GET'])
-@token_required
+@token_required(read_only=True)
 @require_role('SDM')
 def check_similarity(idea_id):
     try:
@@ -635,163 +4356,451 @@ def check_similarity(idea_id):
         # Get the target idea
         target_idea = conn.execute('SELECT * FROM ideas WHERE id = ?', (idea_id,)).fetchone()
         if not target_idea:
-            conn.close()
             return jsonify({'error': 'Idea not found'}), 404
         
-        # Get all other ideas (pending or approved)
-        other_ideas = conn.execute('''
-            SELECT id, title, description, category, status
-            FROM ideas 
-            WHERE id != ? AND (status = 'pending' OR status = 'approved')
-        ''', (idea_id,)).fetchall()
+        target_text = similarity_text(target_idea['title'], target_idea['description'])
+        if not target_text:
+            return jsonify({'similar_ideas': []})
         
-        conn.close()
+        # Top 5 neighbours above the threshold from the persistent index
+        matches = similarity_index.query(target_text, exclude_ids=(idea_id,))
+        similar_ideas = similar_idea_rows(conn, matches)
         
-        if not other_ideas:
-            return jsonify({'similar_ideas': []})
+        return jsonify({'similar_ideas': similar_ideas})
+        
+    except Exception as e:
+        print(f"Similarity check error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/ideas/similarity/batch', methods=['POST'])
+@token_required(read_only=True)
+@require_role('SDM')
+def check_similarity_batch():
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        conn = get_db_connection()
         
-        # Prepare texts for similarity
-        target_text = f"{target_idea['title'] or ''} {target_idea['description'] or ''}".strip()
-        other_texts = [f"{idea['title'] or ''} {idea['description'] or ''}".strip() for idea in other_ideas]
+        try:
+            top_k = min(max(int(data.get('top_k', SIMILARITY_TOP_K)), 1), 50)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'top_k must be an integer'}), 400
         
-        if not target_text:
-            return jsonify({'similar_ideas': []})
+        # Targets: a page of the caller's pending worklist (oldest first,
+        # continued with `cursor`) or an explicit id list
+        not_found = []
+        next_cursor = None
+        if data.get('worklist'):
+            try:
+                cursor = decode_cursor(str(data['cursor'])) if data.get('cursor') else None
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            sql, params = idea_list_query(
+                'worklist', (request.current_user['id'],), ('title', 'description'),
+                cursor=cursor, limit=SIMILARITY_BATCH_LIMIT + 1
+            )
+            targets = conn.execute(sql, params).fetchall()
+            if len(targets) > SIMILARITY_BATCH_LIMIT:
+                targets = targets[:SIMILARITY_BATCH_LIMIT]
+                next_cursor = encode_cursor(targets[-1])
+        else:
+            idea_ids = data.get('idea_ids')
+            if not isinstance(idea_ids, list) or not idea_ids:
+                return jsonify({'error': 'idea_ids or worklist is required'}), 400
+            if not all(isinstance(idea_id, str) for idea_id in idea_ids):
+                return jsonify({'error': 'idea_ids must be a list of idea ids'}), 400
+            if len(idea_ids) > SIMILARITY_BATCH_LIMIT:
+                return jsonify({'error': f'At most {SIMILARITY_BATCH_LIMIT} ideas per batch'}), 400
+            
+            idea_ids = list(dict.fromkeys(idea_ids))
+            rows = {
+                row['id']: row for row in conn.execute(f'''
+                    SELECT id, title, description FROM ideas
+                    WHERE id IN ({', '.join('?' * len(idea_ids))})
+                ''', idea_ids)
+            }
+            targets = [rows[idea_id] for idea_id in idea_ids if idea_id in rows]
+            not_found = [idea_id for idea_id in idea_ids if idea_id not in rows]
         
-        # Combine for vectorization
-        all_texts = [target_text] + other_texts
+        target_ids = [target['id'] for target in targets]
+        if not targets:
+            return jsonify({'results': {}, 'not_found': not_found, 'next_cursor': None})
         
-        # Simple preprocessing
-        def preprocess(text):
-            text = text.lower()
-            text = re.sub(r'[^\w\s]', '', text)
-            return text
+        # One vectorization and one sparse product for the whole batch
+        vectors = similarity_index.transform([
+            similarity_text(target['title'], target['description']) for target in targets
+        ])
+        matches = similarity_index.query_vectors(
+            vectors, k=top_k, exclude_ids=[(idea_id,) for idea_id in target_ids]
+        )
+        similar = similar_idea_rows_many(conn, matches)
         
-        all_texts = [preprocess(text) for text in all_texts]
+        response = {
+            'results': dict(zip(target_ids, similar)),
+            'not_found': not_found,
+            'next_cursor': next_cursor
+        }
+        if data.get('clusters'):
+            response['clusters'] = duplicate_clusters(vectors, target_ids)
         
-        # TF-IDF vectorization
-        vectorizer = TfidfVectorizer(stop_words='english', ngram_range=(1, 2))
-        tfidf_matrix = vectorizer.fit_transform(all_texts)
+        return jsonify(response)
         
-        # Cosine similarity
-        similarity_scores = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:]).flatten()
+    except Exception as e:
+        print(f"Batch similarity check error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/ideas/similar-draft', methods=['POST'])
+@token_required(read_only=True)
+def similar_draft():
+    """Top matches for an idea that has not been submitted yet"""
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'error': 'Expected a JSON object'}), 400
+        draft_key = (request.current_user['id'], str(data.get('draft_id', '')))
+        seq = data.get('seq')
+        if seq is not None and (not isinstance(seq, int) or isinstance(seq, bool)):
+            return jsonify({'error': 'seq must be an integer'}), 400
+        if seq is not None and not draft_matcher.begin(draft_key, seq):
+            return jsonify({'similar_ideas': [], 'superseded': True})
         
-        # Get top 5 similar ideas
-        similar_indices = similarity_scores.argsort()[::-1][:5]
+        text = draft_similarity_text(data)
+        if len(text) < SIMILARITY_DRAFT_MIN_CHARS:
+            return jsonify({'similar_ideas': []})
+        if not similarity_index.ready:
+            draft_matcher.warm()
+            return jsonify({'similar_ideas': [], 'ready': False})
         
-        similar_ideas = []
-        for idx in similar_indices:
-            if similarity_scores[idx] > 0.1:  # Threshold
-                idea = dict(other_ideas[idx])
-                idea['similarity_score'] = round(float(similarity_scores[idx]) * 100, 2)
-                similar_ideas.append(idea)
+        matches = draft_matcher.matches(text)
+        if seq is not None and not draft_matcher.current(draft_key, seq):
+            return jsonify({'similar_ideas': [], 'superseded': True})
         
-        return jsonify({'similar_ideas': similar_ideas})
+        conn = get_db_connection()
+        viewer_id = None if request.current_user['role'] == 'SDM' else request.current_user['id']
+        return jsonify({'similar_ideas': similar_idea_rows(conn, matches, viewer_id)})
         
     except Exception as e:
-        print(f"Similarity check error: {str(e)}")
+        print(f"Draft similarity error: {str(e)}")
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/ideas/approved/all', methods=['GET'])
-@token_required
+@token_required(read_only=True)
 @require_role('SDM')
 def get_approved_ideas():
     try:
         conn = get_db_connection()
-        # First check if title column exists, if not add it
-        try:
-            conn.execute("SELECT title FROM ideas LIMIT 1")
-        except:
-            # Title column doesn't exist, add it
-            conn.execute("ALTER TABLE ideas ADD COLUMN title TEXT DEFAULT 'Untitled Idea'")
-            conn.commit()
-        
-        ideas = conn.execute('''
-            SELECT 
-                i.id, 
-                COALESCE(i.title, 'Untitled Idea') as title,
-                i.description,
-                i.category, 
-                i.service_area, 
-                i.benefit_level, 
-                i.points, 
-                i.submission_date,
-                i.status, 
-                i.implemented, 
-                u.display_name as engineer_name
-            FROM ideas i
-            JOIN users u ON i.engineer_id = u.id
-            WHERE i.status = 'approved'
-            ORDER BY i.submission_date DESC
-        ''').fetchall()
-        
-        conn.close()
-        
-        ideas_list = []
-        for idea in ideas:
-            ideas_list.append(dict(idea))
-        
-        return jsonify({'ideas': ideas_list})
+        return jsonify(idea_list_page(conn, 'approved', request.args))
         
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error in get_approved_ideas: {str(e)}")
         return jsonify({'error': f'Internal server error: {str(e)}'}), 500
 
+@app.route('/api/ideas/search', methods=['GET'])
+@token_required(read_only=True)
+def search_ideas():
+    """Ranked full-text search; engineers see approved ideas and their own"""
+    try:
+        conn = get_db_connection()
+        viewer_id = None if request.current_user['role'] == 'SDM' else request.current_user['id']
+        return jsonify(idea_search_page(conn, request.args, viewer_id))
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"Search error: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
 # Leaderboard endpoints
 @app.route('/api/leaderboard/', methods=['GET'])
 def get_leaderboard():
+    """All-time top 50, or a windowed/segmented board from the rollups
+    
+    Query parameters: window (week, month, quarter, year or all), at (a
+    YYYY-MM-DD date inside the wanted period, default today in UTC),
+    category and service_area.
+    """
     try:
-        conn = get_db_connection()
+        window, at, category, service_area = parse_leaderboard_args(request.args)
+        if window == 'all' and not category and not service_area:
+            return cached_json_response('leaderboard', build_leaderboard_payload)
         
-        # Get leaderboard
-        leaderboard = conn.execute('''
-            SELECT 
-                u.display_name, u.username,
-                SUM(i.points) as total_points,
-                COUNT(i.id) as total_ideas
-            FROM users u
-            JOIN ideas i ON u.id = i.engineer_id
-            WHERE i.status = 'approved' AND i.points > 0
-            GROUP BY u.id, u.display_name, u.username
-            ORDER BY total_points DESC
-            LIMIT 50
-        ''').fetchall()
-        
-        # Get recent activities
-        recent_activities = conn.execute('''
-            SELECT 
-                i.category, i.submission_date, i.points,
-                u.display_name as engineer_name
-            FROM ideas i
-            JOIN users u ON i.engineer_id = u.id
-            WHERE i.status = 'approved' AND i.points > 0
-            ORDER BY i.updated_at DESC
-            LIMIT 10
-        ''').fetchall()
-        
-        conn.close()
+        # Cache keys only from normalized values: the window's first day
+        # rather than the raw date, and service areas that have rollups (any
+        # other string has an empty board and is answered uncached)
+        start = leaderboard_window(window, at)[2]
+        if service_area and service_area not in known_service_areas(get_db_connection()):
+            return jsonify(build_windowed_leaderboard_payload(window, at, category, service_area))
+        return cached_json_response(
+            ('leaderboard', window, start.isoformat() if start else None, category, service_area),
+            lambda: build_windowed_leaderboard_payload(window, start or at, category, service_area)
+        )
         
-        return jsonify({
-            'leaderboard': [dict(row) for row in leaderboard],
-            'recent_activities': [dict(row) for row in recent_activities]
-        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+def build_leaderboard_payload():
+    """Leaderboard and recent activities, as served by get_leaderboard"""
+    conn = get_db_connection()
+    
+    # Get leaderboard
+    leaderboard = conn.execute(LEADERBOARD_SQL).fetchall()
+    
+    # Get recent activities
+    recent_activities = conn.execute(RECENT_ACTIVITIES_SQL).fetchall()
+    
+    return {
+        'leaderboard': [dict(row) for row in leaderboard],
+        'recent_activities': [dict(row) for row in recent_activities]
+    }
+
+def build_windowed_leaderboard_payload(window, at, category=None, service_area=None):
+    """Top engineers for one window and segment, summed from the rollups"""
+    conn = get_db_connection()
+    grain, buckets, start, end = leaderboard_window(window, at)
+    sql, params = windowed_leaderboard_query(grain, buckets, category, service_area)
+    
+    return {
+        'leaderboard': [dict(row) for row in conn.execute(sql, params)],
+        'window': {
+            'window': window,
+            'start': start.isoformat() if start else None,
+            'end': end.isoformat() if end else None,
+            'category': category,
+            'service_area': service_area
+        }
+    }
+
+# Event stream endpoint
+@app.route('/api/events', methods=['GET'])
+def get_events():
+    """SSE stream: public events for everyone, plus the caller's own when authenticated"""
+    if request.headers.get('Authorization'):
+        return token_required(open_event_stream, read_only=True)()
+    request.current_user = None
+    return open_event_stream()
+
+def open_event_stream():
+    try:
+        user = request.current_user
+        subscriber = event_broker.subscribe(
+            user['id'] if user else None,
+            request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        )
+    except EventBrokerFull:
+        response = jsonify({'error': 'Too many event streams, please retry shortly'})
+        response.headers['Retry-After'] = str(int(EVENTS_HEARTBEAT))
+        return response, 503
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+    
+    # Deliberately not stream_with_context: the request's pooled connection
+    # goes back to the pool now instead of being held for the whole stream
+    response = Response(event_broker.stream(subscriber), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+    # Also covers a client that disconnects before the stream starts
+    response.call_on_close(lambda: event_broker.unsubscribe(subscriber))
+    return response
+
+# Export endpoints
+# Exports stream straight from a SQLite cursor in batches, so memory stays
+# flat however many rows there are. Each export reads from its own read-only
+# connection inside one transaction: WAL gives it a consistent snapshot for
+# the whole download while approvals keep committing alongside.
+EXPORT_BATCH_SIZE = 500
+EXPORT_FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv'}
+EXPORT_STATUSES = ('pending', 'approved', 'rejected')
+
+EXPORT_IDEAS_COLUMNS = (
+    'id', 'title', 'category', 'service_area', 'benefit_level', 'status', 'implemented',
+    'points', 'submission_date', 'updated_at', 'engineer_username', 'engineer_name',
+    'assigned_sdm_username', 'assigned_sdm_name', 'description', 'security_gap',
+    'possible_solution', 'automation_opportunity', 'automation_solution',
+    'innovative_idea', 'rejection_reason'
+)
+
+EXPORT_IDEAS_SQL = '''
+    SELECT 
+        i.id, i.title, i.category, i.service_area, i.benefit_level, i.status, i.implemented,
+        i.points, i.submission_date, i.updated_at,
+        u.username as engineer_username, u.display_name as engineer_name,
+        s.username as assigned_sdm_username, s.display_name as assigned_sdm_name,
+        i.description, i.security_gap, i.possible_solution, i.automation_opportunity,
+        i.automation_solution, i.innovative_idea, i.rejection_reason
+    FROM ideas i
+    LEFT JOIN users u ON i.engineer_id = u.id
+    LEFT JOIN users s ON i.assigned_sdm_id = s.id
+    WHERE {conditions}
+    ORDER BY i.rowid
+'''
+
+EXPORT_LEADERBOARD_COLUMNS = ('rank', 'username', 'display_name', 'total_points', 'total_ideas') + tuple(
+    f"{column}_{kind}" for column in SCORE_CATEGORY_COLUMNS.values() for kind in ('points', 'ideas')
+)
+
+# Aggregated from ideas rather than user_scores so date/category filters apply
+EXPORT_LEADERBOARD_SQL = f'''
+    SELECT 
+        u.username, u.display_name,
+        SUM(i.points) as total_points,
+        COUNT(*) as total_ideas,
+        {', '.join(
+            f"SUM(CASE WHEN i.category = '{category}' THEN i.points ELSE 0 END) as {column}_points, "
+            f"SUM(i.category = '{category}') as {column}_ideas"
+            for category, column in SCORE_CATEGORY_COLUMNS.items()
+        )}
+    FROM ideas i
+    JOIN users u ON u.id = i.engineer_id
+    WHERE {{conditions}}
+    GROUP BY i.engineer_id
+    ORDER BY total_points DESC, u.username
+'''
+
+def open_snapshot_connection():
+    """Read-only connection whose open transaction pins one WAL snapshot"""
+    path = urllib.parse.quote(os.path.abspath(db_pool.db_path))
+    conn = sqlite3.connect(
+        f'file:{path}?mode=ro', uri=True, timeout=DB_POOL_TIMEOUT, check_same_thread=False,
+        factory=DB_CONNECTION_CLASS
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute('BEGIN')
+    return conn
+
+def export_response(conn, cursor, columns, filename, fmt, row_values=None):
+    """Stream cursor's rows as NDJSON or CSV, gzipped if the client accepts it
+    
+    row_values(index, row) may rewrite each row's values (in column order).
+    conn is closed once the response is done, whether or not it completed.
+    """
+    def lines():
+        if fmt == 'csv':
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+        index = 0
+        while True:
+            batch = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not batch:
+                break
+            values = []
+            for row in batch:
+                values.append(row_values(index, row) if row_values else tuple(row))
+                index += 1
+            if fmt == 'csv':
+                writer.writerows(values)
+                chunk = buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            else:
+                chunk = ''.join(json.dumps(dict(zip(columns, row)), default=str) + '\n' for row in values)
+            yield chunk.encode('utf-8')
+    
+    def gzipped(chunks):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = gzip container
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    
+    headers = {
+        'Content-Disposition': f'attachment; filename="{filename}.{fmt}"',
+        'Cache-Control': 'no-store'
+    }
+    body = lines()
+    if 'gzip' in request.accept_encodings:
+        body = gzipped(body)
+        headers['Content-Encoding'] = 'gzip'
+        headers['Vary'] = 'Accept-Encoding'
+    
+    response = Response(body, mimetype=EXPORT_FORMATS[fmt], headers=headers)
+    response.call_on_close(conn.close)
+    return response
+
+def parse_export_args(args, allow_status=True):
+    """(format, [(condition, value)]) from export query args; raises ValueError"""
+    fmt = args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    
+    filters = parse_idea_filters(args)
+    if allow_status and args.get('status'):
+        statuses = [status.strip() for status in args['status'].split(',') if status.strip()]
+        unknown = [status for status in statuses if status not in EXPORT_STATUSES]
+        if unknown:
+            raise ValueError(f"Unknown status: {', '.join(unknown)}")
+        filters.append((f"i.status IN ({', '.join('?' * len(statuses))})", statuses))
+    return fmt, filters
+
+def filter_sql(base_conditions, filters):
+    """(WHERE conditions, params) from fixed conditions plus parsed filters"""
+    conditions, params = list(base_conditions), []
+    for condition, value in filters:
+        conditions.append(condition)
+        params += value if isinstance(value, list) else [value]
+    return ' AND '.join(conditions), params
+
+@app.route('/api/export/ideas', methods=['GET'])
+@token_required
+@require_role('SDM')
+def export_ideas():
+    """Every idea (optionally filtered) with engineer/SDM names, streamed"""
+    try:
+        fmt, filters = parse_export_args(request.args)
+        conditions, params = filter_sql(['1 = 1'], filters)
         
+        conn = open_snapshot_connection()
+        try:
+            cursor = conn.execute(EXPORT_IDEAS_SQL.format(conditions=conditions), params)
+        except Exception:
+            conn.close()
+            raise
+        return export_response(conn, cursor, EXPORT_IDEAS_COLUMNS, f"ideas-{datetime.now():%Y%m%d}", fmt)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': 'Internal server error'}), 500
+
+@app.route('/api/export/leaderboard', methods=['GET'])
+@token_required
+@require_role('SDM')
+def export_leaderboard():
+    """Per-engineer totals over approved ideas (optionally filtered), streamed"""
+    try:
+        fmt, filters = parse_export_args(request.args, allow_status=False)
+        conditions, params = filter_sql(["i.status = 'approved'", 'i.points > 0'], filters)
+        
+        conn = open_snapshot_connection()
+        try:
+            cursor = conn.execute(EXPORT_LEADERBOARD_SQL.format(conditions=conditions), params)
+        except Exception:
+            conn.close()
+            raise
+        return export_response(
+            conn, cursor, EXPORT_LEADERBOARD_COLUMNS, f"leaderboard-{datetime.now():%Y%m%d}", fmt,
+            row_values=lambda index, row: (index + 1, *row)
+        )
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Internal server error'}), 500
 
 # Users endpoints
 @app.route('/api/users/sdms', methods=['GET'])
-@token_required
+@token_required(read_only=True)
 def get_sdms():
     try:
         conn = get_db_connection()
-        sdms = conn.execute('''
-            SELECT id, username, display_name, email
-            FROM users
-            WHERE role = 'SDM'
-            ORDER BY display_name
-        ''').fetchall()
-        
-        conn.close()
+        sdms = conn.execute(SDMS_SQL).fetchall()
         
         return jsonify({'sdms': [dict(row) for row in sdms]})
         
@@ -808,5 +4817,9 @@ def serve_static(path):
     return send_from_directory('.', path)
 
 if __name__ == '__main__':
+    # Development server; production runs `gunicorn -c gunicorn.conf.py`
     init_database()
-    app.run(host='0.0.0.0', port=4444, debug=True)
+    if APP_WARMUP == 'eager':
+        print(f"Similarity stack warmed up in {warmup()}s")
+    start_worker()
+    app.run(host='0.0.0.0', port=4444, debug=os.environ.get('FLASK_DEBUG') == '1')
@@ -0,0 +1,71 @@
+"""Production server settings: gunicorn -c gunicorn.conf.py
+
+Each setting can be overridden through the environment variable it reads.
+"""
+import os
+import signal
+import subprocess
+import sys
+
+# Workers only report ready once the similarity index is loaded
+os.environ.setdefault('APP_WARMUP', 'eager')
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+wsgi_app = 'app:create_app()'
+bind = os.environ.get('BIND', '0.0.0.0:4444')
+
+# SQLite serializes writes, so a few processes with many threads each beats
+# many processes; threads also keep /api/events streams cheap
+worker_class = 'gthread'
+workers = int(os.environ.get('WEB_CONCURRENCY', '2'))
+threads = int(os.environ.get('GUNICORN_THREADS', '16'))
+# Every open event stream holds a thread; keep half for ordinary requests
+os.environ.setdefault('EVENTS_MAX_CLIENTS', str(max(threads // 2, 1)))
+
+# Import the app (and scikit-learn) once in the master and fork from there
+preload_app = True
+
+# Recycle workers now and then to cap slow memory growth; the jitter stops
+# them all restarting at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '2000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '200'))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '30'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '20'))
+keepalive = 5
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+
+
+def on_starting(server):
+    """Apply migrations once, in a separate process, before any worker forks"""
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'init-db'], cwd=chdir, check=True)
+
+
+def post_worker_init(worker):
+    import app
+
+    app.start_worker()
+
+    # gunicorn stops accepting on SIGTERM and waits for open connections;
+    # also fail readiness and end event streams so the wait is short
+    handle_exit = worker.handle_exit
+
+    def drain(signum, frame):
+        app.begin_shutdown()
+        handle_exit(signum, frame)
+
+    signal.signal(signal.SIGTERM, drain)
+
+
+def post_request(worker, req, environ, resp):
+    # max_requests reached: this worker is about to recycle
+    if not worker.alive:
+        import app
+
+        app.begin_shutdown()
+
+
+def worker_exit(server, worker):
+    import app
+
+    app.shutdown()
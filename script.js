@@ -2,6 +2,30 @@
 let currentUser = null;
 let authToken = null;
 const API_BASE_URL = '/api';
+// Last leaderboard payload, reused when the server answers 304 Not Modified
+let leaderboardCache = { etag: null, data: null };
+// Keyset cursors for the next page of each paged idea list
+let approvedNextCursor = null;
+let myIdeasNextCursor = null;
+let worklistNextCursor = null;
+const APPROVED_PAGE_SIZE = 50;
+const IDEA_PAGE_SIZE = 50;
+// Live updates from /api/events (see connectEventStream)
+let eventStreamController = null;
+let lastEventId = null;
+let eventStreamRetryDelay = 2000;
+const eventRefreshTimers = {};
+// Anonymous visitors poll the leaderboard instead (see syncEventStream)
+let leaderboardPollTimer = null;
+const LEADERBOARD_POLL_INTERVAL = 60000;
+// Ids in the engineer's current list, to tell which approvals concern them
+let myIdeaIds = new Set();
+// Similar-ideas hints in the submit form (see checkDraftSimilarity)
+let draftSimilarityTimer = null;
+let draftSimilarityController = null;
+let draftId = null;
+let draftSeq = 0;
+const DRAFT_SIMILARITY_DELAY = 250;
 
 // DOM elements
 const pages = {
@@ -56,31 +80,25 @@ function buildIdeaDescription(idea = {}) {
     return 'No description';
 }
 
-async function enrichIdeaWithDetails(idea) {
-    if (!idea || typeof idea !== 'object') return idea;
-    if (!idea.id) return idea;
-    
+// Rows from include=details lists and /ideas/details carry both joined names
+function hasIdeaDetails(idea) {
+    return 'engineer_name' in idea && 'assigned_sdm_name' in idea;
+}
+
+function needsIdeaDetails(idea) {
+    if (!idea || typeof idea !== 'object' || !idea.id) return false;
+    if (hasIdeaDetails(idea)) return false;
     // Always try to enrich approved ideas since they may not have description in list view
-    if (idea.status !== 'approved' && (idea.description && idea.description.trim())) return idea;
+    return idea.status === 'approved' || !(idea.description && idea.description.trim());
+}
+
+async function enrichIdeaWithDetails(idea) {
+    if (!needsIdeaDetails(idea)) return idea;
 
     try {
-        // Try different endpoints for approved ideas
-        let endpoint = `${API_BASE_URL}/ideas/${idea.id}`;
-        if (idea.status === 'approved') {
-            // Try approved-specific endpoint first
-            endpoint = `${API_BASE_URL}/ideas/${idea.id}`;
-        }
-        
-        let response = await fetch(endpoint, {
+        const response = await fetch(`${API_BASE_URL}/ideas/${idea.id}`, {
             headers: authToken ? { 'Authorization': `Bearer ${authToken}` } : {}
         });
-        
-        // If approved endpoint fails, try general endpoint
-        if (!response.ok && idea.status === 'approved') {
-            response = await fetch(`${API_BASE_URL}/ideas/${idea.id}`, {
-                headers: authToken ? { 'Authorization': `Bearer ${authToken}` } : {}
-            });
-        }
 
         if (!response.ok) {
             return idea;
@@ -97,7 +115,31 @@ async function enrichIdeaWithDetails(idea) {
 
 async function enrichIdeaList(ideas) {
     if (!Array.isArray(ideas)) return [];
-    return Promise.all(ideas.map(enrichIdeaWithDetails));
+    
+    // One bulk request for whatever still lacks details, never one per idea
+    const missing = ideas.filter(needsIdeaDetails).map(idea => idea.id);
+    if (missing.length === 0) return ideas;
+    
+    try {
+        const response = await fetch(`${API_BASE_URL}/ideas/details`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                ...(authToken ? { 'Authorization': `Bearer ${authToken}` } : {})
+            },
+            body: JSON.stringify({ ids: missing })
+        });
+        if (!response.ok) {
+            return ideas;
+        }
+        
+        const data = await response.json();
+        const detailsById = new Map((data.ideas || []).map(detail => [detail.id, detail]));
+        return ideas.map(idea => (idea && detailsById.has(idea.id)) ? { ...idea, ...detailsById.get(idea.id) } : idea);
+    } catch (error) {
+        console.error('Failed to enrich idea details:', error);
+        return ideas;
+    }
 }
 
 const navLinks = document.querySelectorAll('.nav-menu a[data-page]');
@@ -162,6 +204,14 @@ function setupEventListeners() {
     // Theme toggle
     themeToggle.addEventListener('click', toggleTheme);
 
+    // Background tabs give their event stream (or leaderboard poll) back
+    document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'visible' && !authToken && isPageVisible('home')) {
+            loadHomePageData();
+        }
+        syncEventStream();
+    });
+
     // Hero submit idea button
     document.getElementById('submitIdeaHeroBtn').addEventListener('click', () => {
         if (currentUser) {
@@ -295,6 +345,7 @@ function setupModalEvents() {
     const ideaForm = document.getElementById('ideaSubmissionForm');
     if (ideaForm) {
         ideaForm.addEventListener('submit', handleIdeaSubmission);
+        ideaForm.addEventListener('input', scheduleDraftSimilarity);
     }
 
     // Similarity modal events
@@ -358,6 +409,8 @@ function showPage(pageName) {
                 break;
         }
     }
+    
+    syncEventStream();
 }
 
 async function checkAuthStatus() {
@@ -463,6 +516,8 @@ async function handleLogin(e) {
             localStorage.setItem('currentUser', JSON.stringify(currentUser));
             
             updateAuthUI();
+            disconnectEventStream();
+            syncEventStream();
             showToast('Login successful!', 'success');
             hideModal('authModal');
             showPage('dashboard');
@@ -513,6 +568,8 @@ async function handleRegister(e) {
             localStorage.setItem('currentUser', JSON.stringify(currentUser));
             
             updateAuthUI();
+            disconnectEventStream();
+            syncEventStream();
             showToast('Registration successful!', 'success');
             hideModal('authModal');
             showPage('dashboard');
@@ -538,16 +595,148 @@ function handleLogout() {
     localStorage.removeItem('currentUser');
     
     updateAuthUI();
+    disconnectEventStream();
     showToast('Logged out successfully', 'success');
     showPage('home');
 }
 
+// Live updates: one streaming request to /api/events (fetch rather than
+// EventSource so the auth header can be sent). Events only say what changed;
+// the affected view is re-fetched, debounced, if it is on screen.
+// Each open stream holds a server thread, so only a signed-in user's
+// foreground tab keeps one; a tab coming back reconnects with Last-Event-ID
+// and gets what it missed replayed. Anonymous visitors (wall displays
+// included) poll the leaderboard with a conditional GET, mostly a bodiless 304.
+function isPageVisible(pageName) {
+    return Boolean(pages[pageName]) && pages[pageName].style.display !== 'none';
+}
+
+function syncEventStream() {
+    const foreground = document.visibilityState !== 'hidden';
+    if (foreground && authToken) {
+        if (!eventStreamController) connectEventStream();
+    } else {
+        disconnectEventStream();
+    }
+    
+    const poll = foreground && !authToken && isPageVisible('home');
+    if (poll && !leaderboardPollTimer) {
+        leaderboardPollTimer = setInterval(loadHomePageData, LEADERBOARD_POLL_INTERVAL);
+    } else if (!poll && leaderboardPollTimer) {
+        clearInterval(leaderboardPollTimer);
+        leaderboardPollTimer = null;
+    }
+}
+
+function disconnectEventStream() {
+    if (eventStreamController) {
+        eventStreamController.abort();
+        eventStreamController = null;
+    }
+}
+
+function connectEventStream() {
+    if (eventStreamController) {
+        eventStreamController.abort();
+    }
+    const controller = new AbortController();
+    eventStreamController = controller;
+    
+    const headers = {};
+    if (authToken) headers['Authorization'] = `Bearer ${authToken}`;
+    if (lastEventId) headers['Last-Event-ID'] = lastEventId;
+    
+    fetch(`${API_BASE_URL}/events`, { headers, signal: controller.signal, cache: 'no-store' })
+        .then(async response => {
+            if (!response.ok || !response.body) {
+                throw new Error(`Event stream failed: ${response.status}`);
+            }
+            eventStreamRetryDelay = 2000;
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+                const frames = buffer.split('\n\n');
+                buffer = frames.pop();
+                frames.forEach(parseServerEvent);
+            }
+        })
+        .catch(error => {
+            if (controller.signal.aborted) return;
+            console.error('Event stream error:', error);
+        })
+        .finally(() => {
+            if (controller.signal.aborted || eventStreamController !== controller) return;
+            // Reconnect with backoff; Last-Event-ID replays what was missed
+            setTimeout(() => {
+                if (eventStreamController === controller) connectEventStream();
+            }, eventStreamRetryDelay);
+            eventStreamRetryDelay = Math.min(eventStreamRetryDelay * 2, 30000);
+        });
+}
+
+function parseServerEvent(frame) {
+    let type = 'message';
+    let data = '';
+    frame.split('\n').forEach(line => {
+        if (line.startsWith('id:')) lastEventId = line.slice(3).trim();
+        else if (line.startsWith('event:')) type = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+    });
+    if (!data) return;
+    try {
+        handleServerEvent(type, JSON.parse(data));
+    } catch (error) {
+        console.error('Bad server event:', error);
+    }
+}
+
+function handleServerEvent(type, data) {
+    const homeVisible = pages.home && pages.home.style.display !== 'none';
+    const dashboardVisible = pages.dashboard && pages.dashboard.style.display !== 'none' && currentUser;
+    
+    if (homeVisible && ['leaderboard', 'idea_approved', 'ideas_reviewed', 'resync'].includes(type)) {
+        scheduleRefresh('home', loadHomePageData);
+    }
+    if (!dashboardVisible) return;
+    
+    if (currentUser.role === 'SDM' &&
+        ['idea_submitted', 'ideas_submitted', 'idea_approved', 'ideas_reviewed', 'resync'].includes(type)) {
+        scheduleRefresh('sdm', loadSDMData);
+    }
+    if (currentUser.role === 'Service Engineer' &&
+        (['idea_rejected', 'ideas_reviewed', 'resync'].includes(type) ||
+         (type === 'idea_approved' && myIdeaIds.has(data.id)))) {
+        scheduleRefresh('engineer', loadServiceEngineerData);
+    }
+}
+
+function scheduleRefresh(key, load) {
+    // Bursts (e.g. a bulk review) collapse into one re-fetch
+    clearTimeout(eventRefreshTimers[key]);
+    eventRefreshTimers[key] = setTimeout(load, 300);
+}
+
 async function loadHomePageData() {
     try {
-        const response = await fetch(`${API_BASE_URL}/leaderboard/`);
+        // Conditional GET: an unchanged leaderboard costs a bodiless 304
+        const headers = {};
+        if (leaderboardCache.etag) {
+            headers['If-None-Match'] = leaderboardCache.etag;
+        }
+        const response = await fetch(`${API_BASE_URL}/leaderboard/`, { headers, cache: 'no-store' });
         
-        if (response.ok) {
+        if (response.status === 304 && leaderboardCache.data) {
+            const data = leaderboardCache.data;
+            updateHomePageStats(data);
+            updateLeaderboard(data.leaderboard);
+            updateRecentActivities(data.recent_activities);
+        } else if (response.ok) {
             const data = await response.json();
+            leaderboardCache = { etag: response.headers.get('ETag'), data };
             updateHomePageStats(data);
             updateLeaderboard(data.leaderboard);
             updateRecentActivities(data.recent_activities);
@@ -724,7 +913,7 @@ function showServiceEngineerDashboard() {
     // Update welcome message and avatar
     if (currentUser) {
         document.getElementById('welcomeMessage').textContent = `Welcome ${currentUser.display_name}!`;
-        document.getElementById('userAvatar').src = currentUser.avatar_data;
+        document.getElementById('userAvatar').src = currentUser.avatar_url || currentUser.avatar_data || '';
     }
 }
 
@@ -735,14 +924,14 @@ function showSDMDashboard() {
     // Update welcome message and avatar
     if (currentUser) {
         document.getElementById('welcomeMessageSDM').textContent = `Welcome ${currentUser.display_name}!`;
-        document.getElementById('userAvatarSDM').src = currentUser.avatar_data;
+        document.getElementById('userAvatarSDM').src = currentUser.avatar_url || currentUser.avatar_data || '';
     }
 }
 
 async function loadServiceEngineerData() {
     try {
         console.log('Loading Service Engineer data...');
-        const response = await fetch(`${API_BASE_URL}/ideas/my-ideas`, {
+        const response = await fetch(`${API_BASE_URL}/ideas/my-ideas?limit=${IDEA_PAGE_SIZE}&summary=1`, {
             headers: {
                 'Authorization': `Bearer ${authToken}`
             }
@@ -751,7 +940,9 @@ async function loadServiceEngineerData() {
         if (response.ok) {
             const data = await response.json();
             console.log('Service Engineer data loaded:', data);
-            updateUserStats(data.ideas || []);
+            myIdeaIds = new Set((data.ideas || []).map(idea => idea.id));
+            myIdeasNextCursor = data.next_cursor || null;
+            updateUserStats(data.ideas || [], data.summary);
             updateMyIdeasList(data.ideas || []);
         } else {
             console.error('Failed to load Service Engineer data:', response.status);
@@ -773,16 +964,16 @@ async function loadServiceEngineerData() {
 async function loadSDMData() {
     try {
         const [worklistResponse, approvedResponse] = await Promise.all([
-            fetch(`${API_BASE_URL}/ideas/worklist`, {
+            fetch(`${API_BASE_URL}/ideas/worklist?limit=${IDEA_PAGE_SIZE}&summary=1&include=details`, {
                 headers: { 'Authorization': `Bearer ${authToken}` }
             }),
-            fetch(`${API_BASE_URL}/ideas/approved/all`, {
+            fetch(`${API_BASE_URL}/ideas/approved/all?limit=${APPROVED_PAGE_SIZE}&summary=1&include=details`, {
                 headers: { 'Authorization': `Bearer ${authToken}` }
             })
         ]);
         
         let worklistData = { ideas: [] };
-        let approvedData = { ideas: [] };
+        let approvedData = { ideas: [], next_cursor: null, summary: null };
         
         if (worklistResponse.ok) {
             worklistData = await worklistResponse.json();
@@ -799,7 +990,9 @@ async function loadSDMData() {
         const enrichedWorklist = await enrichIdeaList(worklistData.ideas || []);
         const enrichedApproved = await enrichIdeaList(approvedData.ideas || []);
 
-        updateSDMStats(enrichedWorklist, enrichedApproved);
+        worklistNextCursor = worklistData.next_cursor || null;
+        approvedNextCursor = approvedData.next_cursor || null;
+        updateSDMStats(enrichedWorklist, enrichedApproved, approvedData.summary, worklistData.summary);
         updateWorklistIdeas(enrichedWorklist);
         updateApprovedIdeasList(enrichedApproved);
         
@@ -813,11 +1006,18 @@ async function loadSDMData() {
     }
 }
 
-function updateUserStats(ideas) {
+function updateUserStats(ideas, summary = null) {
     // Ensure ideas is an array
     const ideasArray = Array.isArray(ideas) ? ideas : [];
     
-    const stats = {
+    // The list is paged, so totals come from the server summary
+    const stats = summary ? {
+        total: summary.count,
+        approved: summary.approved,
+        pending: summary.pending,
+        rejected: summary.rejected,
+        totalPoints: summary.total_points
+    } : {
         total: ideasArray.length,
         approved: ideasArray.filter(idea => idea && idea.status === 'approved').length,
         pending: ideasArray.filter(idea => idea && idea.status === 'pending').length,
@@ -858,27 +1058,32 @@ function updateUserStats(ideas) {
     `;
 }
 
-function updateSDMStats(worklistIdeas, approvedIdeas) {
+function updateSDMStats(worklistIdeas, approvedIdeas, approvedSummary = null, worklistSummary = null) {
     // Ensure arrays
     const worklistArray = Array.isArray(worklistIdeas) ? worklistIdeas : [];
     const approvedArray = Array.isArray(approvedIdeas) ? approvedIdeas : [];
     
-    const totalPoints = approvedArray.reduce((sum, idea) => sum + (idea && idea.points ? idea.points : 0), 0);
-    const avgPoints = approvedArray.length > 0 ? Math.round(totalPoints / approvedArray.length) : 0;
+    // Both lists are paged, so totals come from the server summaries
+    const pendingCount = worklistSummary ? worklistSummary.count : worklistArray.length;
+    const approvedCount = approvedSummary ? approvedSummary.count : approvedArray.length;
+    const totalPoints = approvedSummary
+        ? approvedSummary.total_points
+        : approvedArray.reduce((sum, idea) => sum + (idea && idea.points ? idea.points : 0), 0);
+    const avgPoints = approvedCount > 0 ? Math.round(totalPoints / approvedCount) : 0;
     
     const statsGrid = document.getElementById('sdmStatsGrid');
     statsGrid.innerHTML = `
         <div class="stat-card">
             <div class="stat-icon icon-pending"><img src="assets/pending.png" alt="Pending Ideas"></div>
             <div class="stat-content">
-                <div class="stat-number">${worklistArray.length}</div>
+                <div class="stat-number">${pendingCount}</div>
                 <div class="stat-label">Pending Idea(s)</div>
             </div>
         </div>
         <div class="stat-card">
             <div class="stat-icon icon-approved"><img src="assets/approved.png" alt="Approved Ideas"></div>
             <div class="stat-content">
-                <div class="stat-number">${approvedArray.length}</div>
+                <div class="stat-number">${approvedCount}</div>
                 <div class="stat-label">Approved Idea(s)</div>
             </div>
         </div>
@@ -917,12 +1122,26 @@ function updateMyIdeasList(ideas) {
         return;
     }
     
-    ideasArray.forEach(idea => {
+    appendMyIdeas(ideasArray);
+}
+
+function appendMyIdeas(ideas) {
+    const ideasList = document.getElementById('myIdeasList');
+    ideas.forEach(idea => {
         if (idea) {  // Ensure idea is not null/undefined
             const ideaCard = createIdeaCard(idea, 'service-engineer');
             ideasList.appendChild(ideaCard);
         }
     });
+    renderLoadMoreButton(ideasList, 'loadMoreMyIdeas', myIdeasNextCursor, loadMoreMyIdeas);
+}
+
+async function loadMoreMyIdeas() {
+    const data = await fetchNextIdeaPage('my-ideas', myIdeasNextCursor);
+    if (!data) return;
+    myIdeasNextCursor = data.next_cursor || null;
+    (data.ideas || []).forEach(idea => myIdeaIds.add(idea.id));
+    appendMyIdeas(data.ideas || []);
 }
 
 async function updateWorklistIdeas(ideas) {
@@ -943,12 +1162,25 @@ async function updateWorklistIdeas(ideas) {
         return;
     }
     
-    ideasArray.forEach(idea => {
+    appendWorklistIdeas(ideasArray);
+}
+
+function appendWorklistIdeas(ideas) {
+    const worklistContainer = document.getElementById('worklistIdeas');
+    ideas.forEach(idea => {
         if (idea) {  // Ensure idea is not null/undefined
             const ideaCard = createSDMWorklistCard(idea);
             worklistContainer.appendChild(ideaCard);
         }
     });
+    renderLoadMoreButton(worklistContainer, 'loadMoreWorklist', worklistNextCursor, loadMoreWorklistIdeas);
+}
+
+async function loadMoreWorklistIdeas() {
+    const data = await fetchNextIdeaPage('worklist', worklistNextCursor, { include: 'details' });
+    if (!data) return;
+    worklistNextCursor = data.next_cursor || null;
+    appendWorklistIdeas(await enrichIdeaList(data.ideas || []));
 }
 
 function updateApprovedIdeasList(ideas) {
@@ -969,12 +1201,61 @@ function updateApprovedIdeasList(ideas) {
         return;
     }
     
-    ideasArray.forEach(idea => {
+    appendApprovedIdeas(ideasArray);
+}
+
+function appendApprovedIdeas(ideas) {
+    const approvedContainer = document.getElementById('approvedIdeasList');
+    ideas.forEach(idea => {
         if (idea) {  // Ensure idea is not null/undefined
             const ideaCard = createIdeaCard(idea, 'sdm-approved');
             approvedContainer.appendChild(ideaCard);
         }
     });
+    renderLoadMoreButton(approvedContainer, 'loadMoreApproved', approvedNextCursor, loadMoreApprovedIdeas);
+}
+
+async function loadMoreApprovedIdeas() {
+    const data = await fetchNextIdeaPage('approved/all', approvedNextCursor, { include: 'details' }, APPROVED_PAGE_SIZE);
+    if (!data) return;
+    approvedNextCursor = data.next_cursor || null;
+    appendApprovedIdeas(await enrichIdeaList(data.ideas || []));
+}
+
+// Moves a paged list's "Load more" button to the end, or drops it on the last page
+function renderLoadMoreButton(container, buttonId, nextCursor, onClick) {
+    const existingButton = document.getElementById(buttonId);
+    if (existingButton) {
+        existingButton.remove();
+    }
+    if (!nextCursor) return;
+    
+    const loadMoreButton = document.createElement('button');
+    loadMoreButton.id = buttonId;
+    loadMoreButton.className = 'btn btn-secondary';
+    loadMoreButton.textContent = 'Load more';
+    loadMoreButton.addEventListener('click', onClick);
+    container.appendChild(loadMoreButton);
+}
+
+// Next page of /ideas/<list> after cursor; null (with a toast) on failure
+async function fetchNextIdeaPage(list, cursor, extraParams = {}, limit = IDEA_PAGE_SIZE) {
+    if (!cursor) return null;
+    
+    try {
+        const params = new URLSearchParams({ limit, cursor, ...extraParams });
+        const response = await fetch(`${API_BASE_URL}/ideas/${list}?${params}`, {
+            headers: { 'Authorization': `Bearer ${authToken}` }
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        return await response.json();
+    } catch (error) {
+        console.error(`Failed to load more ideas (${list}):`, error);
+        showToast('Failed to load more ideas', 'error');
+        return null;
+    }
 }
 
 function createSDMWorklistCard(idea) {
@@ -1394,9 +1675,99 @@ async function showIdeaSubmissionModal() {
         console.error('Failed to load SDMs:', error);
     }
     
+    resetDraftSimilarity();
     showModal('ideaSubmissionModal');
 }
 
+function resetDraftSimilarity() {
+    clearTimeout(draftSimilarityTimer);
+    if (draftSimilarityController) draftSimilarityController.abort();
+    draftSimilarityController = null;
+    draftId = window.crypto && crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random()}`;
+    draftSeq = 0;
+    displayDraftSimilarity([]);
+}
+
+function scheduleDraftSimilarity() {
+    clearTimeout(draftSimilarityTimer);
+    draftSimilarityTimer = setTimeout(checkDraftSimilarity, DRAFT_SIMILARITY_DELAY);
+}
+
+async function checkDraftSimilarity() {
+    const formData = new FormData(document.getElementById('ideaSubmissionForm'));
+    const draft = { draft_id: draftId, seq: ++draftSeq };
+    ['title', 'category', 'security_gap', 'possible_solution', 'automation_opportunity',
+     'automation_solution', 'innovative_idea'].forEach(field => {
+        draft[field] = formData.get(field) || '';
+    });
+    
+    // Only the latest keystroke matters: drop the request still in flight
+    if (draftSimilarityController) draftSimilarityController.abort();
+    const controller = new AbortController();
+    draftSimilarityController = controller;
+    
+    try {
+        const response = await fetch(`${API_BASE_URL}/ideas/similar-draft`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'Authorization': `Bearer ${authToken}`
+            },
+            body: JSON.stringify(draft),
+            signal: controller.signal
+        });
+        const data = await response.json();
+        if (!response.ok || data.superseded || controller !== draftSimilarityController) return;
+        displayDraftSimilarity(data.similar_ideas || []);
+    } catch (error) {
+        if (error.name !== 'AbortError') {
+            console.error('Draft similarity check failed:', error);
+        }
+    }
+}
+
+function displayDraftSimilarity(similarIdeas) {
+    const container = document.getElementById('draftSimilarIdeas');
+    if (!container) return;
+    container.innerHTML = '';
+    if (!similarIdeas.length) {
+        container.style.display = 'none';
+        return;
+    }
+    
+    const heading = document.createElement('h4');
+    heading.textContent = 'Similar ideas already submitted';
+    container.appendChild(heading);
+    
+    similarIdeas.forEach(idea => {
+        const item = document.createElement('div');
+        item.className = 'similarity-item';
+        
+        const header = document.createElement('div');
+        header.className = 'similarity-header';
+        const title = document.createElement('h5');
+        title.textContent = idea.title || 'Untitled Idea';
+        const score = document.createElement('div');
+        score.className = 'similarity-score';
+        score.textContent = `${idea.similarity_score}% match`;
+        header.append(title, score);
+        
+        const meta = document.createElement('div');
+        meta.className = 'similarity-meta';
+        const category = document.createElement('span');
+        category.className = 'tag category';
+        category.textContent = idea.category || 'Unknown';
+        const status = document.createElement('span');
+        status.className = `status-badge ${idea.status === 'approved' ? 'approved' : 'pending'}`;
+        status.textContent = idea.status === 'approved' ? 'Approved' : 'Pending';
+        meta.append(category, status);
+        
+        item.append(header, meta);
+        container.appendChild(item);
+    });
+    container.style.display = 'block';
+}
+
 function showCategoryFields(category) {
     // Hide all category fields
     document.getElementById('securityFields').style.display = 'none';
@@ -1469,6 +1840,7 @@ async function handleIdeaSubmission(e) {
             showToast('Idea submitted successfully!', 'success');
             hideModal('ideaSubmissionModal');
             e.target.reset();
+            resetDraftSimilarity();
             
             // Reset category fields visibility
             document.getElementById('securityFields').style.display = 'none';
@@ -73,9 +73,16 @@ def start_backend(python_path):
     # Change to project directory
     os.chdir(PROJECT_ROOT)
     
+    # gunicorn is the production server; Windows has no gunicorn, so it
+    # falls back to the Flask development server
+    if os.name != 'nt' and (python_path.parent / "gunicorn").exists():
+        command = [str(python_path), "-m", "gunicorn", "-c", "gunicorn.conf.py"]
+    else:
+        command = [str(python_path), "app.py"]
+    
     # Start backend in a separate process
     backend_process = subprocess.Popen(
-        [str(python_path), "app.py"],
+        command,
         stdout=subprocess.DEVNULL,
         stderr=subprocess.DEVNULL,
         text=True
@@ -95,16 +102,19 @@ def start_backend(python_path):
         print_message(f"STDERR: {stderr}")
         return None
 
-def test_backend():
-    """Test if backend is responding"""
-    try:
-        import requests
-        response = requests.get(f"http://localhost:{BACKEND_PORT}/health", timeout=5)
-        if response.status_code == 200:
-            print_message("Backend health check passed")
-            return True
-    except Exception:
-        pass
+def test_backend(wait=30):
+    """Wait until the backend reports ready (DB and similarity index warm)"""
+    import requests
+    deadline = time.time() + wait
+    while time.time() < deadline:
+        try:
+            response = requests.get(f"http://localhost:{BACKEND_PORT}/health/ready", timeout=5)
+            if response.status_code == 200:
+                print_message("Backend health check passed")
+                return True
+        except Exception:
+            pass
+        time.sleep(1)
     
     print_message("Backend health check failed")
     return False
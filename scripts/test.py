@@ -1,18 +1,56 @@
 #!/usr/bin/env python3
-"""Quick backend test script"""
+"""Backend checks and benchmark harness
 
-import requests
+    python scripts/test.py                      # quick check of a running backend
+    python scripts/test.py seed --ideas 20000   # synthetic database
+    python scripts/test.py bench --in-process   # mixed workload, JSON results
+    python scripts/test.py compare base.json new.json
+"""
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).parent.parent
+BASE_URL = os.environ.get('BASE_URL', 'http://localhost:4444')
+BENCH_DB = str(PROJECT_ROOT / 'database' / 'bench.db')
+PASSWORD = 'password123'
+
+CATEGORIES = ('Innovation', 'Automation', 'Security')
+BENEFIT_LEVELS = ('1', '2', '3', '4', '5')
+WORDS = (
+    'automate patching pipeline alerts dashboard firewall rules audit logs backup restore '
+    'monitoring latency cache database index query rollout canary failover cluster storage '
+    'network vpn certificate rotation secrets vault access review onboarding runbook script '
+    'ticket triage incident postmortem capacity forecast cost report kubernetes container '
+    'image scan vulnerability dependency upgrade terraform ansible inventory compliance '
+    'encryption token expiry session password reset self service portal chatbot workflow'
+).split()
+
+DEFAULT_MIX = 'login=1,leaderboard=10,boards=3,worklist=3,similarity=3,approved=2,submit=2'
+
+
+def test_backend(base_url=BASE_URL):
+    """Check that a running backend answers its main endpoints"""
+    import requests
 
-def test_backend():
     print("Testing Backend...")
-    
+
     tests = [
-        ("Health Check", "GET", "http://localhost:5000/health", None),
-        ("Leaderboard", "GET", "http://localhost:5000/api/leaderboard/", None),
-        ("Login", "POST", "http://localhost:5000/api/auth/login", 
-         {"username": "nachi", "password": "password123"})
+        ("Health Check", "GET", f"{base_url}/health", None),
+        ("Leaderboard", "GET", f"{base_url}/api/leaderboard/", None),
+        ("Login", "POST", f"{base_url}/api/auth/login",
+         {"username": "nachi", "password": PASSWORD})
     ]
-    
+
     results = []
     for name, method, url, data in tests:
         try:
@@ -29,10 +67,435 @@ def test_backend():
         except Exception as e:
             print(f"FAIL: {name} - {str(e)[:50]}...")
             results.append(False)
-    
+
     success_rate = sum(results) / len(results) * 100
     print(f"\nBackend: {success_rate:.0f}% working")
     return success_rate == 100
 
+
+# Seeding
+
+def import_app(db_path):
+    """Import app.py against db_path without touching the network"""
+    os.environ['DB_PATH'] = db_path
+    os.environ.setdefault('AVATAR_FETCH', '0')
+    os.environ.setdefault('SIMILARITY_MAINTENANCE_INTERVAL', '0')
+    sys.path.insert(0, str(PROJECT_ROOT))
+    import app
+    return app
+
+
+def synthetic_text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(max(words, 1)))
+
+
+def seed_database(args):
+    """Create a synthetic database at the requested scale"""
+    if os.path.exists(args.db):
+        if not args.force:
+            raise SystemExit(f"{args.db} exists (use --force to replace it)")
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    os.makedirs(os.path.dirname(os.path.abspath(args.db)), exist_ok=True)
+
+    app = import_app(args.db)
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    app.init_database()
+
+    # One hash at the configured cost, shared by every synthetic user, so
+    # logins cost what they do in production without hashing per user
+    password_hash = app.password_hasher.hash(PASSWORD)
+    users = [
+        (f'bench-eng-{i}', f'Engineer {i}', 'Service Engineer') for i in range(args.users)
+    ] + [
+        (f'bench-sdm-{i}', f'Manager {i}', 'SDM') for i in range(args.sdms)
+    ]
+    with app.db_pool.connection() as conn:
+        rows = [
+            (f'{username}-id', username, display_name, f'{username}@bench.local', password_hash, role)
+            for username, display_name, role in users
+        ]
+        conn.executemany(
+            'INSERT INTO users (id, username, display_name, email, password_hash, role) VALUES (?, ?, ?, ?, ?, ?)',
+            rows
+        )
+        engineers = [row[0] for row in rows if row[5] == 'Service Engineer']
+        sdms = [row[0] for row in rows if row[5] == 'SDM']
+
+        rules = app.load_point_rules(conn)
+        weights = [float(weight) for weight in args.category_mix.split(',')]
+        today = date.today()
+        ideas, texts = [], []
+        for i in range(args.ideas):
+            category = rng.choices(CATEGORIES, weights)[0]
+            if texts and rng.random() < args.duplicate_ratio:
+                # Near-duplicate of an earlier idea, for the similarity checks
+                words = rng.choice(texts).split()
+                text = ' '.join(word if rng.random() > 0.2 else rng.choice(WORDS) for word in words)
+            else:
+                text = synthetic_text(rng, args.words)
+            texts.append(text)
+
+            data = {
+                'title': ' '.join(text.split()[:6]).capitalize(),
+                'category': category,
+                'service_area': f'Area {rng.randrange(args.service_areas)}',
+                'benefit_level': rng.choice(BENEFIT_LEVELS),
+                'implemented': rng.random() < 0.4,
+                'innovative_idea': text if category == 'Innovation' else '',
+                'security_gap': text if category == 'Security' else '',
+                'automation_opportunity': text if category == 'Automation' else ''
+            }
+            age = rng.randrange(args.days)
+            submitted = (today - timedelta(days=age)).isoformat()
+            # Reviewed up to two weeks after submission, never in the future
+            reviewed = f"{today - timedelta(days=max(age - rng.randrange(15), 0))} 12:00:00"
+            roll = rng.random()
+            status = 'approved' if roll < args.approved else 'rejected' if roll < args.approved + args.rejected else 'pending'
+            points = app.calculate_points(rules, category, data['implemented'], data['benefit_level'])
+            ideas.append((
+                app.idea_insert_params(
+                    f'bench-idea-{i}', rng.choice(engineers), rng.choice(sdms), data,
+                    app.build_idea_description(data), submitted
+                ),
+                status,
+                points if status == 'approved' else 0,
+                rules.version if status == 'approved' else None,
+                reviewed if status == 'approved' else None
+            ))
+
+        conn.executemany(app.IDEA_INSERT_SQL, [params for params, _, _, _, _ in ideas])
+        conn.executemany(
+            "UPDATE ideas SET status = ?, points = ?, rules_version = ?, approved_at = ?, "
+            "rejection_reason = CASE WHEN ? = 'rejected' THEN 'Benchmark' END WHERE id = ?",
+            [(status, points, version, reviewed, status, params[0])
+             for params, status, points, version, reviewed in ideas]
+        )
+        app.rebuild_score_aggregates(conn)
+        conn.commit()
+        conn.execute('ANALYZE')
+
+    print(f"Seeded {args.db}: {args.users} engineers, {args.sdms} SDMs, {args.ideas} ideas "
+          f"in {time.perf_counter() - started:.1f}s (password: {PASSWORD})")
+
+
+# Workloads
+
+class InProcessClient:
+    """requests-like calls through Flask's test client (no sockets)"""
+
+    def __init__(self, app):
+        self.client = app.app.test_client()
+
+    def request(self, method, path, token=None, json_body=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.client.open(path, method=method, json=json_body, headers=headers)
+        return response.status_code, (response.get_json(silent=True) if response.is_json else None)
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def request(self, method, path, token=None, json_body=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.session.request(method, self.base_url + path, json=json_body, headers=headers, timeout=30)
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+
+class Workload:
+    """Shared state for the benchmark threads: tokens and ids to hit"""
+
+    def __init__(self, client, engineers, sdms, sample):
+        self.engineers = engineers
+        self.sdms = sdms
+        self.tokens = {}
+        for username in engineers[:sample] + sdms[:sample]:
+            status, body = client.request('POST', '/api/auth/login', json_body={'username': username, 'password': PASSWORD})
+            if status != 200:
+                raise SystemExit(f"Login as {username} failed ({status}); seed the database first")
+            self.tokens[username] = (body['token'], body['user']['id'])
+        self.engineer_tokens = [self.tokens[u] for u in engineers[:sample]]
+        self.sdm_tokens = [self.tokens[u] for u in sdms[:sample]]
+        self.worklist_ids = {}
+        self.lock = threading.Lock()
+
+    def login(self, client, rng):
+        return [('login', *client.request(
+            'POST', '/api/auth/login',
+            json_body={'username': rng.choice(self.engineers), 'password': PASSWORD}
+        ))]
+
+    def leaderboard(self, client, rng):
+        return [('leaderboard', *client.request('GET', '/api/leaderboard/'))]
+
+    def boards(self, client, rng):
+        query = {'window': rng.choice(('week', 'month', 'quarter', 'year'))}
+        if rng.random() < 0.5:
+            query['category'] = rng.choice(CATEGORIES)
+        return [('boards', *client.request('GET', '/api/leaderboard/?' + urllib.parse.urlencode(query)))]
+
+    def approved(self, client, rng):
+        token, _ = rng.choice(self.sdm_tokens)
+        return [('approved', *client.request('GET', '/api/ideas/approved/all?limit=50&summary=1', token))]
+
+    def worklist(self, client, rng):
+        token, sdm_id = rng.choice(self.sdm_tokens)
+        status, body = client.request('GET', '/api/ideas/worklist?limit=50&include=details', token)
+        if status == 200 and body and body.get('ideas'):
+            with self.lock:
+                self.worklist_ids[sdm_id] = [idea['id'] for idea in body['ideas']]
+        return [('worklist', status, body)]
+
+    def similarity(self, client, rng):
+        token, sdm_id = rng.choice(self.sdm_tokens)
+        ids = self.worklist_ids.get(sdm_id)
+        if not ids:
+            return self.worklist(client, rng)
+        return [('similarity', *client.request('GET', f'/api/ideas/{rng.choice(ids)}/similarity', token))]
+
+    def submit(self, client, rng):
+        token, _ = rng.choice(self.engineer_tokens)
+        _, sdm_id = rng.choice(self.sdm_tokens)
+        text = synthetic_text(rng, 30)
+        return [('submit', *client.request('POST', '/api/ideas/submit', token, {
+            'title': ' '.join(text.split()[:6]).capitalize(),
+            'category': 'Innovation',
+            'service_area': 'Area 0',
+            'benefit_level': rng.choice(BENEFIT_LEVELS),
+            'assigned_sdm_id': sdm_id,
+            'innovative_idea': text
+        }))]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if not hasattr(Workload, name.strip()):
+            raise SystemExit(f"Unknown workload: {name}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(samples, seconds):
+    """Per-endpoint latency percentiles (ms), throughput and status counts"""
+    report = {}
+    for name in sorted({name for name, _, _ in samples}) + ['all']:
+        rows = [row for row in samples if name == 'all' or row[0] == name]
+        latencies = sorted(latency * 1000 for _, latency, _ in rows)
+        statuses = {}
+        for _, _, status in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        errors = sum(count for status, count in statuses.items() if not status.startswith(('2', '3')))
+        report[name] = {
+            'requests': len(rows),
+            'throughput': round(len(rows) / seconds, 2),
+            'error_rate': round(errors / len(rows), 4),
+            'p50_ms': round(percentile(latencies, 0.50), 2),
+            'p95_ms': round(percentile(latencies, 0.95), 2),
+            'p99_ms': round(percentile(latencies, 0.99), 2),
+            'max_ms': round(latencies[-1], 2),
+            'mean_ms': round(sum(latencies) / len(latencies), 2),
+            'statuses': statuses
+        }
+    return report
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmark(args):
+    """Drive the mixed workload and report/save per-endpoint results"""
+    if args.in_process:
+        app = import_app(args.db)
+        print(f"Warming up similarity index ({app.warmup()}s)")
+        make_client = lambda: InProcessClient(app)
+        target = f'in-process:{args.db}'
+    else:
+        make_client = lambda: HttpClient(args.base_url)
+        target = args.base_url
+
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    engineers = [f'bench-eng-{i}' for i in range(args.users)]
+    sdms = [f'bench-sdm-{i}' for i in range(args.sdms)]
+    workload = Workload(make_client(), engineers, sdms, args.sample)
+
+    samples = []
+    samples_lock = threading.Lock()
+    measure_from = time.perf_counter() + args.warmup
+    deadline = measure_from + args.duration
+
+    def worker(number):
+        client = make_client()
+        rng = random.Random(args.seed + number)
+        own = []
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                results = getattr(workload, name)(client, rng)
+            except Exception as e:
+                results = [(name, f'error:{type(e).__name__}', None)]
+            elapsed = time.perf_counter() - started
+            if started >= measure_from:
+                # A composite step (similarity falling back to a worklist
+                # fetch) is recorded under the endpoint it actually hit
+                for endpoint, status, _ in results[-1:]:
+                    own.append((endpoint, elapsed, status))
+        with samples_lock:
+            samples.extend(own)
+
+    print(f"Running {args.mix} against {target}: {args.concurrency} threads, "
+          f"{args.warmup}s warmup + {args.duration}s")
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if not samples:
+        raise SystemExit("No requests completed")
+    results = {
+        'meta': {
+            'label': args.label,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'target': target,
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'mix': mix,
+            'python': sys.version.split()[0]
+        },
+        'endpoints': summarize(samples, args.duration)
+    }
+    print_results(results)
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved {args.out}")
+    return results
+
+
+def print_results(results):
+    print(f"\n{'endpoint':<12} {'req':>7} {'req/s':>8} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for name, row in results['endpoints'].items():
+        print(f"{name:<12} {row['requests']:>7} {row['throughput']:>8} {row['error_rate'] * 100:>6.1f} "
+              f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8}")
+
+
+def compare_results(args):
+    """Flag endpoints that got slower, slower to serve or less reliable"""
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    threshold = args.threshold / 100
+    regressions = []
+    print(f"{'endpoint':<12} {'metric':<11} {'baseline':>10} {'current':>10} {'change':>8}")
+    for name, new in current['endpoints'].items():
+        old = baseline['endpoints'].get(name)
+        if not old:
+            print(f"{name:<12} (new endpoint)")
+            continue
+        checks = [(metric, True) for metric in ('p50_ms', 'p95_ms', 'p99_ms')] + [('throughput', False)]
+        for metric, lower_is_better in checks:
+            before, after = old[metric], new[metric]
+            change = (after - before) / before if before else 0.0
+            worse = change > threshold if lower_is_better else change < -threshold
+            # Ignore sub-millisecond wobble on very fast endpoints
+            if lower_is_better and after - before < args.min_ms:
+                worse = False
+            flag = '  REGRESSION' if worse else ''
+            print(f"{name:<12} {metric:<11} {before:>10} {after:>10} {change * 100:>+7.1f}%{flag}")
+            if worse:
+                regressions.append((name, metric))
+        if new['error_rate'] > old['error_rate'] + 0.01:
+            print(f"{name:<12} {'error_rate':<11} {old['error_rate']:>10} {new['error_rate']:>10}  REGRESSION")
+            regressions.append((name, 'error_rate'))
+
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold}%")
+        return False
+    print(f"\nNo regressions beyond {args.threshold}%")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default=BASE_URL, help='Running backend (default %(default)s)')
+    commands = parser.add_subparsers(dest='command')
+
+    seed = commands.add_parser('seed', help='Create a synthetic database')
+    seed.add_argument('--db', default=BENCH_DB)
+    seed.add_argument('--force', action='store_true', help='Replace an existing database')
+    seed.add_argument('--users', type=int, default=200, help='Service engineers')
+    seed.add_argument('--sdms', type=int, default=10)
+    seed.add_argument('--ideas', type=int, default=20000)
+    seed.add_argument('--words', type=int, default=40, help='Words of text per idea')
+    seed.add_argument('--service-areas', type=int, default=12)
+    seed.add_argument('--category-mix', default='1,1,1', help='Innovation,Automation,Security weights')
+    seed.add_argument('--approved', type=float, default=0.5, help='Share of approved ideas')
+    seed.add_argument('--rejected', type=float, default=0.1, help='Share of rejected ideas')
+    seed.add_argument('--duplicate-ratio', type=float, default=0.2, help='Share of near-duplicate ideas')
+    seed.add_argument('--days', type=int, default=730, help='Spread submission dates over this many days')
+    seed.add_argument('--seed', type=int, default=1)
+
+    bench = commands.add_parser('bench', help='Run a mixed workload')
+    bench.add_argument('--in-process', action='store_true', help='Call the app through Flask\'s test client instead of HTTP')
+    bench.add_argument('--db', default=BENCH_DB, help='Database for --in-process')
+    bench.add_argument('--users', type=int, default=200, help='Seeded engineers to log in as')
+    bench.add_argument('--sdms', type=int, default=10, help='Seeded SDMs to log in as')
+    bench.add_argument('--sample', type=int, default=20, help='Users per role to pre-authenticate')
+    bench.add_argument('--mix', default=DEFAULT_MIX, help='workload=weight,... (default %(default)s)')
+    bench.add_argument('--concurrency', type=int, default=8)
+    bench.add_argument('--duration', type=float, default=20, help='Measured seconds')
+    bench.add_argument('--warmup', type=float, default=3, help='Unmeasured seconds first')
+    bench.add_argument('--seed', type=int, default=1)
+    bench.add_argument('--label', default=None)
+    bench.add_argument('--out', default=None, help='Write JSON results here')
+
+    compare = commands.add_parser('compare', help='Compare two JSON results')
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--threshold', type=float, default=10, help='Allowed change in percent')
+    compare.add_argument('--min-ms', type=float, default=1, help='Ignore latency increases below this')
+
+    args = parser.parse_args()
+    if args.command == 'seed':
+        seed_database(args)
+    elif args.command == 'bench':
+        run_benchmark(args)
+    elif args.command == 'compare':
+        sys.exit(0 if compare_results(args) else 1)
+    else:
+        sys.exit(0 if test_backend(args.base_url) else 1)
+
+
 if __name__ == "__main__":
-    test_backend()
+    main()